@@ -0,0 +1,414 @@
+"""🚦 Admission control for flash on-sales
+
+Only ``limit`` bookings per event run at once; everybody else waits in a
+fair FIFO queue and polls for their position instead of holding a worker:
+
+* ``enter(event_id, ticket)`` - returns ``admitted`` straight away when a
+  slot is free and nobody is ahead (the uncontended fast path), otherwise a
+  ``waiting`` ticket with its position and ETA. Re-entering with the same
+  ticket keeps the place in line.
+* ``release(ticket, service_time)`` - frees the slot once the booking is done.
+* ``mark_sold_out(event_id)`` - for ``sold_out_seconds`` every new or
+  waiting request is shed with 429 + ``Retry-After`` without a database call.
+
+Admitted tickets that are not used within ``hold_seconds`` and waiting
+tickets not polled for ``idle_seconds`` give their place up. The ETA comes
+from a moving average of how long admitted bookings take.
+
+Queues are only opened for real events: the route asks ``tracks(event_id)``
+first and checks the database when the store has no queue for it, so
+made-up event ids are a 404 and never take memory. Every ``idle_seconds``
+both stores sweep all queues and drop the ones where nothing is waiting,
+admitted or sold out.
+
+Stores:
+
+* ``MemoryAdmissionStore`` - in-process, one queue per worker
+* ``SQLiteAdmissionStore`` - a local file shared by all workers on the host
+"""
+import bisect
+import math
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+WAITING = 'waiting'
+ADMITTED = 'admitted'
+SOLD_OUT = 'sold_out'
+FULL = 'full'
+
+# prior for the ETA until the first bookings complete
+DEFAULT_SERVICE_SECONDS = 1.0
+SERVICE_SMOOTHING = 0.2
+
+
+class AdmissionStore:
+    def __init__(self, limit=8, hold_seconds=30, idle_seconds=20, max_queue=10_000, sold_out_seconds=60):
+        self.limit = limit
+        self.hold_seconds = hold_seconds
+        self.idle_seconds = idle_seconds
+        self.max_queue = max_queue
+        self.sold_out_seconds = sold_out_seconds
+
+    def enter(self, event_id, ticket=None):
+        raise NotImplementedError
+
+    def tracks(self, event_id):
+        """True if ``event_id`` already has a queue - no need to check it exists"""
+        raise NotImplementedError
+
+    def status(self, ticket):
+        """Poll an existing ticket (None if unknown or expired)"""
+        raise NotImplementedError
+
+    def release(self, ticket, service_time=None):
+        raise NotImplementedError
+
+    def mark_sold_out(self, event_id):
+        raise NotImplementedError
+
+    def _spot(self, event_id, ticket, state, position=0, service=DEFAULT_SERVICE_SECONDS, retry_after=None):
+        spot = {'event_id': event_id, 'ticket': ticket, 'state': state, 'position': position}
+        if state == WAITING:
+            spot['eta_seconds'] = math.ceil(position * service / self.limit)
+        if retry_after is not None:
+            spot['retry_after'] = max(1, math.ceil(retry_after))
+        return spot
+
+    @staticmethod
+    def _new_ticket():
+        return secrets.token_urlsafe(12)
+
+    @staticmethod
+    def _smooth(service, sample):
+        return service + SERVICE_SMOOTHING * (sample - service)
+
+
+class _EventQueue:
+    __slots__ = ('waiting', 'waiting_seqs', 'admitted', 'service', 'sold_out_until', 'swept_at')
+
+    def __init__(self):
+        self.waiting = {}        # ticket -> [seq, last_seen]
+        self.waiting_seqs = []   # sorted seqs - bisect gives a position
+        self.admitted = {}       # ticket -> admitted_at
+        self.service = DEFAULT_SERVICE_SECONDS
+        self.sold_out_until = 0.0
+        self.swept_at = 0.0
+
+
+class MemoryAdmissionStore(AdmissionStore):
+    name = 'memory'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._events = {}
+        self._tickets = {}   # ticket -> (event_id, seq)
+        self._seq = 0
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+
+    def enter(self, event_id, ticket=None):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep_all(now)
+            queue = self._events.setdefault(event_id, _EventQueue())
+            self._sweep(queue, now)
+            if queue.sold_out_until > now:
+                return self._spot(event_id, None, SOLD_OUT, retry_after=queue.sold_out_until - now)
+
+            known = self._tickets.get(ticket)
+            if known is None or known[0] != event_id:
+                if len(queue.waiting) >= self.max_queue:
+                    return self._spot(event_id, None, FULL, retry_after=queue.service)
+                ticket = self._new_ticket()
+                self._seq += 1
+                queue.waiting[ticket] = [self._seq, now]
+                queue.waiting_seqs.append(self._seq)
+                self._tickets[ticket] = (event_id, self._seq)
+            elif ticket in queue.waiting:
+                queue.waiting[ticket][1] = now
+
+            self._promote(queue, now)
+            return self._describe(event_id, queue, ticket)
+
+    def tracks(self, event_id):
+        return event_id in self._events
+
+    def status(self, ticket):
+        now = time.monotonic()
+        with self._lock:
+            known = self._tickets.get(ticket)
+            if known is None:
+                return None
+            event_id = known[0]
+            queue = self._events[event_id]
+            self._sweep(queue, now)
+            if queue.sold_out_until > now:
+                return self._spot(event_id, ticket, SOLD_OUT, retry_after=queue.sold_out_until - now)
+            if ticket in queue.waiting:
+                queue.waiting[ticket][1] = now
+            self._promote(queue, now)
+            if ticket not in queue.waiting and ticket not in queue.admitted:
+                return None
+            return self._describe(event_id, queue, ticket)
+
+    def release(self, ticket, service_time=None):
+        with self._lock:
+            known = self._tickets.pop(ticket, None)
+            if known is None:
+                return
+            queue = self._events[known[0]]
+            queue.admitted.pop(ticket, None)
+            if ticket in queue.waiting:
+                self._drop_waiting(queue, ticket)
+            if service_time is not None:
+                queue.service = self._smooth(queue.service, service_time)
+            self._promote(queue, time.monotonic())
+
+    def mark_sold_out(self, event_id):
+        with self._lock:
+            queue = self._events.setdefault(event_id, _EventQueue())
+            # waiting tickets stay (and hear "sold out") until they stop polling
+            queue.sold_out_until = time.monotonic() + self.sold_out_seconds
+
+    def _describe(self, event_id, queue, ticket):
+        if ticket in queue.admitted:
+            return self._spot(event_id, ticket, ADMITTED)
+        seq = queue.waiting[ticket][0]
+        position = bisect.bisect_left(queue.waiting_seqs, seq) + 1
+        return self._spot(event_id, ticket, WAITING, position, queue.service,
+                          retry_after=min(5, queue.service * position / self.limit))
+
+    def _promote(self, queue, now):
+        free = self.limit - len(queue.admitted)
+        if free <= 0 or not queue.waiting_seqs:
+            return
+        # waiting dict keeps insertion (= seq) order
+        for ticket in list(queue.waiting)[:free]:
+            self._drop_waiting(queue, ticket)
+            queue.admitted[ticket] = now
+
+    def _drop_waiting(self, queue, ticket):
+        seq, _ = queue.waiting.pop(ticket)
+        index = bisect.bisect_left(queue.waiting_seqs, seq)
+        del queue.waiting_seqs[index]
+
+    def _sweep_all(self, now):
+        # queues nobody polls any more are only reached from here
+        if now - self._swept_at < self.idle_seconds:
+            return
+        self._swept_at = now
+        for event_id, queue in list(self._events.items()):
+            self._sweep(queue, now)
+            if not queue.waiting and not queue.admitted and queue.sold_out_until <= now:
+                del self._events[event_id]
+
+    def _sweep(self, queue, now):
+        # at most once a second - idle/expired tickets give their place up
+        if now - queue.swept_at < 1:
+            return
+        queue.swept_at = now
+        for ticket, admitted_at in list(queue.admitted.items()):
+            if now - admitted_at > self.hold_seconds:
+                del queue.admitted[ticket]
+                self._tickets.pop(ticket, None)
+        for ticket, (_, last_seen) in list(queue.waiting.items()):
+            if now - last_seen > self.idle_seconds:
+                self._drop_waiting(queue, ticket)
+                self._tickets.pop(ticket, None)
+
+
+ADMISSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS admission_tickets (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket TEXT NOT NULL UNIQUE,
+    event_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_seen REAL NOT NULL,
+    admitted_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_admission_queue ON admission_tickets (event_id, state, seq);
+
+CREATE TABLE IF NOT EXISTS admission_events (
+    event_id TEXT PRIMARY KEY,
+    service REAL NOT NULL,
+    sold_out_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class SQLiteAdmissionStore(AdmissionStore):
+    """Same rules as the memory store; every call is one IMMEDIATE transaction"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._swept_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(ADMISSION_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn, *args):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn, time.time(), *args)
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def enter(self, event_id, ticket=None):
+        return self._transaction(self._enter, event_id, ticket)
+
+    def status(self, ticket):
+        return self._transaction(self._status, ticket)
+
+    def release(self, ticket, service_time=None):
+        self._transaction(self._release, ticket, service_time)
+
+    def mark_sold_out(self, event_id):
+        self._transaction(self._mark_sold_out, event_id)
+
+    def _enter(self, conn, now, event_id, ticket):
+        self._sweep_all(conn, now)
+        service, sold_out_until = self._event(conn, event_id)
+        self._sweep(conn, now, event_id)
+        if sold_out_until > now:
+            return self._spot(event_id, None, SOLD_OUT, retry_after=sold_out_until - now)
+
+        row = conn.execute('SELECT event_id FROM admission_tickets WHERE ticket = ?', (ticket,)).fetchone()
+        if row is None or row[0] != event_id:
+            waiting = conn.execute(
+                'SELECT COUNT(*) FROM admission_tickets WHERE event_id = ? AND state = ?', (event_id, WAITING)
+            ).fetchone()[0]
+            if waiting >= self.max_queue:
+                return self._spot(event_id, None, FULL, retry_after=service)
+            ticket = self._new_ticket()
+            conn.execute(
+                'INSERT INTO admission_tickets (ticket, event_id, state, last_seen) VALUES (?, ?, ?, ?)',
+                (ticket, event_id, WAITING, now)
+            )
+        else:
+            conn.execute('UPDATE admission_tickets SET last_seen = ? WHERE ticket = ?', (now, ticket))
+
+        self._promote(conn, now, event_id)
+        return self._describe(conn, event_id, ticket, service)
+
+    def tracks(self, event_id):
+        row = self._conn().execute('SELECT 1 FROM admission_events WHERE event_id = ?', (event_id,)).fetchone()
+        return row is not None
+
+    def _status(self, conn, now, ticket):
+        row = conn.execute('SELECT event_id FROM admission_tickets WHERE ticket = ?', (ticket,)).fetchone()
+        if row is None:
+            return None
+        event_id = row[0]
+        service, sold_out_until = self._event(conn, event_id)
+        self._sweep(conn, now, event_id)
+        if sold_out_until > now:
+            return self._spot(event_id, ticket, SOLD_OUT, retry_after=sold_out_until - now)
+        conn.execute('UPDATE admission_tickets SET last_seen = ? WHERE ticket = ?', (now, ticket))
+        self._promote(conn, now, event_id)
+        return self._describe(conn, event_id, ticket, service)
+
+    def _release(self, conn, now, ticket, service_time):
+        row = conn.execute('SELECT event_id FROM admission_tickets WHERE ticket = ?', (ticket,)).fetchone()
+        if row is None:
+            return
+        event_id = row[0]
+        conn.execute('DELETE FROM admission_tickets WHERE ticket = ?', (ticket,))
+        if service_time is not None:
+            service, _ = self._event(conn, event_id)
+            conn.execute('UPDATE admission_events SET service = ? WHERE event_id = ?',
+                         (self._smooth(service, service_time), event_id))
+        self._promote(conn, now, event_id)
+
+    def _mark_sold_out(self, conn, now, event_id):
+        self._event(conn, event_id)
+        conn.execute('UPDATE admission_events SET sold_out_until = ? WHERE event_id = ?',
+                     (now + self.sold_out_seconds, event_id))
+
+    def _event(self, conn, event_id):
+        row = conn.execute('SELECT service, sold_out_until FROM admission_events WHERE event_id = ?',
+                           (event_id,)).fetchone()
+        if row is None:
+            conn.execute('INSERT INTO admission_events (event_id, service) VALUES (?, ?)',
+                         (event_id, DEFAULT_SERVICE_SECONDS))
+            return DEFAULT_SERVICE_SECONDS, 0.0
+        return row
+
+    def _describe(self, conn, event_id, ticket, service):
+        row = conn.execute('SELECT seq, state FROM admission_tickets WHERE ticket = ?', (ticket,)).fetchone()
+        if row is None:
+            return None
+        seq, state = row
+        if state == ADMITTED:
+            return self._spot(event_id, ticket, ADMITTED)
+        position = conn.execute(
+            'SELECT COUNT(*) FROM admission_tickets WHERE event_id = ? AND state = ? AND seq <= ?',
+            (event_id, WAITING, seq)
+        ).fetchone()[0]
+        return self._spot(event_id, ticket, WAITING, position, service,
+                          retry_after=min(5, service * position / self.limit))
+
+    def _promote(self, conn, now, event_id):
+        admitted = conn.execute(
+            'SELECT COUNT(*) FROM admission_tickets WHERE event_id = ? AND state = ?', (event_id, ADMITTED)
+        ).fetchone()[0]
+        free = self.limit - admitted
+        if free > 0:
+            conn.execute(
+                'UPDATE admission_tickets SET state = ?, admitted_at = ? WHERE seq IN ('
+                'SELECT seq FROM admission_tickets WHERE event_id = ? AND state = ? ORDER BY seq LIMIT ?)',
+                (ADMITTED, now, event_id, WAITING, free)
+            )
+
+    def _sweep(self, conn, now, event_id):
+        conn.execute(
+            'DELETE FROM admission_tickets WHERE event_id = ? AND ('
+            '(state = ? AND admitted_at < ?) OR (state = ? AND last_seen < ?))',
+            (event_id, ADMITTED, now - self.hold_seconds, WAITING, now - self.idle_seconds)
+        )
+
+    def _sweep_all(self, conn, now):
+        # events nobody polls any more are only reached from here
+        if now - self._swept_at < self.idle_seconds:
+            return
+        self._swept_at = now
+        conn.execute(
+            'DELETE FROM admission_tickets WHERE (state = ? AND admitted_at < ?) OR (state = ? AND last_seen < ?)',
+            (ADMITTED, now - self.hold_seconds, WAITING, now - self.idle_seconds)
+        )
+        conn.execute(
+            'DELETE FROM admission_events WHERE sold_out_until <= ? '
+            'AND event_id NOT IN (SELECT event_id FROM admission_tickets)',
+            (now,)
+        )
+
+
+def create_admission_store(config):
+    options = {
+        'limit': config.ADMISSION_CONCURRENCY,
+        'hold_seconds': config.ADMISSION_HOLD_SECONDS,
+        'idle_seconds': config.ADMISSION_IDLE_SECONDS,
+        'max_queue': config.ADMISSION_MAX_QUEUE,
+        'sold_out_seconds': config.ADMISSION_SOLD_OUT_SECONDS
+    }
+    if config.ADMISSION_STORE == 'sqlite':
+        return SQLiteAdmissionStore(config.ADMISSION_PATH, **options)
+    return MemoryAdmissionStore(**options)
@@ -2,58 +2,223 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from config import Config
 from database import db
-import hashlib
-import uuid
-import traceback
+from reservations import BatchReservationError, ReservationError, parse_tickets
+from cache import QueryCache
+from pagination import EventQuery, RegistrationQuery
+from validation import EventValidationError, build_event
+from bulk_import import detect_format, import_events
+from export import MIMETYPES, export_attendees
+from stats import StatsAggregator
+from rollups import SalesRollups
+from search import SearchIndex
+from seatmap import SeatMaps
+from routes.admin import admin_bp
+from metrics import Metrics, InstrumentedStorage, instrument_app
+from profiling import RequestProfiler
+from logs import get_logger, log
+from tokens import issue_token, require_role
+from passwords import HasherBusy, PasswordHasher
+from credentials import CredentialStore
+from admission import ADMITTED, SOLD_OUT, WAITING, create_admission_store
+from static import StaticSite
+from livestream import AvailabilityHub
+from idempotency import IdempotencyStore, idempotent
+from journal import BookingJournal
+from coherence import SharedState
+import logging
+import re
+import signal
+import time
 from datetime import datetime
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)
 app.config.from_object(Config)
 CORS(app)
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+logger = get_logger('app')
+
+# ⏱️ Per-route and per-storage-call timings for /api/metrics
+metrics = Metrics()
+if Config.METRICS_ENABLED:
+    instrument_app(app, metrics)
+    db.wrap_storage(lambda storage: InstrumentedStorage(storage, metrics))
+
+# 🔬 Sampled / slow-request profiles for /api/admin/profiling (off until switched on)
+profiler = RequestProfiler(
+    Config.PROFILE_DIR,
+    sample_rate=Config.PROFILE_SAMPLE_RATE,
+    slow_ms=Config.PROFILE_SLOW_MS,
+    interval=Config.PROFILE_INTERVAL_MS / 1000,
+    max_captures=Config.PROFILE_MAX_CAPTURES,
+    max_seconds=Config.PROFILE_MAX_SECONDS,
+    enabled=Config.PROFILE_ENABLED
+)
+profiler.install(app)
+if hasattr(signal, Config.PROFILE_SIGNAL):
+    # with --preload gunicorn resets worker signals after this import - the endpoint always works
+    profiler.install_signal(getattr(signal, Config.PROFILE_SIGNAL))
+app.extensions['profiler'] = profiler
+
+# 🔗 Counters + delta ring shared by all workers on this host
+shared = SharedState(Config.COHERENCE_PATH) if Config.COHERENCE_ENABLED else None
+
+def channel(name):
+    return shared.channel(name) if shared else None
+
+# 📦 Event list cache - invalidated by create/delete/register
+events_cache = QueryCache(ttl=Config.EVENTS_CACHE_TTL, channel=channel('events'))
+
+# 🎟️ Per-user booking history pages - dropped by that user's next booking
+registrations_cache = QueryCache(
+    ttl=Config.MY_REGISTRATIONS_CACHE_TTL,
+    max_entries=Config.MY_REGISTRATIONS_CACHE_SIZE,
+    scoped=True,
+    channel=channel('registrations')
+)
+
+# 📊 Running totals for /api/admin/stats
+stats = StatsAggregator(
+    db,
+    reconcile_interval=Config.STATS_RECONCILE_SECONDS,
+    channel=channel('stats'),
+    coherence_interval=Config.STATS_COHERENCE_SECONDS
+)
+app.extensions['stats'] = stats
+
+# 📈 Per-minute sales buckets for /api/admin/sales-timeseries
+rollups = SalesRollups(
+    db,
+    flush_interval=Config.ROLLUP_FLUSH_SECONDS,
+    minute_retention=Config.ROLLUP_MINUTE_DAYS * 86400,
+    hour_retention=Config.ROLLUP_HOUR_DAYS * 86400
+)
+app.extensions['rollups'] = rollups
+app.register_blueprint(admin_bp, url_prefix='/api')
+
+# 🔎 In-memory title/description index for /api/events/search
+event_search = SearchIndex(
+    db,
+    refresh_interval=Config.SEARCH_REFRESH_SECONDS,
+    channel=channel('catalogue'),
+    coherence_interval=Config.SEARCH_COHERENCE_SECONDS
+)
+
+# 💺 Seat maps for reserved-seating events
+seatmaps = SeatMaps(
+    hold_seconds=Config.SEAT_HOLD_SECONDS,
+    registry_ttl=Config.SEATED_REGISTRY_SECONDS,
+    channel=channel('seatmaps')
+)
+
+# 👤 Login: cached credential records + pooled password hashing
+credentials = CredentialStore(
+    db,
+    PasswordHasher(
+        iterations=Config.PASSWORD_ITERATIONS,
+        workers=Config.PASSWORD_HASH_WORKERS,
+        max_waiting=Config.PASSWORD_HASH_QUEUE
+    ),
+    max_entries=Config.USER_CACHE_SIZE,
+    negative_ttl=Config.USER_CACHE_NEGATIVE_TTL,
+    channel=channel('users')
+)
+
+# 📡 Availability deltas for /api/events/stream - published after each commit
+availability = AvailabilityHub(
+    Config.STREAM_BUFFER,
+    Config.STREAM_MAX_SUBSCRIBERS,
+    shared=shared,
+    poll_interval=Config.COHERENCE_POLL_MS / 1000
+)
+
+# 🔁 Idempotency-Key results for the booking routes
+bookings_once = IdempotencyStore(
+    ttl=Config.IDEMPOTENCY_TTL,
+    max_entries=Config.IDEMPOTENCY_MAX_ENTRIES,
+    wait_seconds=Config.IDEMPOTENCY_WAIT_SECONDS
+)
+
+# 🚦 Admission queue in front of the booking route
+admission = create_admission_store(Config) if Config.ADMISSION_ENABLED else None
+
+def journal_flushed(records):
+    # history pages cached between the booking and its insert are stale now
+    for email in {record['email'] for record in records}:
+        registrations_cache.invalidate(email)
+    # counted once they reach the database - this includes bookings replayed
+    # from a crashed worker's journal, whose in-memory rollups died with it
+    for record in records:
+        rollups.record(record['event_id'], record['tickets'], at=datetime.fromisoformat(record['at']).timestamp())
+
+# 📒 Write-behind journal for the booking route (off unless JOURNAL_ENABLED=1)
+journal = BookingJournal(
+    db,
+    Config.JOURNAL_DIR,
+    lease_size=Config.JOURNAL_LEASE_SIZE,
+    lease_idle=Config.JOURNAL_LEASE_IDLE,
+    flush_interval=Config.JOURNAL_FLUSH_MS / 1000,
+    on_flush=journal_flushed
+) if Config.JOURNAL_ENABLED else None
+
+metrics.add_collector(lambda: [
+    ('events_cache_hits_total', 'counter', 'Event list cache hits', (), events_cache.hits),
+    ('events_cache_misses_total', 'counter', 'Event list cache misses', (), events_cache.misses),
+    ('registrations_cache_hits_total', 'counter', 'Booking history cache hits', (), registrations_cache.hits),
+    ('registrations_cache_misses_total', 'counter', 'Booking history cache misses', (),
+     registrations_cache.misses),
+    ('user_cache_hits_total', 'counter', 'Credential cache hits', (), credentials.hits),
+    ('user_cache_misses_total', 'counter', 'Credential cache misses', (), credentials.misses),
+    ('password_hash_rejected_total', 'counter', 'Logins turned away because the hashing pool was full', (),
+     credentials.hasher.rejected),
+    ('idempotent_replays_total', 'counter', 'Bookings answered from a stored Idempotency-Key result', (),
+     bookings_once.replays),
+    ('search_index_events', 'gauge', 'Events in the search index', (), event_search.size)
+])
+
+def journal_metrics():
+    status = journal.status()
+    return [
+        ('journal_pending_bookings', 'gauge', 'Journalled bookings not in the database yet', (), status['pending']),
+        ('journal_allotted_tickets', 'gauge', 'Tickets leased by this worker and not sold yet', (),
+         status['allotted']),
+        ('journal_flushed_total', 'counter', 'Journalled bookings written to the database', (), status['flushed']),
+        ('journal_leases_total', 'counter', 'Ticket blocks leased from the database', (), status['leases'])
+    ]
+
+if journal:
+    metrics.add_collector(journal_metrics)
+
+# 🎯 FRONTEND ROUTING - All 6 pages, preloaded + precompressed (see static.py)
+VALID_PAGES = [
+    'index.html', 'admin.html', 'admin_login.html', 'dashboard.html',
+    'register.html', 'user_login.html'
+]
+frontend = StaticSite(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend'),
+    VALID_PAGES,
+    auto_reload=Config.STATIC_AUTO_RELOAD
+)
 
-# 🎯 FRONTEND ROUTING - All 6 pages
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_frontend(path):
-    frontend_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend')
-    VALID_PAGES = [
-        'index.html', 'admin.html', 'admin_login.html', 'dashboard.html',
-        'register.html', 'user_login.html'
-    ]
-    
     if path.startswith('api'):
         return '', 404
     
-    filename = path if path.endswith('.html') else f"{path}.html"
-    if filename in VALID_PAGES:
-        try:
-            return send_from_directory(frontend_dir, filename)
-        except FileNotFoundError:
-            pass
-    
-    if path.startswith(('css/', 'js/')):
-        try:
-            return send_from_directory(frontend_dir, path)
-        except FileNotFoundError:
-            pass
-    
-    try:
-        return send_from_directory(frontend_dir, 'index.html')
-    except:
+    static_file = frontend.lookup(path)
+    if static_file is None:
         return jsonify({"error": "Frontend not found"}), 404
+    return frontend.respond(static_file, request)
 
 # 👤 USER LOGIN
 @app.route('/api/auth/user-login', methods=['POST'])
 def user_login():
-    client = db.get_client()
-    if not client:
+    storage = db.get_storage()
+    if not storage:
         return jsonify({'error': 'Database connection failed'}), 503
     
     try:
@@ -61,29 +226,29 @@ def user_login():
         email = data.get('email', '').strip()
         password = data.get('password', '')
         
-        print(f"🔍 User login attempt: {email}")
+        if not email or not password:
+            return jsonify({'error': 'Email and password required'}), 400
         
-        # Check existing user
-        response = client.table('users').select('*').eq('email', email).execute()
+        log(logger, logging.DEBUG, 'user_login_attempt', email=email)
         
-        if not response.data:
-            # Auto-create new user
-            client.table('users').insert({
-                'email': email,
-                'password': hash_password(password),
-                'created_at': datetime.now().isoformat()
-            }).execute()
-            print(f"✅ Created new user: {email}")
-        else:
-            # Verify password
-            if response.data[0]['password'] != hash_password(password):
-                return jsonify({'error': 'Invalid credentials'}), 401
+        # Check existing user (auto-creates new ones)
+        result = credentials.login(email, password)
+        if result == 'invalid':
+            return jsonify({'error': 'Invalid credentials'}), 401
+        if result == 'created':
+            log(logger, logging.INFO, 'user_created', email=email)
         
-        print(f"✅ User authenticated: {email}")
-        return jsonify({'token': f'user-{uuid.uuid4()}'}), 200
+        log(logger, logging.DEBUG, 'user_authenticated', email=email)
+        return jsonify({'token': issue_token('user', email)}), 200
+        
+    except HasherBusy as e:
+        log(logger, logging.WARNING, 'user_login_shed', email=email)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
         
     except Exception as e:
-        print(f"❌ User login error: {e}")
+        log(logger, logging.ERROR, 'user_login_failed', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 # 👨‍💼 ADMIN LOGIN
@@ -94,180 +259,551 @@ def admin_login():
         email = data.get('email')
         password = data.get('password')
         
-        print(f"🔍 Admin login: {email}")
-        
         if email == Config.ADMIN_EMAIL and password == Config.ADMIN_PASSWORD:
-            token = f'admin-{uuid.uuid4()}'
-            print("✅ Admin login successful")
+            token = issue_token('admin', email)
+            log(logger, logging.INFO, 'admin_login', email=email)
             return jsonify({'token': token}), 200
+        log(logger, logging.WARNING, 'admin_login_rejected', email=email)
         return jsonify({'error': 'Invalid admin credentials'}), 401
         
     except Exception as e:
-        print(f"❌ Admin login error: {e}")
+        log(logger, logging.ERROR, 'admin_login_failed', error=str(e))
         return jsonify({'error': str(e)}), 500
 
 # 📋 GET EVENTS
 @app.route('/api/events', methods=['GET'])
 def get_events():
-    client = db.get_client()
-    if not client:
+    storage = db.get_storage()
+    if not storage:
         return jsonify({'error': 'Database unavailable'}), 503
     
     try:
-        response = client.table('events').select('*').order('date').execute()
-        print(f"📋 Retrieved {len(response.data)} events")
-        return jsonify(response.data), 200
+        query = EventQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def load():
+        rows = storage.list_events(query)
+        log(logger, logging.DEBUG, 'events_loaded', count=len(rows))
+        # No paging params -> legacy plain list, otherwise a page object
+        body = rows if query.is_default else query.page(rows)
+        return app.json.dumps(body).encode()
+    
+    try:
+        entry = events_cache.get(query.cache_key, load)
+        response = app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        # ✅ If-None-Match hit -> 304 with no body
+        return response.make_conditional(request)
     except Exception as e:
-        print(f"❌ Events error: {e}")
-        return jsonify([]), 200
+        log(logger, logging.ERROR, 'events_load_failed', error=str(e))
+        return jsonify([] if query.is_default else {'events': [], 'next_cursor': None}), 200
+
+# 🔎 SEARCH EVENTS - typeahead over title + description (see search.py)
+@app.route('/api/events/search', methods=['GET'])
+def search_events():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': 'q is required'}), 400
+    if len(text) > 200:
+        return jsonify({'error': 'q is too long'}), 400
+    
+    try:
+        # same limit / from / to / when rules as /api/events
+        query = EventQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    events = event_search.search(text, query, limit=query.limit or 20)
+    if event_search.refreshed_at is None:
+        return jsonify({'error': 'Search index unavailable - database offline'}), 503
+    return jsonify({'query': text, 'events': events}), 200
+
+def streaming_supported():
+    """Can this worker park a thread on an open stream? A sync worker would be
+    pinned by one tab, and killed by its timeout."""
+    if Config.STREAM_ENABLED == 'auto':
+        # gthread, gevent/eventlet and the threaded dev server all set it
+        return bool(request.environ.get('wsgi.multithread'))
+    return Config.STREAM_ENABLED == '1'
+
+# 📡 LIVE AVAILABILITY - SSE stream of [event_id, remaining] deltas
+@app.route('/api/events/stream')
+def events_stream():
+    if not streaming_supported():
+        # EventSource does not reconnect after an error status
+        return jsonify({'error': 'Live updates are off on this server - poll /api/events instead'}), 503
+    if availability.subscribers >= Config.STREAM_MAX_SUBSCRIBERS:
+        response = jsonify({'error': 'Too many live subscribers - poll /api/events instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    frames = availability.stream(
+        request.headers.get('Last-Event-ID'),
+        heartbeat=Config.STREAM_HEARTBEAT_SECONDS,
+        max_seconds=Config.STREAM_MAX_SECONDS
+    )
+    return app.response_class(frames, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/events', methods=['POST'])
+@require_role('admin', message='Admin access required - login as admin@example.com/admin123')
 def create_event():
-    """➕ CREATE EVENT - FIXED DEBUG VERSION"""
+    """➕ CREATE EVENT"""
     try:
-        print("\n" + "="*60)
-        print("🚀 CREATE EVENT DEBUG START")
-        print("="*60)
-        
-        # 🔍 1. CHECK INCOMING REQUEST
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        print(f"🔍 TOKEN: {token[:30] if token else '❌ MISSING'}...")
-        print(f"📡 Content-Type: {request.content_type}")
-        
-        # 2. VALIDATE ADMIN TOKEN
-        if not token or not token.startswith('admin-'):
-            print("❌ BLOCKED: Invalid or missing admin token")
-            return jsonify({'error': 'Admin access required - login as admin@example.com/admin123'}), 403
-        
-        print("✅ TOKEN VALIDATED ✓")
-        
-        # 3. CHECK DATABASE
-        client = db.get_client()
-        if not client:
-            print("❌ BLOCKED: Database connection failed")
+        # 🔍 1. ADMIN TOKEN - verified by @require_role
+        # 2. CHECK DATABASE
+        storage = db.get_storage()
+        if not storage:
+            log(logger, logging.ERROR, 'create_event_rejected', reason='database unavailable')
             return jsonify({'error': 'Database unavailable - check Supabase'}), 503
-        print("✅ DATABASE CONNECTED ✓")
         
-        # 4. PARSE REQUEST DATA
+        # 3. PARSE REQUEST DATA
         data = request.get_json()
-        print(f"📥 RAW DATA RECEIVED: {data}")
-        
-        if not data:
-            print("❌ BLOCKED: No JSON data in request")
-            return jsonify({'error': 'No data sent from frontend'}), 400
+        log(logger, logging.DEBUG, 'create_event_payload', data=data)
         
-        # 5. VALIDATE FIELDS
-        required_fields = ['title', 'description', 'date', 'total_tickets']
-        missing = [f for f in required_fields if not data.get(f)]
-        if missing:
-            print(f"❌ BLOCKED: Missing fields: {missing}")
-            return jsonify({'error': f'Missing fields: {missing}'}), 400
-        
-        print("✅ DATA VALIDATED ✓")
-        
-        # 6. PREPARE EVENT
-        event_id = str(uuid.uuid4())[:8]
-        event = {
-            'id': event_id,
-            'title': str(data['title'])[:100],
-            'description': str(data['description'])[:500],
-            'date': str(data['date']),
-            'total_tickets': int(data['total_tickets']),
-            'created_at': datetime.now().isoformat()
-        }
-        print(f"📤 EVENT TO INSERT: {event}")
+        # 4. VALIDATE + PREPARE EVENT (same rules as the bulk import)
+        try:
+            event = build_event(data)
+        except EventValidationError as e:
+            log(logger, logging.INFO, 'create_event_rejected', reason=str(e))
+            return jsonify({'error': str(e)}), 400
+        event_id = event['id']
         
-        # 7. ATTEMPT DATABASE INSERT - ✅ FIXED
-        print("🔄 Attempting Supabase INSERT...")
-        result = client.table('events').insert(event).execute()
+        # 5. DATABASE INSERT
+        inserted = storage.insert_event(event)
         
-        # ✅ CORRECT: Use result.status or check result.data
-        print(f"✅ SUPABASE RESULT: data_length={len(result.data) if result.data else 0}")
-        print(f"✅ SUPABASE DATA: {result.data}")
+        events_cache.invalidate()
+        stats.event_created(event_id)
+        event_search.add([event])
+        availability.publish([(event_id, event['total_tickets'])])
         
-        print("="*60)
-        print("✅ EVENT CREATION SUCCESSFUL!")
-        print("="*60)
+        log(logger, logging.INFO, 'event_created', event_id=event_id, storage=storage.name)
         
         return jsonify({
             'message': 'Event created successfully!',
             'event_id': event_id,
-            'inserted_rows': len(result.data) if result.data else 0
+            'inserted_rows': len(inserted) if inserted else 0
         }), 201
         
     except KeyError as e:
-        print(f"💥 KEY ERROR: {e}")
         return jsonify({'error': f'Missing field: {e}'}), 400
         
     except ValueError as e:
-        print(f"💥 VALUE ERROR: {e}")
         return jsonify({'error': f'Invalid data type: {e}'}), 400
         
     except Exception as e:
-        print(f"💥 UNEXPECTED ERROR: {str(e)}")
-        print(traceback.format_exc())
+        log(logger, logging.ERROR, 'create_event_failed', exc_info=True)
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+# 📥 BULK IMPORT EVENTS - streamed CSV (header row) or JSONL body
+@app.route('/api/admin/events/import', methods=['POST'])
+@require_role('admin', message='Admin access required')
+def import_events_route():
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    fmt = detect_format(request.content_type, request.args.get('format'))
+    if not fmt:
+        return jsonify({'error': 'Send text/csv or application/x-ndjson (or ?format=csv|jsonl)'}), 415
+    
+    try:
+        batch_size = int(request.args.get('batch_size', Config.IMPORT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({'error': 'batch_size must be a number'}), 400
+    batch_size = max(1, min(batch_size, 5000))
+    
+    # request.stream is read incrementally - the upload is never buffered whole
+    report = import_events(storage, request.stream, fmt, batch_size=batch_size, on_insert=event_search.add)
+    
+    if report.inserted:
+        events_cache.invalidate()
+        for event_id, _ in report.created:
+            stats.event_created(event_id)
+        availability.publish(report.created)
+    
+    log(logger, logging.INFO, 'events_imported', rows=report.rows, inserted=report.inserted,
+        failed=report.failed, batch_size=batch_size, storage=storage.name)
+    return jsonify(report.to_dict()), 201 if report.inserted else 400
+
+# 📤 ATTENDEE EXPORT - streamed CSV or JSONL, one keyset page in memory at a time
+@app.route('/api/admin/events/<event_id>/attendees', methods=['GET'])
+@require_role('admin', message='Admin access required')
+def export_attendees_route(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in MIMETYPES:
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    
+    try:
+        chunks = export_attendees(storage, event_id, fmt, page_size=Config.EXPORT_PAGE_SIZE)
+    except Exception as e:
+        log(logger, logging.ERROR, 'attendee_export_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    filename = re.sub(r'[^\w\-]', '_', event_id)
+    return app.response_class(chunks, mimetype=MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="attendees-{filename}.{fmt}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+# 🗑️ DELETE EVENT
+@app.route('/api/events/<event_id>', methods=['DELETE'])
+@require_role('admin', message='Admin access required')
+def delete_event(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        storage.delete_event(event_id)
+        events_cache.invalidate()
+        stats.event_deleted(event_id)
+        rollups.forget(event_id)
+        event_search.remove(event_id)
+        seatmaps.forget(event_id)
+        if journal:
+            journal.forget(event_id)
+        availability.publish([(event_id, None)])
+        log(logger, logging.INFO, 'event_deleted', event_id=event_id)
+        return jsonify({'message': 'Event deleted successfully'}), 200
+    except Exception as e:
+        log(logger, logging.ERROR, 'delete_event_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+# 💺 SEAT MAP - admin lays out sections; total_tickets becomes the seat count
+@app.route('/api/events/<event_id>/seatmap', methods=['PUT'])
+@require_role('admin', message='Admin access required')
+def create_seat_map(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        counts = seatmaps.create(storage, event_id, request.get_json(silent=True))
+    except ReservationError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        log(logger, logging.ERROR, 'seat_map_create_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    events_cache.invalidate()
+    availability.publish([(event_id, counts['seats'])])
+    log(logger, logging.INFO, 'seat_map_created', event_id=event_id, seats=counts['seats'])
+    return jsonify(counts), 201
+
+# 💺 SEAT AVAILABILITY - layout + free-seat bitmaps
+@app.route('/api/events/<event_id>/seatmap', methods=['GET'])
+def get_seat_map(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        seat_map = seatmaps.get(storage, event_id)
+    except ReservationError as e:
+        return jsonify({'error': e.message}), e.status
+    response = jsonify(seat_map.availability())
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-# 🎫 REGISTER TICKETS - ✅ FIXED F-STRING
+# ⏳ HOLD SEATS - best adjacent block, kept for SEAT_HOLD_SECONDS
+@app.route('/api/events/<event_id>/seats/hold', methods=['POST'])
+def hold_seats(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'tickets is required'}), 400
+        held = seatmaps.hold(storage, event_id, parse_tickets(data.get('tickets')), data.get('section'))
+        return jsonify(held), 201
+    except ReservationError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        log(logger, logging.ERROR, 'seat_hold_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+# ✅ CONFIRM SEATS - held block -> booking, in one step with the ticket count
+@app.route('/api/events/<event_id>/seats/confirm', methods=['POST'])
+@idempotent(bookings_once, 'seats-confirm')
+def confirm_seats(event_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        data = request.get_json()
+        seats, remaining = seatmaps.confirm(storage, event_id, data['hold_id'], data['name'], data['email'])
+    except ReservationError as e:
+        if e.remaining is not None:
+            availability.publish([(event_id, e.remaining)])
+        return jsonify({'error': e.message}), e.status
+    except (KeyError, TypeError):
+        return jsonify({'error': 'hold_id, name and email are required'}), 400
+    except Exception as e:
+        log(logger, logging.ERROR, 'seat_confirm_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    tickets = len(seats['seats'])
+    events_cache.invalidate()
+    registrations_cache.invalidate(data['email'])
+    stats.booking(event_id, tickets)
+    rollups.record(event_id, tickets)
+    availability.publish([(event_id, remaining)])
+    log(logger, logging.DEBUG, 'seats_confirmed', event_id=event_id, tickets=tickets, remaining=remaining)
+    return jsonify({
+        'message': f'{tickets} seats booked for {data["name"]}! ',
+        'seats': seats,
+        'remaining': remaining
+    }), 201
+
+# ↩️ RELEASE HOLD - give the seats back before the hold runs out
+@app.route('/api/events/<event_id>/seats/hold/<hold_id>', methods=['DELETE'])
+def release_seats(event_id, hold_id):
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        released = seatmaps.release(storage, event_id, hold_id)
+    except ReservationError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        log(logger, logging.ERROR, 'seat_release_failed', event_id=event_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+    if not released:
+        return jsonify({'error': 'Hold expired or unknown'}), 404
+    return jsonify({'message': 'Seats released'}), 200
+
+def queue_response(spot):
+    """202 + place in line while waiting, 429 once sold out or the queue is full"""
+    if spot['state'] == WAITING:
+        response = jsonify({
+            'queued': True,
+            'queue_ticket': spot['ticket'],
+            'position': spot['position'],
+            'eta_seconds': spot['eta_seconds']
+        })
+        response.status_code = 202
+    elif spot['state'] == SOLD_OUT:
+        response = jsonify({'error': 'Sold out', 'sold_out': True})
+        response.status_code = 429
+    else:
+        response = jsonify({'error': 'Too many people are booking this event - please retry'})
+        response.status_code = 429
+    response.headers['Retry-After'] = str(spot.get('retry_after', 1))
+    return response
+
+# 🎫 REGISTER TICKETS - one atomic step (see Storage.reserve_tickets)
 @app.route('/api/tickets/register', methods=['POST'])
+@idempotent(bookings_once, 'register')
 def register_tickets():
-    client = db.get_client()
-    if not client:
+    storage = db.get_storage()
+    if not storage:
         return jsonify({'error': 'Database unavailable'}), 503
     
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    missing = [field for field in ('event_id', 'name', 'email') if not data.get(field)]
+    if missing:
+        return jsonify({'error': f'Missing required fields: {", ".join(missing)}'}), 400
+    
+    spot = None
     try:
-        data = request.get_json()
-        print(f"🎫 Registration: {data.get('name')} - {data['tickets']} tickets")
+        tickets = parse_tickets(data.get('tickets'))
         
-        # Verify event exists
-        event_resp = client.table('events').select('*').eq('id', data['event_id']).execute()
-        if not event_resp.data:
-            return jsonify({'error': 'Event not found'}), 404
+        # 🚦 Only a few bookings per event at once - the rest wait in line
+        if admission:
+            # only real events get a queue (one lookup per event, not per booking)
+            if not admission.tracks(data['event_id']) and not storage.event_exists(data['event_id']):
+                return jsonify({'error': 'Event not found'}), 404
+            spot = admission.enter(
+                data['event_id'], request.headers.get('X-Queue-Ticket') or data.get('queue_ticket')
+            )
+            if spot['state'] != ADMITTED:
+                return queue_response(spot)
+            started = time.perf_counter()
         
-        event = event_resp.data[0]
-        tickets = int(data['tickets'])
+        seats = None
+        journalled = False
+        if seatmaps.is_seated(storage, data['event_id']):
+            # 💺 reserved seating: best adjacent block, booked together with the count
+            seats, remaining = seatmaps.book_best(
+                storage, data['event_id'], tickets, data['name'], data['email']
+            )
+        elif journal:
+            # 📒 acknowledged once on local disk - the flusher writes it to the database
+            remaining = journal.book(storage, data['event_id'], tickets, data['name'], data['email'])
+            journalled = True
+        else:
+            remaining = storage.reserve_tickets(
+                data['event_id'], tickets, data['name'], data['email']
+            )
         
-        if event['total_tickets'] < tickets:
-            return jsonify({'error': f'Only {event["total_tickets"]} tickets available'}), 400
+        events_cache.invalidate()
+        registrations_cache.invalidate(data['email'])
+        stats.booking(data['event_id'], tickets)
+        if not journalled:
+            rollups.record(data['event_id'], tickets)   # journalled ones are counted when flushed
+        availability.publish([(data['event_id'], remaining)])
+        if admission and remaining == 0:
+            admission.mark_sold_out(data['event_id'])
         
-        # Create registration
-        registration = {
-            'name': data['name'],
-            'user_email': data['email'],
-            'event_id': data['event_id'],
-            'tickets': tickets,
-            'registered_at': datetime.now().isoformat()
+        log(logger, logging.DEBUG, 'tickets_registered', event_id=data['event_id'],
+            tickets=tickets, remaining=remaining)
+        body = {
+            'message': f'{tickets} tickets registered for {data["name"]}! ',
+            'remaining': remaining
         }
-        client.table('registrations').insert(registration).execute()
+        if seats:
+            body['seats'] = seats
+        return jsonify(body), 201
+        
+    except ReservationError as e:
+        if e.remaining is not None:
+            # whoever booked against a stale count gets corrected too
+            availability.publish([(data['event_id'], e.remaining)])
+        if admission and e.remaining == 0:
+            admission.mark_sold_out(data['event_id'])
+        return jsonify({'error': e.message}), e.status
+        
+    except Exception as e:
+        log(logger, logging.ERROR, 'registration_failed', error=str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    finally:
+        if spot and spot['state'] == ADMITTED:
+            admission.release(spot['ticket'], time.perf_counter() - started)
+
+# ⏳ QUEUE POSITION - cheap poll, no database call
+@app.route('/api/tickets/queue/<ticket>', methods=['GET'])
+def queue_status(ticket):
+    if not admission:
+        return jsonify({'state': ADMITTED}), 200
+    spot = admission.status(ticket)
+    if spot is None:
+        return jsonify({'error': 'Queue ticket expired - please book again'}), 404
+    if spot['state'] == ADMITTED:
+        return jsonify({'state': ADMITTED, 'queue_ticket': ticket}), 200
+    return queue_response(spot)
+
+# 🎟️ GROUP BOOKING - several events, all-or-nothing (see Storage.reserve_many)
+@app.route('/api/tickets/register-batch', methods=['POST'])
+@idempotent(bookings_once, 'register-batch')
+def register_tickets_batch():
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        data = request.get_json()
+        lines = data['lines'] if isinstance(data['lines'], list) else ()
+        seated = [line.get('event_id') for line in lines
+                  if isinstance(line, dict) and seatmaps.is_seated(storage, line.get('event_id'))]
+        if seated:
+            return jsonify({'error': 'Reserved-seating events must be booked one at a time',
+                            'seated': seated}), 400
+        results = storage.reserve_many(data['lines'], data['name'], data['email'])
+        
+        events_cache.invalidate()
+        registrations_cache.invalidate(data['email'])
+        for line in results:
+            stats.booking(line['event_id'], line['tickets'])
+            rollups.record(line['event_id'], line['tickets'])
+        availability.publish((line['event_id'], line['remaining']) for line in results)
         
-        # Update ticket count
-        client.table('events').update({
-            'total_tickets': event['total_tickets'] - tickets
-        }).eq('id', data['event_id']).execute()
+        booked = sum(line['tickets'] for line in results)
+        log(logger, logging.DEBUG, 'tickets_registered_batch', lines=len(results), tickets=booked)
+        return jsonify({
+            'message': f'{booked} tickets registered for {data["name"]} across {len(results)} events! ',
+            'results': results
+        }), 201
+        
+    except BatchReservationError as e:
+        return jsonify({'error': e.message, 'results': e.results}), e.status
         
-        print(f"✅ Registration complete: {data['name']}")
-        # ✅ FIXED: No single } at end
-        return jsonify({'message': f'{tickets} tickets registered for {data["name"]}! '}), 201
+    except ReservationError as e:
+        return jsonify({'error': e.message}), e.status
+        
+    except KeyError as e:
+        return jsonify({'error': f'Missing field: {e}'}), 400
         
     except Exception as e:
-        print(f"❌ Registration error: {e}")
+        log(logger, logging.ERROR, 'registration_failed', error=str(e))
         return jsonify({'error': str(e)}), 500
 
+# 🎟️ MY REGISTRATIONS - signed-in user's bookings, newest first, keyset paged
+@app.route('/api/me/registrations', methods=['GET'])
+@require_role('user', message='User login required')
+def my_registrations():
+    storage = db.get_storage()
+    if not storage:
+        return jsonify({'error': 'Database unavailable'}), 503
+    
+    try:
+        query = RegistrationQuery.from_args(g.auth['email'], request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def load():
+        # one query per page - the event title/date come joined in
+        return app.json.dumps(query.page(storage.user_registrations(query))).encode()
+    
+    try:
+        entry = registrations_cache.get(query.cache_key, load)
+    except Exception as e:
+        log(logger, logging.ERROR, 'registrations_load_failed', error=str(e))
+        return jsonify({'error': 'Could not load registrations'}), 500
+    
+    response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+# ⏱️ METRICS - Prometheus text format
+@app.route('/api/metrics')
+def metrics_endpoint():
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # 🩺 HEALTH CHECK
 @app.route('/api/health')
 def health_check():
+    # cached by the background prober - never waits on the database
+    health = db.health()
+    if health['ok'] is None:
+        database = '⏳ Checking'
+    else:
+        database = '✅ Connected' if health['ok'] else '❌ Failed'
     return jsonify({
         'status': '🟢 LIVE',
-        'database': '✅ Connected' if db.is_connected() else '❌ Failed',
+        'database': database,
+        'checked_at': health['checked_at'],
+        'latency_ms': health['latency_ms'],
+        'circuit': health['circuit'],
+        'journal': journal.status() if journal else None,
+        'rollups': rollups.status(),
+        'streaming': streaming_supported(),
+        'storage': Config.STORAGE_BACKEND,
         'supabase': Config.SUPABASE_URL,
         'admin': Config.ADMIN_EMAIL
     }), 200
 
 if __name__ == '__main__':
-    print("🚀 Event Ticket System - Production Ready")
-    print(f"🌐 Supabase: {Config.SUPABASE_URL}")
-    print(f"👤 Admin: {Config.ADMIN_EMAIL}")
+    log(logger, logging.INFO, 'starting', storage=Config.STORAGE_BACKEND,
+        supabase=Config.SUPABASE_URL, admin=Config.ADMIN_EMAIL)
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
 
 
@@ -0,0 +1,122 @@
+"""📥 Streaming bulk event import
+
+Reads a CSV (header row) or JSONL upload line by line straight off the
+request stream, validates each row with ``build_event`` - the same rules as
+``POST /api/events`` - and inserts valid rows ``batch_size`` at a time.
+Only the current batch and the error report are held in memory.
+"""
+import csv
+import io
+import json
+
+from validation import EventValidationError, build_event
+
+FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(content_type, requested=None):
+    """``?format=`` wins, otherwise sniff the Content-Type (None if unknown)"""
+    if requested:
+        requested = requested.lower()
+        return requested if requested in FORMATS else None
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type or 'json-lines' in content_type:
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(row_number, payload or None, error or None)`` without reading ahead"""
+    text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for number, row in enumerate(reader, start=1):
+            if None in row:
+                yield number, None, 'Too many columns'
+            else:
+                yield number, row, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(payload, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, payload, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.created = []
+        self.errors = []
+
+    def error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def import_events(storage, stream, fmt, batch_size=500, on_insert=None):
+    """Validate + insert every row of ``stream``, return an ``ImportReport``
+
+    ``on_insert(events)`` is called with each batch that made it in.
+    """
+    report = ImportReport()
+    batch = []
+
+    def flush():
+        events = [event for _, event in batch]
+        try:
+            storage.insert_events(events)
+        except Exception as e:
+            # one bad batch doesn't stop the import - its rows are reported
+            for row, _ in batch:
+                report.error(row, f'Insert failed: {e}')
+        else:
+            report.inserted += len(batch)
+            report.created.extend((event['id'], event['total_tickets']) for event in events)
+            if on_insert:
+                on_insert(events)
+        batch.clear()
+
+    try:
+        for row, payload, problem in iter_rows(stream, fmt):
+            report.rows += 1
+            if problem:
+                report.error(row, problem)
+                continue
+            try:
+                batch.append((row, build_event(payload)))
+            except EventValidationError as e:
+                report.error(row, str(e))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # unreadable input: keep what was already validated, stop here
+        report.error(report.rows + 1, f'Unreadable input: {e}')
+
+    if batch:
+        flush()
+    return report
@@ -0,0 +1,146 @@
+"""📦 Versioned read-through cache for hot JSON responses
+
+* Entries are stored pre-serialized (body bytes + ETag) so a hit costs a dict
+  lookup - no query, no jsonify.
+* ``invalidate()`` bumps the version; write paths call it after they commit.
+* Entries also expire after ``ttl`` seconds as a fallback for writes made
+  outside this process.
+* Concurrent misses for the same key are coalesced: one caller runs the
+  loader, the rest wait for its result (single flight).
+* ``scoped=True``: keys are tuples whose first item is a scope (e.g. a
+  user's email) and ``invalidate(scope)`` drops just that scope's entries.
+* ``channel`` (coherence.py): invalidations are announced to the other
+  workers, and every read first checks whether one of them announced a
+  write since - so a worker never serves a page another one changed.
+"""
+import hashlib
+import threading
+import time
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'version', 'expires', 'stamp')
+
+    def __init__(self, body, etag, version, expires, stamp=None):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        self.expires = expires
+        self.stamp = stamp      # shared scope version the body was loaded at
+
+
+class _Flight:
+    __slots__ = ('done', 'entry', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class QueryCache:
+    def __init__(self, ttl=30, max_entries=256, scoped=False, channel=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.scoped = scoped
+        self.channel = channel
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._flights = {}
+        self._by_scope = {}     # scope -> keys, when scoped
+        self._generation = 0    # bumped by every scoped invalidate
+        self._seen = None       # shared version this process has caught up with
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return a fresh ``CacheEntry`` for ``key``, calling ``loader()`` (-> bytes) on a miss"""
+        stamp = None
+        if self.channel is not None:
+            self._catch_up()
+            if self.scoped:
+                stamp = self.channel.version(key[0])
+        entry = self._entries.get(key)
+        if (entry is not None and entry.version == self.version and entry.expires > time.monotonic()
+                and entry.stamp == stamp):
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            self.hits += 1
+            return flight.entry
+
+        self.misses += 1
+        version, generation = self.version, self._generation
+        try:
+            body = loader()
+            etag = hashlib.sha1(body).hexdigest()
+            entry = CacheEntry(body, etag, version, time.monotonic() + self.ttl, stamp)
+            with self._lock:
+                # A write landed while we were loading - serve it once, don't keep it
+                if version == self.version and generation == self._generation:
+                    if len(self._entries) >= self.max_entries:
+                        # oldest insert goes first (dicts keep insertion order)
+                        self._discard(next(iter(self._entries)))
+                    self._entries[key] = entry
+                    if self.scoped:
+                        self._by_scope.setdefault(key[0], set()).add(key)
+            flight.entry = entry
+            return entry
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        if self.scoped:
+            keys = self._by_scope.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_scope[key[0]]
+
+    def _catch_up(self):
+        # another worker announced a write -> everything cached here may predate it
+        shared = self.channel.version()
+        if shared != self._seen:
+            with self._lock:
+                if shared != self._seen:
+                    self._seen = shared
+                    self._clear()
+
+    def _clear(self):
+        self.version += 1
+        self._entries.clear()
+        self._by_scope.clear()
+
+    def invalidate(self, scope=None):
+        """🔄 Drop every entry (or one scope's) - call after a write commits"""
+        with self._lock:
+            if scope is None:
+                self._clear()
+            else:
+                self._generation += 1
+                for key in self._by_scope.pop(scope, ()):
+                    self._entries.pop(key, None)
+        if self.channel is not None:
+            shared = self.channel.bump(scope)
+            if scope is None:
+                with self._lock:
+                    # our own announcement - nothing new to catch up with
+                    if shared == (self._seen or 0) + 1:
+                        self._seen = shared
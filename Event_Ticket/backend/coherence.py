@@ -0,0 +1,180 @@
+"""🔗 Cross-worker coherence over shared memory
+
+Every gunicorn worker keeps its own caches, so a write in one worker used
+to leave the others serving stale data until a TTL ran out. All workers
+now map one small file (``COHERENCE_PATH``) holding:
+
+* version counters - one per channel (``events``, ``stats``, ...) plus a
+  hashed table of per-scope counters (one user's bookings, one user's
+  credentials). A write path bumps the counter after it commits; a reader
+  compares it with the value it saw when it filled its cache - one 8-byte
+  read from the mapping, no syscall, no broker.
+* a ring of availability deltas, so an SSE subscriber connected to one
+  worker hears about bookings made in another (see livestream.py).
+
+Counters only go up, so a reader never mistakes a newer state for the one
+it cached; two scopes hashing to the same counter only cost an extra
+reload. Bumps and ring appends take an ``fcntl`` lock on the file for a
+few microseconds, reads take none - a ring slot is trusted only if its
+sequence number is the same before and after the read. Without ``fcntl``
+(Windows dev server: one process) the threading lock alone is enough.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b'COH1'
+CHANNELS = ('events', 'catalogue', 'registrations', 'users', 'stats', 'seatmaps')
+CHANNEL_SLOTS = 64
+SCOPE_SLOTS = 4096
+RING_SIZE = 1024
+MAX_ID_BYTES = 64
+
+_HEADER = struct.Struct('<4sIIIQ')      # magic, channel slots, scope slots, ring size, ring head
+_COUNTER = struct.Struct('<Q')
+_RECORD = struct.Struct('<QqIB64s3x')   # seq, remaining (-1 = deleted), pid, id length, id
+_HEAD_OFFSET = 16
+_COUNTERS = _HEADER.size
+_SCOPES = _COUNTERS + CHANNEL_SLOTS * _COUNTER.size
+_RING = _SCOPES + SCOPE_SLOTS * _COUNTER.size
+_SIZE = _RING + RING_SIZE * _RECORD.size
+
+
+class SharedState:
+    """The mapped file - opened on first use, i.e. after gunicorn has forked"""
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+        with self._lock:
+            if self._map is None or self._pid != os.getpid():
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                if fcntl is not None:
+                    fcntl.lockf(fd, fcntl.LOCK_EX)
+                try:
+                    header = os.pread(fd, _HEADER.size, 0) if hasattr(os, 'pread') else b''
+                    if (os.fstat(fd).st_size != _SIZE or len(header) < _HEADER.size
+                            or _HEADER.unpack(header)[:4] != (MAGIC, CHANNEL_SLOTS, SCOPE_SLOTS, RING_SIZE)):
+                        # first worker (or a layout change): start from zero
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, _SIZE)
+                        os.write(fd, _HEADER.pack(MAGIC, CHANNEL_SLOTS, SCOPE_SLOTS, RING_SIZE, 0))
+                finally:
+                    if fcntl is not None:
+                        fcntl.lockf(fd, fcntl.LOCK_UN)
+                self._fd = fd
+                self._map = mmap.mmap(fd, _SIZE)
+                self._pid = os.getpid()
+        return self._map
+
+    def _exclusive(self):
+        return _FileLock(self)
+
+    # 🔢 Version counters
+    @staticmethod
+    def _offset(channel, scope):
+        index = CHANNELS.index(channel)
+        if scope is None:
+            return _COUNTERS + index * _COUNTER.size
+        slot = zlib.crc32(f'{channel}:{scope}'.encode()) % SCOPE_SLOTS
+        return _SCOPES + slot * _COUNTER.size
+
+    def version(self, channel, scope=None):
+        return _COUNTER.unpack_from(self._open(), self._offset(channel, scope))[0]
+
+    def bump(self, channel, scope=None):
+        """Announce a committed write - returns the new version"""
+        mapped, offset = self._open(), self._offset(channel, scope)
+        with self._exclusive():
+            value = _COUNTER.unpack_from(mapped, offset)[0] + 1
+            _COUNTER.pack_into(mapped, offset, value)
+        return value
+
+    def channel(self, name):
+        return Channel(self, name)
+
+    # 📡 Availability ring
+    @property
+    def head(self):
+        return _COUNTER.unpack_from(self._open(), _HEAD_OFFSET)[0]
+
+    def publish(self, deltas):
+        """Append ``(event_id, remaining)`` deltas for the other workers"""
+        mapped, pid = self._open(), os.getpid()
+        with self._exclusive():
+            head = _COUNTER.unpack_from(mapped, _HEAD_OFFSET)[0]
+            for event_id, remaining in deltas:
+                raw = str(event_id).encode()
+                if len(raw) > MAX_ID_BYTES:
+                    continue    # can't be an id this app created
+                head += 1
+                offset = _RING + (head % RING_SIZE) * _RECORD.size
+                # seq 0 while the slot is half-written, readers skip it
+                _COUNTER.pack_into(mapped, offset, 0)
+                _RECORD.pack_into(mapped, offset, 0, -1 if remaining is None else remaining, pid, len(raw), raw)
+                _COUNTER.pack_into(mapped, offset, head)
+            _COUNTER.pack_into(mapped, _HEAD_OFFSET, head)
+
+    def since(self, seq):
+        """``(deltas from other processes after seq, head)`` - deltas is None if the ring lapped us"""
+        mapped, pid = self._open(), os.getpid()
+        head = _COUNTER.unpack_from(mapped, _HEAD_OFFSET)[0]
+        if head - seq > RING_SIZE:
+            return None, head
+        deltas = []
+        for position in range(seq + 1, head + 1):
+            offset = _RING + (position % RING_SIZE) * _RECORD.size
+            stamp, remaining, origin, length, raw = _RECORD.unpack_from(mapped, offset)
+            if stamp != position or _COUNTER.unpack_from(mapped, offset)[0] != position:
+                return None, head   # overwritten while we read
+            if origin != pid:
+                deltas.append((raw[:length].decode(), None if remaining < 0 else remaining))
+        return deltas, head
+
+
+class _FileLock:
+    """Threading lock + fcntl lock on the file: threads and processes both serialize"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __enter__(self):
+        self.state._lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(self.state._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.lockf(self.state._fd, fcntl.LOCK_UN)
+        self.state._lock.release()
+
+
+class Channel:
+    """One named counter (plus its scopes) - what the caches hold on to"""
+
+    def __init__(self, state, name):
+        if name not in CHANNELS:
+            raise ValueError(f'Unknown coherence channel {name}')
+        self.state = state
+        self.name = name
+
+    def version(self, scope=None):
+        return self.state.version(self.name, scope)
+
+    def bump(self, scope=None):
+        return self.state.bump(self.name, scope)
@@ -1,4 +1,36 @@
 import os
+import secrets
+
+
+def _secret_key(path):
+    """🔑 SECRET_KEY from the environment, else this host's generated key.
+
+    The first process to get here writes a random key to ``path`` (created
+    aside, then linked into place, so workers starting together all read
+    the same one); later starts reuse it, keeping issued tokens valid
+    across restarts. Several hosts must share one SECRET_KEY instead.
+    """
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        draft = f'{path}.{os.getpid()}'
+        fd = os.open(draft, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_urlsafe(48))
+        try:
+            os.link(draft, path)
+        except FileExistsError:
+            pass    # another worker won - use its key
+        finally:
+            os.unlink(draft)
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f'{path} is empty - delete it or set SECRET_KEY')
+    return key
+
 
 class Config:
     # ✅ YOUR REAL CREDENTIALS - ANON KEY (CORRECT)
@@ -9,4 +41,158 @@ class Config:
     ADMIN_EMAIL = "admin@example.com"
     ADMIN_PASSWORD = "admin123"
     
-    SECRET_KEY = "event-ticket-system-2026"
+    # 🔑 Signs session tokens - never a built-in default (anyone could forge
+    # admin tokens with it); unset -> a random key kept in SECRET_KEY_PATH
+    SECRET_KEY_PATH = os.environ.get(
+        'SECRET_KEY_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'secret_key')
+    )
+    SECRET_KEY = _secret_key(SECRET_KEY_PATH)
+    
+    # 🔐 Lifetime of signed session tokens (see tokens.py)
+    TOKEN_TTL_SECONDS = int(os.environ.get('TOKEN_TTL_SECONDS', 12 * 3600))
+    
+    # 🔑 Password hashing cost (PBKDF2 rounds), the pool it runs on and how
+    # many logins may wait for it before the rest get a 503
+    PASSWORD_ITERATIONS = int(os.environ.get('PASSWORD_ITERATIONS', 100_000))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+    
+    # 👤 Cached user credential records (see credentials.py)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10_000))
+    USER_CACHE_NEGATIVE_TTL = int(os.environ.get('USER_CACHE_NEGATIVE_TTL', 5))
+    
+    # 🚦 Booking admission queue: 'memory' (per worker) or 'sqlite' (shared by
+    # all workers on the host); concurrent bookings per event, seconds an
+    # admitted ticket is held, seconds a waiting ticket survives without a poll
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+    ADMISSION_STORE = os.environ.get('ADMISSION_STORE', 'memory')
+    ADMISSION_PATH = os.environ.get(
+        'ADMISSION_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'admission.db')
+    )
+    ADMISSION_CONCURRENCY = int(os.environ.get('ADMISSION_CONCURRENCY', 8))
+    ADMISSION_HOLD_SECONDS = int(os.environ.get('ADMISSION_HOLD_SECONDS', 30))
+    ADMISSION_IDLE_SECONDS = int(os.environ.get('ADMISSION_IDLE_SECONDS', 20))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 10_000))
+    ADMISSION_SOLD_OUT_SECONDS = int(os.environ.get('ADMISSION_SOLD_OUT_SECONDS', 60))
+    
+    # 📡 Live availability stream: on/off ('auto' = only where a worker can
+    # hold connections open - not gunicorn's sync worker, see gunicorn.conf.py),
+    # deltas kept for reconnects, heartbeat and max lifetime of one stream
+    # (seconds), concurrent subscribers per worker
+    STREAM_ENABLED = os.environ.get('STREAM_ENABLED', 'auto')
+    STREAM_BUFFER = int(os.environ.get('STREAM_BUFFER', 1024))
+    STREAM_HEARTBEAT_SECONDS = int(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+    STREAM_MAX_SECONDS = int(os.environ.get('STREAM_MAX_SECONDS', 300))
+    STREAM_MAX_SUBSCRIBERS = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 5000))
+    
+    # 🔁 Idempotency-Key results: seconds kept, max kept, seconds a duplicate
+    # waits for the first attempt
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 600))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10_000))
+    IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 30))
+    
+    # 🗂️ Re-read the frontend when files change (development only)
+    STATIC_AUTO_RELOAD = os.environ.get('STATIC_AUTO_RELOAD', '0') == '1'
+    
+    # 🎫 Booking engine: 'rpc' (reserve_tickets() SQL function) or 'cas'
+    RESERVATION_MODE = os.environ.get('RESERVATION_MODE', 'rpc')
+    
+    # 🩺 Database health: seconds between background pings, consecutive
+    # connection errors before routes fail fast with 503, seconds until retry
+    HEALTH_PROBE_SECONDS = int(os.environ.get('HEALTH_PROBE_SECONDS', 15))
+    DB_BREAKER_FAILURES = int(os.environ.get('DB_BREAKER_FAILURES', 3))
+    DB_BREAKER_COOLDOWN = int(os.environ.get('DB_BREAKER_COOLDOWN', 10))
+    
+    # 🗄️ Storage backend: 'supabase' (hosted) or 'sqlite' (local file)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'supabase')
+    SQLITE_PATH = os.environ.get(
+        'SQLITE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'event_tickets.db')
+    )
+    
+    # 📦 Seconds a cached event list may be served without a local write
+    EVENTS_CACHE_TTL = int(os.environ.get('EVENTS_CACHE_TTL', 30))
+    
+    # 🎟️ Seconds / pages a user's cached booking history is kept (a booking
+    # by that user drops it right away)
+    MY_REGISTRATIONS_CACHE_TTL = int(os.environ.get('MY_REGISTRATIONS_CACHE_TTL', 10))
+    MY_REGISTRATIONS_CACHE_SIZE = int(os.environ.get('MY_REGISTRATIONS_CACHE_SIZE', 4096))
+    
+    # 📒 Write-behind booking journal (journal.py, sql/booking_journal.sql):
+    # bookings are acknowledged once fsync'd to a local file and written to
+    # the database in bulk. Each worker leases tickets in blocks of
+    # JOURNAL_LEASE_SIZE and hands back blocks idle for JOURNAL_LEASE_IDLE
+    JOURNAL_ENABLED = os.environ.get('JOURNAL_ENABLED', '0') == '1'
+    JOURNAL_DIR = os.environ.get(
+        'JOURNAL_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'journal')
+    )
+    JOURNAL_LEASE_SIZE = int(os.environ.get('JOURNAL_LEASE_SIZE', 20))
+    JOURNAL_LEASE_IDLE = float(os.environ.get('JOURNAL_LEASE_IDLE', 5))
+    JOURNAL_FLUSH_MS = int(os.environ.get('JOURNAL_FLUSH_MS', 200))
+    
+    # 💺 Reserved seating: how long a seat hold lasts, how often the list of
+    # seated events is re-read for the booking route
+    SEAT_HOLD_SECONDS = int(os.environ.get('SEAT_HOLD_SECONDS', 120))
+    SEATED_REGISTRY_SECONDS = int(os.environ.get('SEATED_REGISTRY_SECONDS', 30))
+    
+    # 🔎 How often the event search index is re-read from the database
+    SEARCH_REFRESH_SECONDS = int(os.environ.get('SEARCH_REFRESH_SECONDS', 300))
+    
+    # 📊 How often running admin stats are recounted from the database
+    STATS_RECONCILE_SECONDS = int(os.environ.get('STATS_RECONCILE_SECONDS', 300))
+    
+    # 🔗 Cross-worker coherence: workers on one host share version counters
+    # and availability deltas through a small mapped file. A write in one
+    # worker invalidates the others' caches on their next read; stats and
+    # search reload at most every *_COHERENCE_SECONDS when another worker
+    # wrote; SSE streams poll the shared delta ring every COHERENCE_POLL_MS
+    COHERENCE_ENABLED = os.environ.get('COHERENCE_ENABLED', '1') == '1'
+    COHERENCE_PATH = os.environ.get(
+        'COHERENCE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'coherence.shm')
+    )
+    COHERENCE_POLL_MS = int(os.environ.get('COHERENCE_POLL_MS', 200))
+    STATS_COHERENCE_SECONDS = int(os.environ.get('STATS_COHERENCE_SECONDS', 10))
+    SEARCH_COHERENCE_SECONDS = int(os.environ.get('SEARCH_COHERENCE_SECONDS', 30))
+    
+    # 📈 Sales rollups (rollups.py, sql/sales_rollups.sql): per-minute booking
+    # counts are added to the minute/hour/day rows every ROLLUP_FLUSH_SECONDS;
+    # minute rows are kept ROLLUP_MINUTE_DAYS, hour rows ROLLUP_HOUR_DAYS
+    # (0 = forever), day rows forever
+    ROLLUP_FLUSH_SECONDS = int(os.environ.get('ROLLUP_FLUSH_SECONDS', 60))
+    ROLLUP_MINUTE_DAYS = int(os.environ.get('ROLLUP_MINUTE_DAYS', 2))
+    ROLLUP_HOUR_DAYS = int(os.environ.get('ROLLUP_HOUR_DAYS', 90))
+    
+    # 📝 Logging: DEBUG/INFO/WARNING/ERROR or OFF, 'json' or 'text'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    
+    # ⏱️ Request/database timings at /api/metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    
+    # 🔬 Request profiling (profiling.py): switched on at /api/admin/profiling
+    # or by sending a worker PROFILE_SIGNAL, off again after PROFILE_MAX_SECONDS.
+    # A PROFILE_SAMPLE_RATE fraction of requests runs under cProfile, and
+    # requests slower than PROFILE_SLOW_MS are captured from stack samples
+    # taken every PROFILE_INTERVAL_MS; PROFILE_DIR keeps the newest
+    # PROFILE_MAX_CAPTURES captures
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '0') == '1'
+    PROFILE_DIR = os.environ.get(
+        'PROFILE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'profiles')
+    )
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01))
+    PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 1000))
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_MAX_CAPTURES = int(os.environ.get('PROFILE_MAX_CAPTURES', 200))
+    PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', 3600))
+    PROFILE_SIGNAL = os.environ.get('PROFILE_SIGNAL', 'SIGUSR2')
+    
+    # 📥 Rows per insert when bulk importing events
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    
+    # 📤 Registrations fetched per page by the attendee export
+    EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', 1000))
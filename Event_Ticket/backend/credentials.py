@@ -0,0 +1,122 @@
+"""👤 Login hot path: cached credential records
+
+``CredentialStore`` keeps the most recently used user records in a bounded
+LRU so repeat logins skip the ``users`` lookup:
+
+* hits are served from memory, misses read through ``storage.get_user``
+* unknown emails are cached as missing for ``negative_ttl`` seconds
+* auto-registration and hash upgrades write through to the cache
+
+Records only ever gain a stronger hash, so a stale entry in another worker
+still verifies the same password. With a ``channel`` (coherence.py) a write
+also tells the other workers to drop their copy of that email.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from logs import get_logger, log
+from passwords import HasherBusy
+
+logger = get_logger('credentials')
+
+_MISSING = object()
+
+
+class CredentialStore:
+    def __init__(self, db, hasher, max_entries=10_000, negative_ttl=5, channel=None):
+        self.db = db
+        self.hasher = hasher
+        self.channel = channel
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # 📦 LRU
+    def _stamp(self, email):
+        return self.channel.version(email) if self.channel is not None else None
+
+    def _get(self, email):
+        stamp = self._stamp(email)
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            user, expires, loaded_at = entry
+            if (expires is not None and expires < time.monotonic()) or loaded_at != stamp:
+                del self._entries[email]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return user
+
+    def _put(self, email, user, stamp=None):
+        # unknown emails (user=None) are only trusted briefly
+        expires = time.monotonic() + self.negative_ttl if user is None else None
+        with self._lock:
+            self._entries[email] = (user, expires, stamp)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def _written(self, email, user):
+        """Cache our own write and announce it to the other workers"""
+        stamp = self.channel.bump(email) if self.channel is not None else None
+        self._put(email, user, stamp)
+
+    def lookup(self, email):
+        user = self._get(email)
+        if user is _MISSING:
+            # stamped before the read: a write announced meanwhile makes this entry stale
+            stamp = self._stamp(email)
+            user = self.db.get_storage().get_user(email)
+            self._put(email, user, stamp)
+        return user
+
+    # 🔑 Login
+    def login(self, email, password):
+        """``'created'`` for a new account, ``'ok'`` or ``'invalid'``"""
+        storage = self.db.get_storage()
+        user = self.lookup(email)
+
+        if user is None:
+            user = {
+                'email': email,
+                'password': self.hasher.hash(password),
+                'created_at': datetime.now().isoformat()
+            }
+            try:
+                storage.insert_user(user)
+            except Exception:
+                # another worker registered it since our (cached) miss
+                self.forget(email)
+                if self.lookup(email) is None:
+                    raise
+                return self.login(email, password)
+            self._written(email, user)
+            return 'created'
+
+        matches, needs_rehash = self.hasher.verify(password, user['password'])
+        if not matches:
+            return 'invalid'
+        if needs_rehash:
+            try:
+                user = {**user, 'password': self.hasher.hash(password)}
+                storage.update_user_password(email, user['password'])
+                self._written(email, user)
+            except HasherBusy:
+                pass    # upgraded on a quieter login
+            except Exception:
+                log(logger, logging.ERROR, 'password_rehash_failed', exc_info=True)
+        return 'ok'
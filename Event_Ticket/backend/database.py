@@ -1,41 +1,106 @@
-import supabase
+import logging
+import threading
 from config import Config
-import traceback
-from datetime import datetime
+from storage import SupabaseStorage, SQLiteStorage
+from health import CircuitBreaker, GuardedStorage, HealthProber
+from logs import get_logger, log
+
+logger = get_logger('database')
 
 class DatabaseManager:
+    """🔗 Connects lazily - importing this module makes no network call.
+
+    ``get_storage()`` returns None while the circuit breaker is open, so
+    routes fail fast with 503 (see health.py).
+    """
     def __init__(self):
         self.client = None
-        self._connect()
+        self.storage = None
+        self.breaker = CircuitBreaker(Config.DB_BREAKER_FAILURES, Config.DB_BREAKER_COOLDOWN)
+        self.prober = HealthProber(self._probe, self.breaker, interval=Config.HEALTH_PROBE_SECONDS)
+        self._wrappers = []
+        self._raw = None
+        self._connected = False
+        self._lock = threading.Lock()
+    
+    def wrap_storage(self, wrapper):
+        """Apply ``wrapper(storage)`` to the storage once it is connected"""
+        self._wrappers.append(wrapper)
+        if self.storage is not None:
+            self.storage = wrapper(self.storage)
+    
+    def _ensure_connected(self):
+        if self._connected:
+            return
+        with self._lock:
+            if self._connected:
+                return
+            self._connect()
+            if self._raw is None:
+                self.breaker.failure()
+                return
+            storage = GuardedStorage(self._raw, self.breaker)
+            for wrapper in self._wrappers:
+                storage = wrapper(storage)
+            self.storage = storage
+            self._connected = True
     
     def _connect(self):
-        """🔗 Connect using YOUR real credentials"""
+        """🔗 Connect the configured storage backend"""
+        if Config.STORAGE_BACKEND == 'sqlite':
+            self._connect_sqlite()
+        else:
+            self._connect_supabase()
+    
+    def _connect_supabase(self):
+        """🔗 Connect using YOUR real credentials (no round trip - the prober checks the tables)"""
         try:
+            import supabase
             self.client = supabase.create_client(
                 Config.SUPABASE_URL,
                 Config.SUPABASE_KEY
             )
-            print("✅ Supabase connected with your credentials!")
-            self._test_tables()
-        except Exception as e:
-            print(f"❌ Supabase connection failed: {e}")
-            print(traceback.format_exc())
+            self._raw = SupabaseStorage(self.client, reservation_mode=Config.RESERVATION_MODE)
+            log(logger, logging.INFO, 'supabase_connected')
+        except Exception:
+            log(logger, logging.ERROR, 'supabase_connection_failed', exc_info=True)
             self.client = None
+            self._raw = None
     
-    def _test_tables(self):
-        """🔍 Verify tables exist"""
+    def _connect_sqlite(self):
+        """💾 Local SQLite file - schema and indexes are created on first use"""
         try:
-            # Test events table
-            self.client.table('events').select('count').limit(1).execute()
-            print("✅ Events table ready")
-        except:
-            print("⚠️  Create tables in Supabase SQL Editor")
+            self._raw = SQLiteStorage(Config.SQLITE_PATH)
+            log(logger, logging.INFO, 'sqlite_ready', path=Config.SQLITE_PATH)
+        except Exception:
+            log(logger, logging.ERROR, 'sqlite_storage_failed', exc_info=True)
+            self._raw = None
+    
+    def _probe(self):
+        """🔍 One cheap round trip (also verifies the events table exists)"""
+        self._ensure_connected()
+        if self._raw is None:
+            raise ConnectionError(f'{Config.STORAGE_BACKEND} storage not connected')
+        self._raw.ping()
     
     def get_client(self):
+        self._ensure_connected()
         return self.client
     
+    def get_storage(self):
+        self.prober.start()
+        if not self.breaker.allow():
+            return None
+        self._ensure_connected()
+        return self.storage
+    
+    def health(self):
+        """Last probe result + breaker state - never blocks on the database"""
+        self.prober.start()
+        return {**self.prober.status, 'circuit': self.breaker.state}
+    
     def is_connected(self):
-        return self.client is not None
+        return self.prober.status['ok'] is True
 
-# Global database instance
+# Global database instance - connects on first use
 db = DatabaseManager()
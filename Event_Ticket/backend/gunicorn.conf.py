@@ -0,0 +1,28 @@
+"""🦄 Production gunicorn settings - read automatically by ``gunicorn app:app``
+when started from this directory.
+
+The live availability stream (/api/events/stream) keeps a connection open
+for up to STREAM_MAX_SECONDS. Under the default sync worker one browser tab
+pins a whole worker and the worker timeout kills the stream, so run threaded
+workers: every open stream costs one parked thread, everything else shares
+the rest. With ``pip install gevent`` and GUNICORN_WORKER_CLASS=gevent a
+stream costs a greenlet instead.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# streams + in-flight requests per worker (gthread)
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# gevent: open connections per worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+# worker liveness check - open streams don't count against it under gthread/gevent
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+if worker_class == 'gthread' and 'STREAM_MAX_SUBSCRIBERS' not in os.environ:
+    # at most half the threads on streams - the rest keep serving bookings
+    raw_env = [f'STREAM_MAX_SUBSCRIBERS={max(1, threads // 2)}']
@@ -0,0 +1,148 @@
+"""🩺 Database health: circuit breaker + background prober
+
+* ``CircuitBreaker`` - after ``failures`` consecutive connection errors the
+  circuit opens and ``DatabaseManager.get_storage()`` returns None, so routes
+  answer 503 immediately instead of each waiting on a timeout. After
+  ``cooldown`` seconds one trial request is let through (half-open); its
+  outcome closes or re-opens the circuit.
+* ``GuardedStorage`` - reports every storage call's outcome to the breaker.
+  Only transport-level errors count; the database answering "no" (a
+  ``ReservationError``, a constraint violation) is a success.
+* ``HealthProber`` - pings the database every ``interval`` seconds on a
+  daemon thread and caches the result for ``/api/health``.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from logs import get_logger, log
+
+logger = get_logger('health')
+
+TRANSIENT_ERRORS = (OSError, TimeoutError, sqlite3.OperationalError)
+try:
+    import httpx
+    TRANSIENT_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, failures=3, cooldown=10):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may use the database right now"""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.trial_at = now
+                return True
+            # a trial that never reported back doesn't block forever
+            if self.state == HALF_OPEN and now - self.trial_at >= self.cooldown:
+                self.trial_at = now
+                return True
+            return self.state == CLOSED
+
+    def success(self):
+        if self.state == CLOSED and not self.consecutive:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                log(logger, logging.INFO, 'db_circuit_closed')
+            self.state = CLOSED
+            self.consecutive = 0
+
+    def failure(self):
+        with self._lock:
+            self.consecutive += 1
+            if self.state == HALF_OPEN or self.consecutive >= self.failures:
+                if self.state != OPEN:
+                    log(logger, logging.WARNING, 'db_circuit_open', failures=self.consecutive)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class GuardedStorage:
+    """Reports each storage call's outcome to the breaker"""
+
+    def __init__(self, inner, breaker):
+        self.inner = inner
+        self.breaker = breaker
+        self.name = inner.name
+
+    def __getattr__(self, attr):
+        value = getattr(self.inner, attr)
+        if not callable(value) or attr.startswith('_'):
+            return value
+
+        def guarded(*args, **kwargs):
+            try:
+                result = value(*args, **kwargs)
+            except TRANSIENT_ERRORS:
+                self.breaker.failure()
+                raise
+            self.breaker.success()
+            return result
+        return guarded
+
+
+class HealthProber:
+    def __init__(self, probe, breaker, interval=15):
+        self.probe = probe
+        self.breaker = breaker
+        self.interval = interval
+        self.status = {'ok': None, 'checked_at': None, 'latency_ms': None, 'error': None}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # started on first use, i.e. after gunicorn has forked the worker
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='db-health', daemon=True)
+            self._thread.start()
+
+    def check(self):
+        started = time.perf_counter()
+        try:
+            self.probe()
+        except Exception as e:
+            self.breaker.failure()
+            ok, error = False, str(e)
+        else:
+            self.breaker.success()
+            ok, error = True, None
+        self.status = {
+            'ok': ok,
+            'checked_at': datetime.now().isoformat(),
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'error': error
+        }
+        return self.status
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                log(logger, logging.ERROR, 'health_probe_failed', exc_info=True)
+            time.sleep(self.interval)
@@ -0,0 +1,149 @@
+"""🔁 Idempotency keys for booking requests
+
+A client sends ``Idempotency-Key: <uuid>`` (MCP: ``idempotency_key``) and may
+then retry or double-submit freely:
+
+* the first request with a key runs and its response is kept for ``ttl``
+  seconds (bounded to ``max_entries``, oldest evicted first)
+* a repeat gets that stored response back without touching the database
+* a duplicate arriving while the first is still running waits for it
+  instead of booking in parallel
+* reusing a key with a different body is rejected (422)
+
+Responses that did not settle anything - queued (202), busy (409, 429) or
+server errors - are not kept, so retrying them really retries. The store
+is per process; a retry that lands on another worker is not deduplicated.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """Same key, different request"""
+
+
+class IdempotencyTimeout(Exception):
+    """The first attempt with this key is still running"""
+
+
+class _InFlight:
+    __slots__ = ('fingerprint', 'done')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl=600, max_entries=10_000, wait_seconds=30):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_seconds = wait_seconds
+        self.replays = 0
+        self._results = OrderedDict()   # key -> (fingerprint, result, expires)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fingerprint, fn, keep=lambda result: True):
+        """``(result, replayed)`` - runs ``fn()`` at most once per key"""
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            with self._lock:
+                stored = self._lookup(key)
+                if stored is not None:
+                    if stored[0] != fingerprint:
+                        raise IdempotencyConflict(key)
+                    self.replays += 1
+                    return stored[1], True
+                flight = self._in_flight.get(key)
+                if flight is None:
+                    flight = self._in_flight[key] = _InFlight(fingerprint)
+                    break
+                if flight.fingerprint != fingerprint:
+                    raise IdempotencyConflict(key)
+            # a duplicate: wait for the first attempt, then replay (or retry if it kept nothing)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not flight.done.wait(remaining):
+                raise IdempotencyTimeout(key)
+
+        result = None
+        try:
+            result = fn()
+            return result, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if result is not None and keep(result):
+                    self._store(key, fingerprint, result)
+            flight.done.set()
+
+    def _lookup(self, key):
+        stored = self._results.get(key)
+        if stored is None:
+            return None
+        if stored[2] < time.monotonic():
+            del self._results[key]
+            return None
+        return stored
+
+    def _store(self, key, fingerprint, result):
+        self._results[key] = (fingerprint, result, time.monotonic() + self.ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+
+def fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def settled(result):
+    """Keep responses that settled the request one way or the other"""
+    status = result[1]
+    return 200 <= status < 500 and status not in (202, 409, 429)
+
+
+def idempotent(store, scope):
+    """Route decorator: honour ``Idempotency-Key`` on this endpoint"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f'{HEADER} is too long'}), 400
+
+            def run_view():
+                response = current_app.make_response(view(*args, **kwargs))
+                return response.get_data(), response.status_code, response.mimetype, dict(response.headers)
+
+            try:
+                (body, status, mimetype, headers), replayed = store.run(
+                    f'{scope}:{key}', fingerprint(request.get_data()), run_view, keep=settled
+                )
+            except IdempotencyConflict:
+                return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+            except IdempotencyTimeout:
+                response = jsonify({'error': 'The original request is still in progress - retry shortly'})
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+
+            response = current_app.response_class(body, status=status, mimetype=mimetype)
+            for name in ('Retry-After', 'Location'):
+                if name in headers:
+                    response.headers[name] = headers[name]
+            if replayed:
+                response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        return wrapper
+    return decorator
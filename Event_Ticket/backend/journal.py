@@ -0,0 +1,502 @@
+"""📒 Write-behind booking journal
+
+With ``JOURNAL_ENABLED=1`` a booking no longer waits for the database:
+
+* each worker draws tickets from the database in blocks of ``lease_size`` -
+  one conditional decrement per block instead of one per booking - and
+  sells from that local allotment
+* a booking is appended to a local journal file and acknowledged once the
+  file is fsync'd. Concurrent bookings share one fsync (group commit):
+  whoever finds no sync running writes and syncs everything buffered, the
+  rest wait for it
+* a flusher thread inserts journalled bookings in bulk every
+  ``flush_interval`` seconds, tops allotments up before they run dry and
+  hands those that sat unused for ``lease_idle`` seconds back to the
+  database
+
+Tickets leave ``total_tickets`` when they are leased, so workers can never
+oversell each other - the database count only ever includes tickets
+nobody holds. Close to a sell-out a few tickets can sit in another
+worker's allotment until it goes idle.
+
+Recovery: on start a worker adopts every journal no running process holds
+(``flock``) and replays it - bookings not yet confirmed flushed are queued
+again, allotments are kept (or handed back, for extra journals left by
+workers that no longer exist). Registrations carry their journal id and are
+inserted ignore-duplicates, so replaying an already-flushed booking is
+harmless. A lease is journalled after the database gave it and a return
+before the database gets it back, so a crash in between can strand a few
+tickets but never sell them twice.
+
+Records are one JSON object per line behind a CRC32; a torn last line is
+cut off on replay.
+"""
+import glob
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:     # Windows: single process (dev server), no locking needed
+    fcntl = None
+
+from logs import get_logger, log
+from reservations import ReservationError
+
+logger = get_logger('journal')
+
+PATTERN = 'journal-*.log'
+LEASE_STRIPES = 64
+
+
+def _encode(record):
+    line = json.dumps(record, separators=(',', ':')).encode()
+    return b'%08x %s\n' % (zlib.crc32(line), line)
+
+
+def _decode(line):
+    """Record from one journal line, or None if it is torn or corrupt"""
+    crc, _, body = line.partition(b' ')
+    try:
+        if int(crc, 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _lock(handle):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _sync_dir(directory):
+    # makes a created/renamed file survive a crash (no-op where dirs can't be opened)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JournalFile:
+    """One append-only journal and the state replayed from it.
+
+    ``allotments`` - tickets leased from the database and not sold yet;
+    ``pending`` - booking records not yet in the database, in ``seq`` order.
+    Everything is guarded by ``lock``, which is also the condition group
+    commit waits on.
+    """
+
+    def __init__(self, path, handle):
+        self.path = path
+        self.allotments = {}
+        self.pending = deque()
+        self.seq = 0
+        self.durable = 0
+        self.size = 0
+        self.lock = threading.Condition()
+        self._handle = handle
+        self._buffer = []
+        self._syncing = False
+
+    @classmethod
+    def create(cls, directory):
+        while True:
+            path = os.path.join(directory, f'journal-{secrets.token_hex(6)}.log')
+            handle = os.fdopen(os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR | os.O_APPEND, 0o600), 'a+b')
+            if _lock(handle):
+                _sync_dir(directory)
+                return cls(path, handle)
+            # another process adopted it as an orphan before we locked it - it's empty, let it be
+            handle.close()
+
+    @classmethod
+    def adopt(cls, path):
+        """Lock and replay a journal left behind - None if a live process holds it"""
+        try:
+            handle = open(path, 'a+b')
+        except OSError:
+            return None
+        try:
+            if not _lock(handle) or os.fstat(handle.fileno()).st_ino != os.stat(path).st_ino:
+                # held, or replaced/removed since we opened it
+                handle.close()
+                return None
+        except OSError:
+            handle.close()
+            return None
+        journal = cls(path, handle)
+        journal._replay()
+        return journal
+
+    def _replay(self):
+        self._handle.seek(0)
+        data = self._handle.read()
+        flushed, books, good = 0, [], 0
+        allotments = defaultdict(int)
+        while good < len(data):
+            end = data.find(b'\n', good)
+            record = _decode(data[good:end]) if end != -1 else None
+            if record is None:
+                break
+            good = end + 1
+            self.seq = max(self.seq, record['seq'])
+            op = record['op']
+            if op == 'lease':
+                allotments[record['event_id']] += record['tickets']
+            elif op in ('book', 'return'):
+                allotments[record['event_id']] -= record['tickets']
+                if op == 'book':
+                    books.append(record)
+            elif op == 'flushed':
+                flushed = max(flushed, record['upto'])
+        if good < len(data):
+            log(logger, logging.WARNING, 'journal_tail_truncated', path=self.path, bytes=len(data) - good)
+            self._handle.truncate(good)
+            os.fsync(self._handle.fileno())
+        self.allotments = {event_id: tickets for event_id, tickets in allotments.items() if tickets > 0}
+        self.pending = deque(book for book in books if book['seq'] > flushed)
+        self.durable = self.seq
+        self.size = good
+
+    # ✍️ Appends (caller holds ``lock``)
+    def append(self, record):
+        self.seq += 1
+        record['seq'] = self.seq
+        line = _encode(record)
+        self._buffer.append(line)
+        self.size += len(line)
+        return self.seq
+
+    def sync(self, seq):
+        """Block until record ``seq`` is on disk - one fsync covers every waiter"""
+        with self.lock:
+            while self.durable < seq:
+                if self._syncing:
+                    self.lock.wait()
+                    continue
+                self._syncing = True
+                data, upto = b''.join(self._buffer), self.seq
+                self._buffer.clear()
+                self.lock.release()
+                written = False
+                try:
+                    self._handle.write(data)
+                    self._handle.flush()
+                    os.fsync(self._handle.fileno())
+                    written = True
+                finally:
+                    self.lock.acquire()
+                    self._syncing = False
+                    if written:
+                        self.durable = upto
+                    self.lock.notify_all()
+
+    def durable_pending(self, limit):
+        with self.lock:
+            batch = []
+            for record in self.pending:
+                if record['seq'] > self.durable or len(batch) >= limit:
+                    break
+                batch.append(record)
+            return batch
+
+    def empty(self):
+        with self.lock:
+            return not self.pending and not self.allotments
+
+    # 🗜️ Compaction
+    def compact(self):
+        """Rewrite the file as just the open allotments and pending bookings"""
+        with self.lock:
+            if self._syncing:
+                return False
+            leased = defaultdict(int, self.allotments)
+            for record in self.pending:
+                leased[record['event_id']] += record['tickets']
+            records = [{'op': 'lease', 'event_id': event_id, 'tickets': tickets}
+                       for event_id, tickets in leased.items()]
+            # numbering continues, so anyone waiting on an older seq is released
+            for record in records + list(self.pending):
+                self.seq += 1
+                record['seq'] = self.seq
+            data = b''.join(_encode(record) for record in records + list(self.pending))
+
+            temporary = self.path + '.tmp'
+            handle = open(temporary, 'w+b')
+            try:
+                # locked before it takes the journal's name - the lock travels with the file
+                _lock(handle)
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+                os.replace(temporary, self.path)
+            except Exception:
+                handle.close()
+                raise
+            _sync_dir(os.path.dirname(self.path))
+            self._handle.close()
+            self._handle = handle
+            self._buffer.clear()
+            self.durable = self.seq
+            self.size = len(data)
+            self.lock.notify_all()
+            return True
+
+    def remove(self):
+        with self.lock:
+            os.remove(self.path)
+            self._handle.close()
+
+
+class BookingJournal:
+    def __init__(self, db, directory, lease_size=20, lease_idle=5.0, flush_interval=0.2,
+                 flush_batch=500, max_bytes=8 << 20, on_flush=None):
+        self.db = db
+        self.directory = directory
+        self.lease_size = lease_size
+        self.lease_idle = lease_idle
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_bytes = max_bytes
+        self.on_flush = on_flush
+        self.active = None
+        self.draining = []
+        self.flushed = 0
+        self.leases = 0
+        self._last_used = {}
+        self._db_remaining = {}
+        self._low = set()
+        self._lease_locks = [threading.Lock() for _ in range(LEASE_STRIPES)]
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        # started on first use, i.e. after gunicorn has forked the worker
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._open()
+            self._thread = threading.Thread(target=self._run, name='journal-flush', daemon=True)
+            self._thread.start()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        adopted = [journal for journal in map(JournalFile.adopt, sorted(glob.glob(os.path.join(self.directory, PATTERN))))
+                   if journal is not None]
+        # keep the busiest one (its allotments stay in use), drain the rest
+        adopted.sort(key=lambda journal: sum(journal.allotments.values()), reverse=True)
+        self.active = adopted[0] if adopted else JournalFile.create(self.directory)
+        self.draining = adopted[1:]
+        if adopted:
+            log(logger, logging.INFO, 'journal_recovered',
+                files=len(adopted),
+                pending=sum(len(journal.pending) for journal in adopted),
+                allotted=sum(sum(journal.allotments.values()) for journal in adopted))
+
+    # 🎫 Booking
+    def book(self, storage, event_id, tickets, name, email):
+        """Sell from the local allotment, journal it, return once it is durable"""
+        tickets = int(tickets)
+        if tickets <= 0:
+            raise ReservationError('Tickets must be a positive number')
+        self.start()
+        journal = self.active
+        while True:
+            with journal.lock:
+                have = journal.allotments.get(event_id, 0)
+                if have >= tickets:
+                    journal.allotments[event_id] = have - tickets
+                    record = {
+                        'op': 'book', 'id': secrets.token_hex(12), 'event_id': event_id, 'tickets': tickets,
+                        'name': name, 'email': email, 'at': datetime.now().isoformat()
+                    }
+                    seq = journal.append(record)
+                    journal.pending.append(record)
+                    self._last_used[event_id] = time.monotonic()
+                    remaining = have - tickets + self._db_remaining.get(event_id, 0)
+                    low = have - tickets < self.lease_size // 4 and self._db_remaining.get(event_id)
+                    break
+            self._lease(storage, journal, event_id, tickets)
+        if low:
+            # top up in the background before the next booking has to wait for it
+            self._low.add(event_id)
+            self._wake.set()
+        journal.sync(seq)
+        if len(journal.pending) >= self.flush_batch:
+            self._wake.set()
+        return remaining
+
+    def _lease(self, storage, journal, event_id, tickets):
+        """Top the allotment up from the database - raises if it can't cover ``tickets``"""
+        with self._lease_locks[hash(event_id) % LEASE_STRIPES]:
+            with journal.lock:
+                have = journal.allotments.get(event_id, 0)
+            if have >= tickets:
+                return      # someone else topped it up meanwhile
+            taken, remaining = storage.lease_tickets(event_id, max(self.lease_size, tickets - have))
+            with journal.lock:
+                self._db_remaining[event_id] = remaining
+                if taken:
+                    journal.allotments[event_id] = journal.allotments.get(event_id, 0) + taken
+                    journal.append({'op': 'lease', 'event_id': event_id, 'tickets': taken})
+                    self.leases += 1
+                have = journal.allotments.get(event_id, 0)
+            # no sync needed: a booking drawing on this lease is synced after it
+        if have < tickets:
+            raise ReservationError(f'Only {have + remaining} tickets available', remaining=have + remaining)
+
+    def forget(self, event_id):
+        """Event deleted - its allotment went with it"""
+        journal = self.active
+        if journal is not None:
+            with journal.lock:
+                tickets = journal.allotments.pop(event_id, 0)
+                if tickets:
+                    journal.append({'op': 'return', 'event_id': event_id, 'tickets': tickets})
+        self._db_remaining.pop(event_id, None)
+        self._last_used.pop(event_id, None)
+
+    # 🚚 Flushing
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log(logger, logging.ERROR, 'journal_flush_failed', exc_info=True)
+
+    def flush(self):
+        """Write journalled bookings to the database, hand idle allotments back"""
+        storage = self.db.get_storage()
+        if storage is None:
+            return 0
+        while self._low:
+            event_id = self._low.pop()
+            try:
+                self._lease(storage, self.active, event_id, self.lease_size // 4 + 1)
+            except ReservationError:
+                pass
+        written = 0
+        for journal in [self.active, *self.draining]:
+            while True:
+                count = self._flush(storage, journal)
+                written += count
+                if count < self.flush_batch:
+                    break
+            self._return(storage, journal, idle=0 if journal is not self.active else self.lease_idle)
+        for journal in list(self.draining):
+            if journal.empty():
+                journal.remove()
+                self.draining.remove(journal)
+                log(logger, logging.INFO, 'journal_drained', path=journal.path)
+        if self.active.size > self.max_bytes:
+            self.active.compact()
+        return written
+
+    def _flush(self, storage, journal):
+        batch = journal.durable_pending(self.flush_batch)
+        if not batch:
+            return 0
+        rows = [{
+            'journal_id': record['id'],
+            'name': record['name'],
+            'user_email': record['email'],
+            'event_id': record['event_id'],
+            'tickets': record['tickets'],
+            'registered_at': record['at']
+        } for record in batch]
+        try:
+            storage.insert_registrations(rows)
+        except Exception as e:
+            if not _rejected(e):
+                raise
+            self._insert_one_by_one(storage, rows)
+        with journal.lock:
+            for _ in batch:
+                journal.pending.popleft()
+            journal.append({'op': 'flushed', 'upto': batch[-1]['seq']})
+            seq = journal.seq
+        journal.sync(seq)
+        self.flushed += len(batch)
+        if self.on_flush:
+            self.on_flush(batch)
+        return len(batch)
+
+    @staticmethod
+    def _insert_one_by_one(storage, rows):
+        # one bad row (e.g. its event was deleted) must not hold up the rest forever
+        for row in rows:
+            try:
+                storage.insert_registrations([row])
+            except Exception as e:
+                if not _rejected(e):
+                    raise
+                log(logger, logging.ERROR, 'journal_booking_rejected', **row, error=str(e))
+
+    def _return(self, storage, journal, idle):
+        now = time.monotonic()
+        with journal.lock:
+            candidates = [event_id for event_id, tickets in journal.allotments.items()
+                          if tickets and now - self._last_used.get(event_id, 0) >= idle]
+        for event_id in candidates:
+            with self._lease_locks[hash(event_id) % LEASE_STRIPES]:
+                with journal.lock:
+                    tickets = journal.allotments.get(event_id, 0)
+                    if not tickets or time.monotonic() - self._last_used.get(event_id, 0) < idle:
+                        continue
+                    del journal.allotments[event_id]
+                    seq = journal.append({'op': 'return', 'event_id': event_id, 'tickets': tickets})
+                # journal first: a crash from here on strands the tickets instead of returning them twice
+                journal.sync(seq)
+                try:
+                    remaining = storage.return_tickets(event_id, tickets)
+                except Exception:
+                    with journal.lock:
+                        journal.allotments[event_id] = journal.allotments.get(event_id, 0) + tickets
+                        journal.append({'op': 'lease', 'event_id': event_id, 'tickets': tickets})
+                    raise
+                with journal.lock:
+                    if remaining is None:
+                        self._db_remaining.pop(event_id, None)
+                    else:
+                        self._db_remaining[event_id] = remaining
+
+    def status(self):
+        self.start()
+        journals = [self.active, *self.draining]
+        return {
+            'pending': sum(len(journal.pending) for journal in journals),
+            'allotted': sum(sum(journal.allotments.values()) for journal in journals),
+            'flushed': self.flushed,
+            'leases': self.leases,
+            'draining': len(self.draining),
+            'bytes': self.active.size
+        }
+
+
+def _rejected(e):
+    """The database refused the rows (integrity error), as opposed to being unreachable"""
+    return str(getattr(e, 'code', '') or '').startswith('23')
@@ -0,0 +1,165 @@
+"""📡 Live ticket availability over Server-Sent Events
+
+Write paths publish compact ``(event_id, remaining)`` deltas (``remaining`` is
+None for a deleted event) into ``AvailabilityHub``, a per-process ring buffer
+with a sequence number. Subscribers keep no queue of their own: each one
+remembers the last sequence it sent and sleeps on one shared
+``threading.Condition``, so an idle subscriber costs a parked thread and
+nothing else. Waking thousands of them is O(subscribers), so a notifier
+thread does it - ``publish()`` itself is O(1) for the request that commits.
+
+With ``shared`` (coherence.py) every delta is also written to the ring in
+the shared mapping, and the notifier polls it every ``poll_interval``
+seconds for deltas published by other workers, copying them into the local
+buffer - a subscriber hears about every booking whichever worker took it.
+
+Stream ids are ``<epoch>.<seq>``; EventSource sends the last one back as
+``Last-Event-ID`` when it reconnects and the stream resumes from there. If
+that position has fallen out of the buffer (or belongs to another process)
+the client gets a ``reset`` event and should re-fetch the list.
+
+Each stream ends after ``max_seconds`` - the browser reconnects on its own -
+so long-lived connections don't pin worker threads forever. A stream holds
+a thread for its whole life, so it needs a threaded or async gunicorn
+worker (``gunicorn.conf.py`` ships gthread); under the sync worker the
+route refuses to stream and ``/api/health`` reports ``streaming: false``,
+which the frontend checks before subscribing.
+"""
+import itertools
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import deque
+
+from logs import get_logger, log
+
+logger = get_logger('livestream')
+
+
+class AvailabilityHub:
+    def __init__(self, buffer_size=1024, max_subscribers=5000, shared=None, poll_interval=0.2):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending = threading.Event()
+        self._notifier = None
+        self.shared = shared
+        self.poll_interval = poll_interval
+        self._ring_seq = None   # last shared ring position copied in
+
+    def publish(self, deltas):
+        """``deltas`` - iterable of ``(event_id, remaining)``"""
+        deltas = list(deltas)
+        self._append(deltas)
+        if self.shared is not None:
+            self.shared.publish(deltas)
+
+    def _append(self, deltas):
+        with self._lock:
+            for event_id, remaining in deltas:
+                self.seq += 1
+                self._buffer.append((self.seq, event_id, remaining))
+        # one waiter (the notifier) - cheap for the publishing request
+        self._pending.set()
+
+    def _pull(self):
+        """Copy other workers' deltas from the shared ring into the buffer"""
+        deltas, self._ring_seq = self.shared.since(self._ring_seq)
+        if deltas is None:
+            # fell more than a ring behind: make every subscriber re-fetch
+            with self._lock:
+                self._buffer.clear()
+                self.seq += 1
+            self._pending.set()
+        elif deltas:
+            self._append(deltas)
+
+    def _notify_loop(self):
+        while True:
+            if self.shared is None:
+                self._pending.wait()
+            else:
+                self._pending.wait(self.poll_interval)
+                try:
+                    self._pull()
+                except Exception:
+                    log(logger, logging.ERROR, 'sse_ring_poll_failed', exc_info=True)
+                if not self._pending.is_set():
+                    continue
+            self._pending.clear()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _ensure_notifier(self):
+        if self._notifier is not None:
+            return
+        with self._lock:
+            if self._notifier is None:
+                if self.shared is not None:
+                    self._ring_seq = self.shared.head
+                self._notifier = threading.Thread(target=self._notify_loop, name='sse-notify', daemon=True)
+                self._notifier.start()
+
+    def _since(self, seq):
+        """Deltas after ``seq`` (latest per event) or None if they're gone"""
+        if seq >= self.seq:
+            return {}
+        oldest = self._buffer[0][0] if self._buffer else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        latest = {}
+        for _, event_id, remaining in itertools.islice(self._buffer, seq - oldest + 1, None):
+            latest[event_id] = remaining
+        return latest
+
+    def wait(self, seq, timeout):
+        """Block until something newer than ``seq`` is published (or timeout)"""
+        with self._cond:
+            if self.seq == seq:
+                self._cond.wait(timeout)
+        with self._lock:
+            return self._since(seq), self.seq
+
+    def resume_point(self, last_event_id):
+        """Sequence to continue from for a ``Last-Event-ID`` (None = reset)"""
+        if not last_event_id:
+            return self.seq
+        epoch, _, seq = last_event_id.partition('.')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def stream(self, last_event_id=None, heartbeat=15, max_seconds=300):
+        """Generator of SSE frames for one subscriber"""
+        self._ensure_notifier()
+        with self._lock:
+            self.subscribers += 1
+        try:
+            yield 'retry: 3000\n\n'
+            seq = self.resume_point(last_event_id)
+            if seq is None:
+                seq = self.seq
+                yield f'id: {self.epoch}.{seq}\nevent: reset\ndata: {{}}\n\n'
+
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                latest, newest = self.wait(seq, heartbeat)
+                if latest is None:
+                    yield f'id: {self.epoch}.{newest}\nevent: reset\ndata: {{}}\n\n'
+                elif latest:
+                    data = json.dumps([[event_id, remaining] for event_id, remaining in latest.items()],
+                                      separators=(',', ':'))
+                    yield f'id: {self.epoch}.{newest}\nevent: availability\ndata: {data}\n\n'
+                else:
+                    # keeps proxies from timing out, finds dead connections
+                    yield ': ping\n\n'
+                seq = newest
+        finally:
+            with self._lock:
+                self.subscribers -= 1
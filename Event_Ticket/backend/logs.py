@@ -0,0 +1,93 @@
+"""📝 Leveled, buffered, structured logging
+
+Request threads only put records on an in-memory queue; a background
+``QueueListener`` formats them and writes to stdout. ``LOG_LEVEL`` sets the
+threshold (``OFF`` disables logging), ``LOG_FORMAT`` picks ``json`` lines or
+``text``. Log through ``log(logger, level, event, **fields)`` - it returns
+before building anything when the level is disabled; ``exc_info=True``
+attaches the current traceback.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import traceback
+
+from config import Config
+
+ROOT = 'event_tickets'
+_listener = None
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        pairs = ' '.join(f'{k}={v}' for k, v in fields.items())
+        return f'{self.formatTime(record)} {record.levelname:7s} {record.name} {record.getMessage()} {pairs}'.rstrip()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the stock handler folds the traceback into the message - keep it a field instead
+        record = copy.copy(record)
+        if record.exc_info:
+            record.fields = {**(getattr(record, 'fields', None) or {}),
+                             'traceback': ''.join(traceback.format_exception(*record.exc_info)).rstrip()}
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+def setup_logging(level='INFO', fmt='json'):
+    """Configure the ``event_tickets`` logger tree once per process"""
+    global _listener, _configured
+    logger = logging.getLogger(ROOT)
+    if _configured:
+        return logger
+    _configured = True
+
+    logger.propagate = False
+    if str(level).upper() == 'OFF':
+        # above CRITICAL: every isEnabledFor() check short-circuits
+        logger.setLevel(logging.CRITICAL + 1)
+        logger.addHandler(logging.NullHandler())
+        return logger
+    logger.setLevel(str(level).upper())
+
+    records = queue.SimpleQueue()
+    logger.addHandler(_QueueHandler(records))
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
+
+
+def get_logger(name):
+    setup_logging(Config.LOG_LEVEL, Config.LOG_FORMAT)
+    return logging.getLogger(f'{ROOT}.{name}')
+
+
+def log(logger, level, event, exc_info=False, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
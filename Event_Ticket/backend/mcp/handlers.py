@@ -0,0 +1,197 @@
+"""🛠️ MCP tool handlers
+
+The server keeps ONE long-lived Supabase client (its HTTP session pools the
+TLS connections) instead of building a new one per tool call. Storage calls
+are synchronous, so every query runs on a bounded thread pool - concurrent
+tool calls overlap instead of stalling the event loop.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from idempotency import IdempotencyConflict, IdempotencyStore, IdempotencyTimeout
+from pagination import EventQuery
+from reservations import BatchReservationError, ReservationError
+from rollups import SalesRollups
+from seatmap import SeatMaps
+from stats import StatsAggregator
+from storage import SupabaseStorage
+
+
+def supabase_client_factory():
+    from supabase import create_client
+    return create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+
+class SupabasePool:
+    """Shared client + bounded executor for blocking database calls"""
+
+    def __init__(self, client_factory=supabase_client_factory, max_workers=None):
+        self.client_factory = client_factory
+        self.max_workers = max_workers or int(os.getenv('MCP_DB_WORKERS', 8))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mcp-db')
+        self._storage = None
+        self._lock = threading.Lock()
+
+    def get_storage(self):
+        if self._storage is None:
+            with self._lock:
+                if self._storage is None:
+                    self._storage = SupabaseStorage(
+                        self.client_factory(), reservation_mode=os.getenv('RESERVATION_MODE', 'rpc')
+                    )
+        return self._storage
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def call(self, method, *args):
+        """Run ``storage.<method>(*args)`` on the pool"""
+        return await self.run(lambda: getattr(self.get_storage(), method)(*args))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class EventTicketTools:
+    def __init__(self, pool=None):
+        self.pool = pool or SupabasePool()
+        self.stats = StatsAggregator(self.pool, reconcile_interval=int(os.getenv('STATS_RECONCILE_SECONDS', 300)))
+        self.rollups = SalesRollups(self.pool, flush_interval=int(os.getenv('ROLLUP_FLUSH_SECONDS', 60)))
+        self.bookings_once = IdempotencyStore(ttl=int(os.getenv('IDEMPOTENCY_TTL', 600)))
+        self.seatmaps = SeatMaps(
+            hold_seconds=int(os.getenv('SEAT_HOLD_SECONDS', 120)),
+            registry_ttl=int(os.getenv('SEATED_REGISTRY_SECONDS', 30))
+        )
+
+    async def list_events(self, params: Dict[str, Any]) -> str:
+        """List all available events"""
+        events = await self.pool.call(
+            'list_events', EventQuery(fields=['id', 'title', 'date', 'total_tickets'])
+        )
+
+        event_list = []
+        for event in events:
+            event_list.append({
+                "id": event['id'],
+                "title": event['title'],
+                "date": event['date'],
+                "tickets_available": event['total_tickets']
+            })
+
+        return json.dumps({
+            "events": event_list,
+            "message": f"Found {len(events)} events"
+        })
+
+    async def create_event(self, params: Dict[str, Any]) -> str:
+        """Create new event (Admin only)"""
+        event_data = {
+            "id": str(uuid.uuid4()),
+            "title": params.get("title"),
+            "description": params.get("description", ""),
+            "date": params.get("date"),
+            "total_tickets": params.get("total_tickets", 100)
+        }
+
+        await self.pool.call('insert_event', event_data)
+        self.stats.event_created(event_data['id'])
+        return json.dumps({"message": f"Created event: {event_data['title']}"})
+
+    async def book_tickets(self, params: Dict[str, Any]) -> str:
+        """Book tickets for event - same atomic path as /api/tickets/register.
+
+        Pass ``idempotency_key`` to make retries safe: a repeat returns the
+        first result instead of booking again.
+        """
+        return await self._once('book', params, self._book_tickets)
+
+    async def _once(self, scope, params, book):
+        """Run ``book(params)`` on the pool, at most once per ``idempotency_key``"""
+        key = params.get('idempotency_key')
+        if not key:
+            return (await self.pool.run(book, params))[0]
+
+        request = {k: v for k, v in params.items() if k != 'idempotency_key'}
+        fingerprint = json.dumps(request, sort_keys=True, default=str).encode()
+        try:
+            # a busy event (409) didn't settle anything - don't pin that answer
+            result, _ = await self.pool.run(
+                self.bookings_once.run, f'{scope}:{key}', fingerprint, lambda: book(request),
+                lambda outcome: outcome[1]
+            )
+        except IdempotencyConflict:
+            return json.dumps({"error": "idempotency_key was already used for a different booking"})
+        except IdempotencyTimeout:
+            return json.dumps({"error": "The original booking is still in progress - retry shortly"})
+        return result[0]
+
+    def _book_tickets(self, params):
+        """``(json_result, settled)``"""
+        tickets = params.get('tickets', 1)
+        email = params['email']
+        storage = self.pool.get_storage()
+        seats = None
+        try:
+            if self.seatmaps.is_seated(storage, params['event_id']):
+                seats, remaining = self.seatmaps.book_best(
+                    storage, params['event_id'], tickets, params.get('name', email), email
+                )
+            else:
+                remaining = storage.reserve_tickets(params['event_id'], tickets, params.get('name', email), email)
+        except ReservationError as e:
+            return json.dumps({"error": e.message}), e.status != 409
+        self.stats.booking(params['event_id'], tickets)
+        self.rollups.record(params['event_id'], tickets)
+        result = {
+            "message": f"Booked {tickets} tickets for {email}",
+            "tickets_available": remaining
+        }
+        if seats:
+            result["seats"] = seats
+        return json.dumps(result), True
+
+    async def book_tickets_batch(self, params: Dict[str, Any]) -> str:
+        """Book several events at once - every line or none.
+
+        Takes ``idempotency_key`` like ``book_tickets``.
+        """
+        return await self._once('book-batch', params, self._book_tickets_batch)
+
+    def _book_tickets_batch(self, params):
+        """``(json_result, settled)``"""
+        email = params['email']
+        storage = self.pool.get_storage()
+        lines = params.get('lines') if isinstance(params.get('lines'), list) else []
+        seated = [
+            line.get('event_id') for line in lines
+            if isinstance(line, dict) and self.seatmaps.is_seated(storage, line.get('event_id'))
+        ]
+        if seated:
+            return json.dumps({"error": "Reserved-seating events must be booked one at a time", "seated": seated}), True
+        try:
+            results = storage.reserve_many(params.get('lines'), params.get('name', email), email)
+        except BatchReservationError as e:
+            return json.dumps({"error": e.message, "results": e.results}), e.status != 409
+        except ReservationError as e:
+            return json.dumps({"error": e.message}), e.status != 409
+        for line in results:
+            self.stats.booking(line['event_id'], line['tickets'])
+            self.rollups.record(line['event_id'], line['tickets'])
+        return json.dumps({
+            "message": f"Booked {sum(line['tickets'] for line in results)} tickets for {email}",
+            "results": results
+        }), True
+
+    async def admin_stats(self, params: Dict[str, Any]) -> str:
+        """Get admin statistics and analytics (running totals, see stats.py)"""
+        return json.dumps(await self.pool.run(self.stats.snapshot))
@@ -34,11 +34,44 @@ EVENT_TICKET_TOOLS = [
             "properties": {
                 "event_id": {"type": "string"},
                 "email": {"type": "string", "format": "email"},
-                "tickets": {"type": "integer", "minimum": 1}
+                "tickets": {"type": "integer", "minimum": 1},
+                "idempotency_key": {
+                    "type": "string",
+                    "description": "Any unique string - a retry with the same key returns the first result"
+                }
             },
             "required": ["event_id", "email"]
         }
     ),
+    Tool(
+        name="book_tickets_batch",
+        description="Book tickets for several events at once - every line is booked or none is",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "lines": {
+                    "type": "array",
+                    "minItems": 1,
+                    "maxItems": 50,     # reservations.MAX_BATCH_LINES
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "event_id": {"type": "string"},
+                            "tickets": {"type": "integer", "minimum": 1}
+                        },
+                        "required": ["event_id", "tickets"]
+                    }
+                },
+                "email": {"type": "string", "format": "email"},
+                "name": {"type": "string"},
+                "idempotency_key": {
+                    "type": "string",
+                    "description": "Any unique string - a retry with the same key returns the first result"
+                }
+            },
+            "required": ["lines", "email"]
+        }
+    ),
     Tool(
         name="admin_stats",
         description="Get admin statistics and analytics",
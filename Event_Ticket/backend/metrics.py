@@ -0,0 +1,161 @@
+"""⏱️ In-memory request/database metrics in Prometheus text format
+
+* ``instrument_app`` times every route (``http_request_duration_seconds``)
+  and adds a ``Server-Timing`` header splitting app vs database time.
+* ``InstrumentedStorage`` times every storage call
+  (``db_call_duration_seconds``) and charges it to the current request. A
+  call is one storage method, not one round trip: a CAS reservation retries
+  and paged reads fetch page after page inside a single timed call.
+* ``Metrics.render()`` backs the ``/api/metrics`` endpoint.
+"""
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+from reservations import ReservationError
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, value, labels=()):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(labels)
+            if state is None:
+                # per-bucket counts (non cumulative), then sum and count
+                state = series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def add_collector(self, collect):
+        """``collect()`` -> iterable of ``(name, kind, help, labels, value)`` read at scrape time"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: list(v) for k, v in series.items()} for name, series in self._histograms.items()}
+
+        for name, series in sorted(counters.items()):
+            self._header(lines, name, 'counter')
+            for labels, value in sorted(series.items()):
+                lines.append(f'{name}{_labels(labels)} {value}')
+
+        for name, series in sorted(histograms.items()):
+            self._header(lines, name, 'histogram')
+            for labels, state in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", repr(bound)),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {state[-1]}')
+                lines.append(f'{name}_sum{_labels(labels)} {state[-2]:.6f}')
+                lines.append(f'{name}_count{_labels(labels)} {state[-1]}')
+
+        seen = set()
+        for collect in self._collectors:
+            for name, kind, help_text, labels, value in collect():
+                if name not in seen:
+                    lines.append(f'# HELP {name} {help_text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                    seen.add(name)
+                lines.append(f'{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines, name, default_kind):
+        kind, help_text = self._meta.get(name, (default_kind, name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    body = ','.join(f'{k}="{str(v)}"' for k, v in labels)
+    return '{' + body + '}'
+
+
+class InstrumentedStorage:
+    """Times each storage call and charges it to the current request"""
+
+    def __init__(self, inner, metrics):
+        self.inner = inner
+        self.metrics = metrics
+        self.name = inner.name
+
+    def __getattr__(self, attr):
+        value = getattr(self.inner, attr)
+        if not callable(value) or attr.startswith('_'):
+            return value
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return value(*args, **kwargs)
+            except ReservationError:
+                # a rejected booking (sold out, not found) is an answer, not a failed call
+                raise
+            except Exception:
+                self.metrics.inc('db_call_errors_total', (('op', attr),))
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.metrics.observe('db_call_duration_seconds', elapsed, (('op', attr),))
+                if has_request_context():
+                    g.db_time = getattr(g, 'db_time', 0.0) + elapsed
+                    g.db_calls = getattr(g, 'db_calls', 0) + 1
+        return timed
+
+
+def instrument_app(app, metrics):
+    metrics.describe('http_requests_total', 'counter', 'HTTP requests by route, method and status')
+    metrics.describe('http_request_duration_seconds', 'histogram', 'Time spent in a route handler')
+    metrics.describe('db_call_duration_seconds', 'histogram', 'Time per storage call (may span several database round trips)')
+    metrics.describe('db_call_errors_total', 'counter', 'Storage calls that failed (rejected bookings excluded)')
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = getattr(g, 'request_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        # static pages all share one series
+        if route.startswith('/<path'):
+            route = 'frontend'
+        metrics.inc('http_requests_total', (('route', route), ('method', request.method), ('status', response.status_code)))
+        metrics.observe('http_request_duration_seconds', elapsed, (('route', route), ('method', request.method)))
+
+        db_time = getattr(g, 'db_time', 0.0)
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_time * 1000:.2f};desc="{getattr(g, "db_calls", 0)} calls", '
+            f'total;dur={elapsed * 1000:.2f}'
+        )
+        return response
@@ -0,0 +1,251 @@
+"""📄 Keyset pagination, projection and date windows for /api/events
+
+Query string:
+    limit   page size (1-200) - switches the response to a page object
+    cursor  opaque cursor from the previous page's ``next_cursor``
+    fields  comma separated projection, e.g. ``fields=id,title,date``
+    when    ``upcoming`` or ``past``
+    from/to inclusive ISO date bounds
+
+Pages are ordered by ``(date, id)`` and continue strictly after the cursor
+row, so they stay stable while events are added or sold.
+
+``RegistrationQuery`` does the same for one user's bookings at
+/api/me/registrations: newest first by ``(registered_at, id)``, with the
+event title and date joined in. ``AttendeeQuery`` walks one event's
+registrations by ``id`` for the attendee export (export.py).
+"""
+import base64
+import json
+import re
+from datetime import date
+
+EVENT_FIELDS = ('id', 'title', 'description', 'date', 'total_tickets', 'created_at')
+MAX_LIMIT = 200
+
+REGISTRATION_FIELDS = ('id', 'event_id', 'tickets', 'registered_at', 'event_title', 'event_date')
+REGISTRATIONS_PAGE = 20
+MAX_REGISTRATIONS_PAGE = 100
+
+ATTENDEE_FIELDS = ('id', 'name', 'user_email', 'tickets', 'registered_at')
+ATTENDEES_PAGE = 1000    # PostgREST's default row cap
+
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}([T ][\d:.+\-Z]*)?$')
+_ID_RE = re.compile(r'^[\w\-]{1,64}$')
+
+
+class EventQuery:
+    def __init__(self, limit=None, cursor=None, fields=None, when=None, date_from=None, date_to=None):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.when = when
+        self.date_from = date_from
+        self.date_to = date_to
+        self.today = date.today().isoformat()
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse ``request.args`` - raises ValueError on bad input"""
+        limit = args.get('limit')
+        if limit is not None:
+            limit = int(limit)
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+
+        fields = None
+        if args.get('fields'):
+            fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in EVENT_FIELDS]
+            if unknown:
+                raise ValueError(f'Unknown fields: {unknown}')
+            # date + id drive the keyset, always project them
+            fields = sorted(set(fields) | {'id', 'date'}, key=EVENT_FIELDS.index)
+
+        when = args.get('when')
+        if when not in (None, 'upcoming', 'past'):
+            raise ValueError("when must be 'upcoming' or 'past'")
+
+        date_from, date_to = args.get('from'), args.get('to')
+        for value in (date_from, date_to):
+            if value is not None and not _DATE_RE.match(value):
+                raise ValueError(f'Invalid date: {value}')
+
+        cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+        return cls(limit, cursor, fields, when, date_from, date_to)
+
+    @property
+    def is_default(self):
+        """No paging/filter params - the legacy full-list response"""
+        return not any((self.limit, self.cursor, self.fields, self.when, self.date_from, self.date_to))
+
+    @property
+    def cache_key(self):
+        return (self.limit, self.cursor, tuple(self.fields or ()), self.when,
+                self.date_from, self.date_to, self.today if self.when else None)
+
+    def apply(self, client):
+        """Build the Supabase query for this page"""
+        query = client.table('events').select(','.join(self.fields) if self.fields else '*')
+        if self.when == 'upcoming':
+            query = query.gte('date', self.today)
+        elif self.when == 'past':
+            query = query.lt('date', self.today)
+        if self.date_from:
+            query = query.gte('date', self.date_from)
+        if self.date_to:
+            query = query.lte('date', self.date_to)
+        if self.cursor:
+            after_date, after_id = self.cursor
+            # postgrest-py 0.10 has no or_() helper - add the raw filter param
+            query.params = query.params.add(
+                'or', f'(date.gt.{after_date},and(date.eq.{after_date},id.gt.{after_id}))'
+            )
+        # one order param - repeating it would keep only the last column
+        query = query.order('date,id')
+        if self.limit:
+            # one extra row tells us whether there is a next page
+            query = query.limit(self.limit + 1)
+        return query
+
+    def to_sql(self):
+        """Same query for SQLite - returns ``(sql, params)``"""
+        columns = ', '.join(self.fields) if self.fields else '*'
+        where, params = [], []
+        if self.when == 'upcoming':
+            where.append('date >= ?')
+            params.append(self.today)
+        elif self.when == 'past':
+            where.append('date < ?')
+            params.append(self.today)
+        if self.date_from:
+            where.append('date >= ?')
+            params.append(self.date_from)
+        if self.date_to:
+            where.append('date <= ?')
+            params.append(self.date_to)
+        if self.cursor:
+            # row-value comparison walks the (date, id) index directly
+            where.append('(date, id) > (?, ?)')
+            params.extend(self.cursor)
+        sql = f'SELECT {columns} FROM events'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY date, id'
+        if self.limit:
+            sql += ' LIMIT ?'
+            params.append(self.limit + 1)
+        return sql, params
+
+    def page(self, rows):
+        """Trim the look-ahead row and build the page object"""
+        has_more = self.limit is not None and len(rows) > self.limit
+        rows = rows[:self.limit] if self.limit else rows
+        next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['id']) if has_more else None
+        return {'events': rows, 'next_cursor': next_cursor}
+
+
+class RegistrationQuery:
+    def __init__(self, email, limit=REGISTRATIONS_PAGE, cursor=None):
+        self.email = email
+        self.limit = limit
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, email, args):
+        """Parse ``request.args`` - raises ValueError on bad input"""
+        limit = int(args.get('limit', REGISTRATIONS_PAGE))
+        if not 1 <= limit <= MAX_REGISTRATIONS_PAGE:
+            raise ValueError(f'limit must be between 1 and {MAX_REGISTRATIONS_PAGE}')
+        cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+        return cls(email, limit, cursor)
+
+    @property
+    def cache_key(self):
+        # email first - the cache drops a user's pages by it (see QueryCache)
+        return (self.email, self.limit, self.cursor)
+
+    def apply(self, client, source='registration_history'):
+        """Supabase query against the ``registration_history`` view (sql/registration_history.sql)"""
+        columns = REGISTRATION_FIELDS if source == 'registration_history' else REGISTRATION_FIELDS[:4]
+        query = client.table(source).select(','.join(columns)).eq('user_email', self.email)
+        if self.cursor:
+            before_at, before_id = self.cursor
+            query.params = query.params.add(
+                'or', f'(registered_at.lt.{before_at},and(registered_at.eq.{before_at},id.lt.{before_id}))'
+            )
+        # -> order=registered_at.desc,id.desc
+        return query.order('registered_at.desc,id', desc=True).limit(self.limit + 1)
+
+    def to_sql(self):
+        """Same query for SQLite - returns ``(sql, params)``"""
+        where, params = ['r.user_email = ?'], [self.email]
+        if self.cursor:
+            # walks idx_registrations_user_time backwards from the cursor row
+            where.append('(r.registered_at, r.id) < (?, ?)')
+            params.extend(self.cursor)
+        sql = (
+            'SELECT r.id, r.event_id, r.tickets, r.registered_at, e.title AS event_title, e.date AS event_date '
+            'FROM registrations r LEFT JOIN events e ON e.id = r.event_id '
+            f'WHERE {" AND ".join(where)} '
+            'ORDER BY r.registered_at DESC, r.id DESC LIMIT ?'
+        )
+        params.append(self.limit + 1)
+        return sql, params
+
+    def page(self, rows):
+        """Trim the look-ahead row and build the page object"""
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        next_cursor = encode_cursor(rows[-1]['registered_at'], rows[-1]['id']) if has_more else None
+        return {'registrations': rows, 'next_cursor': next_cursor}
+
+
+class AttendeeQuery:
+    """One page of an event's registrations in ``id`` order, strictly after ``after_id``"""
+
+    def __init__(self, event_id, limit=ATTENDEES_PAGE, after_id=None):
+        self.event_id = event_id
+        self.limit = limit
+        self.after_id = after_id
+
+    def apply(self, client):
+        """Supabase query (walks idx_registrations_event_id_id, see sql/attendee_export.sql)"""
+        query = client.table('registrations').select(','.join(ATTENDEE_FIELDS)).eq('event_id', self.event_id)
+        if self.after_id is not None:
+            query = query.gt('id', self.after_id)
+        return query.order('id').limit(self.limit)
+
+    def to_sql(self):
+        """Same query for SQLite - idx_registrations_event_id already ends in the rowid"""
+        sql = f'SELECT {", ".join(ATTENDEE_FIELDS)} FROM registrations WHERE event_id = ?'
+        params = [self.event_id]
+        if self.after_id is not None:
+            sql += ' AND id > ?'
+            params.append(self.after_id)
+        sql += ' ORDER BY id LIMIT ?'
+        params.append(self.limit)
+        return sql, params
+
+    def next(self, rows):
+        """Query for the page after ``rows`` - None once a page comes back short"""
+        if len(rows) < self.limit:
+            return None
+        return AttendeeQuery(self.event_id, self.limit, rows[-1]['id'])
+
+
+def encode_cursor(event_date, event_id):
+    raw = json.dumps([event_date, event_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        event_date, event_id = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    # Values end up inside a PostgREST filter - only accept plain dates/ids
+    if not _DATE_RE.match(str(event_date)) or not _ID_RE.match(str(event_id)):
+        raise ValueError('Invalid cursor')
+    return event_date, event_id
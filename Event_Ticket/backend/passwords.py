@@ -0,0 +1,78 @@
+"""🔑 Salted, tunable password hashing
+
+Stored format: ``pbkdf2_sha256$<iterations>$<salt>$<hash>`` (base64 salt and
+hash). ``PASSWORD_ITERATIONS`` sets the cost of new hashes; older hashes -
+including the legacy unsalted sha256 hex digests - still verify and are
+flagged for an upgrade on the next successful login.
+
+Hashing is CPU-bound, so it runs on a small pool (``hashlib`` releases the
+GIL while it works). The caller's request thread still waits for its
+result, so the pool alone only caps how many hashes run at once; what
+bounds a login burst is ``max_waiting``: once that many logins are
+already waiting for a worker, ``hash``/``verify`` raise ``HasherBusy`` at
+once (the login route answers 503) instead of parking yet another request
+thread the booking route needs.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+LEGACY_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+def hash_password(password, iterations):
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return '$'.join((ALGORITHM, str(iterations), base64.b64encode(salt).decode(), base64.b64encode(digest).decode()))
+
+
+def verify_password(password, stored, iterations):
+    """``(matches, needs_rehash)`` for ``password`` against a stored hash"""
+    stored = stored or ''
+    if LEGACY_SHA256.match(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    try:
+        algorithm, rounds, salt, digest = stored.split('$')
+        rounds = int(rounds)
+        salt, digest = base64.b64decode(salt), base64.b64decode(digest)
+    except ValueError:
+        return False, False
+    if algorithm != ALGORITHM:
+        return False, False
+    candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, rounds)
+    return hmac.compare_digest(candidate, digest), rounds != iterations
+
+
+class HasherBusy(Exception):
+    """Too many logins already waiting for the hashing pool - retry shortly"""
+
+
+class PasswordHasher:
+    def __init__(self, iterations=100_000, workers=2, max_waiting=32):
+        self.iterations = iterations
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.rejected = 0
+        # running + waiting hashes; one more is turned away, not queued
+        self._slots = threading.BoundedSemaphore(workers + max_waiting)
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.iterations)
+
+    def verify(self, password, stored):
+        return self._run(verify_password, password, stored, self.iterations)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy('Too many logins in progress - please retry')
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
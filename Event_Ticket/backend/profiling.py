@@ -0,0 +1,396 @@
+"""🔬 Runtime-switchable request profiling
+
+Off by default and close to free while off (a flag check per request, a
+``stat()`` of the settings file per second). Switched on at
+``PUT /api/admin/profiling`` or by sending a worker ``signum`` (SIGUSR2).
+Either way the settings are written to ``settings.json`` in the capture
+directory and every worker on the host follows within a second. Profiling
+switches itself off again after ``max_seconds``.
+
+While on:
+
+* a sampler thread records the stack of every in-flight request each
+  ``interval`` seconds (``sys._current_frames``) - the cost follows the
+  sampling rate, not the code being run
+* a ``sample_rate`` fraction of requests also runs under ``cProfile`` for
+  exact call counts and timings
+* a request slower than ``slow_ms``, and every cProfiled one, is saved as a
+  capture: ``<id>.json`` (route, status, duration), ``<id>.pstats``
+  (``marshal``, load with ``pstats.Stats``) and ``<id>.collapsed`` (one
+  ``frame;frame;frame count`` line per stack, for flamegraph.pl or
+  speedscope). A capture that wasn't cProfiled gets a pstats file built
+  from its stack samples; a request shorter than ``interval`` may have no
+  stack samples at all - its pstats file is the one to read.
+
+Captures are written by a background thread. The directory keeps the
+newest ``max_captures`` - an on-disk ring shared by all workers.
+"""
+import cProfile
+import glob
+import json
+import logging
+import marshal
+import os
+import pstats
+import queue
+import random
+import re
+import signal
+import sys
+import threading
+import time
+
+from flask import g, request
+
+from logs import get_logger, log
+
+logger = get_logger('profiling')
+
+FORMATS = {'pstats': 'application/octet-stream', 'collapsed': 'text/plain'}
+CAPTURE_ID = re.compile(r'^\d+-\d+-\d+$')
+SETTINGS = 'settings.json'
+SETTINGS_CHECK = 1.0
+
+
+class _Request:
+    __slots__ = ('started', 'stacks', 'profile')
+
+    def __init__(self, profile):
+        self.started = time.perf_counter()
+        self.stacks = {}        # tuple of code objects, innermost first -> samples
+        self.profile = profile
+
+
+class RequestProfiler:
+    def __init__(self, directory, sample_rate=0.01, slow_ms=1000, interval=0.005, max_captures=200,
+                 max_seconds=3600, enabled=False):
+        self.directory = directory
+        self.interval = interval
+        self.max_captures = max_captures
+        self.max_seconds = max_seconds
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.expires = None
+        self.captured = 0
+        self._active = {}       # thread id -> _Request
+        self._sampler = None
+        self._writer = None
+        self._writes = queue.SimpleQueue()
+        self._settings_mtime = None
+        self._checked_at = 0.0
+        self._seq = 0
+        self._lock = threading.Lock()
+        if enabled:
+            self.configure(enabled=True)
+
+    # 🎛️ Switching
+    def configure(self, enabled=None, sample_rate=None, slow_ms=None):
+        """Change the settings here and, through settings.json, in every worker"""
+        settings = {
+            'enabled': self.enabled if enabled is None else bool(enabled),
+            'sample_rate': self.sample_rate if sample_rate is None else float(sample_rate),
+            'slow_ms': self.slow_ms if slow_ms is None else float(slow_ms)
+        }
+        if not 0 <= settings['sample_rate'] <= 1:
+            raise ValueError('sample_rate must be between 0 and 1')
+        if settings['slow_ms'] <= 0:
+            raise ValueError('slow_ms must be positive')
+        if settings['enabled'] and not (self.enabled and self.expires):
+            settings['expires'] = time.time() + self.max_seconds
+        elif settings['enabled']:
+            settings['expires'] = self.expires
+        self._apply(settings)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, SETTINGS)
+        with open(path + f'.{os.getpid()}', 'w') as f:
+            json.dump(settings, f)
+        os.replace(path + f'.{os.getpid()}', path)
+        self._settings_mtime = os.stat(path).st_mtime_ns
+        log(logger, logging.INFO, 'profiling_configured', **settings)
+        return self.status()
+
+    def _apply(self, settings):
+        expires = settings.get('expires')
+        self.sample_rate = settings['sample_rate']
+        self.slow_ms = settings['slow_ms']
+        self.expires = expires if settings['enabled'] else None
+        self.enabled = settings['enabled'] and (expires is None or expires > time.time())
+        if self.enabled:
+            self._ensure_sampler()
+
+    def _refresh(self):
+        # follow settings.json written by another worker (or a signal)
+        now = time.monotonic()
+        if now - self._checked_at < SETTINGS_CHECK:
+            return
+        self._checked_at = now
+        if self.enabled and self.expires and self.expires <= time.time():
+            self.enabled = False
+            log(logger, logging.INFO, 'profiling_expired')
+        path = os.path.join(self.directory, SETTINGS)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if mtime == self._settings_mtime:
+                return
+            with open(path) as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._settings_mtime = mtime
+        self._apply(settings)
+
+    def install_signal(self, signum):
+        """Toggle profiling on ``signum`` - only possible from the main thread"""
+        def toggle(*_):
+            try:
+                self.configure(enabled=not self.enabled)
+            except Exception:
+                log(logger, logging.ERROR, 'profiling_toggle_failed', exc_info=True)
+        try:
+            signal.signal(signum, toggle)
+        except ValueError:
+            log(logger, logging.WARNING, 'profiling_signal_unavailable', signal=int(signum))
+
+    # 🪝 Request hooks
+    def install(self, app):
+        app.before_request(self._begin)
+        app.after_request(self._end)
+        app.teardown_request(self._abandon)
+
+    def _begin(self):
+        self._refresh()
+        if not self.enabled:
+            return
+        profile = None
+        if random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None      # 3.12+: another request holds the (process-wide) profiler
+        g.profiled = _Request(profile)
+        with self._lock:
+            self._active[threading.get_ident()] = g.profiled
+
+    def _end(self, response):
+        current = g.pop('profiled', None)
+        if current is None:
+            return response
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+        if current.profile is not None:
+            current.profile.disable()
+        elapsed_ms = (time.perf_counter() - current.started) * 1000
+        if current.profile is None and elapsed_ms < self.slow_ms:
+            return response
+
+        stats = None
+        if current.profile is not None:
+            current.profile.create_stats()
+            stats = current.profile.stats
+        self._writes.put(({
+            'reason': 'slow' if elapsed_ms >= self.slow_ms else 'sampled',
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else 'unmatched',
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed_ms, 3),
+            'stack_samples': sum(current.stacks.values()),
+            'interval_ms': self.interval * 1000,
+            'at': time.time()
+        }, current.stacks, stats))
+        self._ensure_writer()
+        return response
+
+    def _abandon(self, exc=None):
+        # after_request didn't run (the response failed) - stop sampling this thread
+        current = g.pop('profiled', None)
+        if current is not None:
+            with self._lock:
+                self._active.pop(threading.get_ident(), None)
+            if current.profile is not None:
+                current.profile.disable()
+
+    # 📸 Stack sampler
+    def _ensure_sampler(self):
+        if self._sampler is not None:
+            return
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+                self._sampler.start()
+
+    def _sample(self):
+        try:
+            while self.enabled:
+                time.sleep(self.interval)
+                frames = sys._current_frames()
+                with self._lock:
+                    for thread_id, current in self._active.items():
+                        frame = frames.get(thread_id)
+                        stack = []
+                        while frame is not None:
+                            stack.append(frame.f_code)
+                            frame = frame.f_back
+                        stack = tuple(stack)
+                        current.stacks[stack] = current.stacks.get(stack, 0) + 1
+        finally:
+            with self._lock:
+                self._sampler = None
+            if self.enabled:
+                self._ensure_sampler()
+
+    # 💾 Capture ring
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='profile-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            meta, stacks, stats = self._writes.get()
+            try:
+                self._write(meta, stacks, stats)
+            except Exception:
+                log(logger, logging.ERROR, 'profile_capture_failed', exc_info=True)
+
+    def _write(self, meta, stacks, stats):
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        capture_id = f'{int(meta["at"] * 1000)}-{os.getpid()}-{self._seq}'
+        base = os.path.join(self.directory, capture_id)
+        if stats is None:
+            # the sampler runs late under GIL contention - share the measured duration out instead
+            stats = stacks_to_pstats(stacks, meta['duration_ms'] / 1000 / max(1, meta['stack_samples']))
+        with open(base + '.pstats', 'wb') as f:
+            marshal.dump(stats, f)
+        with open(base + '.collapsed', 'w') as f:
+            f.writelines(f'{line} {count}\n' for line, count in collapse(stacks).items())
+        # metadata last: a capture is listed once its files are complete
+        with open(base + '.json', 'w') as f:
+            json.dump({'id': capture_id, **meta}, f)
+        self.captured += 1
+        log(logger, logging.INFO, 'profile_captured', id=capture_id, reason=meta['reason'], route=meta['route'],
+            duration_ms=meta['duration_ms'])
+        self._prune()
+
+    def _prune(self):
+        for path in self._capture_paths()[:-self.max_captures]:
+            for suffix in ('.json', '.pstats', '.collapsed'):
+                try:
+                    os.remove(path[:-len('.json')] + suffix)
+                except FileNotFoundError:
+                    pass    # another worker pruned it first
+
+    def _capture_paths(self):
+        """Metadata files, oldest first (settings.json isn't one)"""
+        paths = [path for path in glob.glob(os.path.join(self.directory, '*.json'))
+                 if CAPTURE_ID.match(os.path.basename(path)[:-len('.json')])]
+        return sorted(paths, key=_capture_order)
+
+    # 📖 Reads
+    def captures(self):
+        """Capture metadata, newest first"""
+        found = []
+        for path in reversed(self._capture_paths()):
+            try:
+                with open(path) as f:
+                    found.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return found
+
+    def download(self, capture_ids, fmt):
+        """One capture, or several merged, as ``fmt`` bytes - None if none of them exist"""
+        if fmt not in FORMATS:
+            raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+        paths = [os.path.join(self.directory, f'{capture_id}.{fmt}') for capture_id in capture_ids
+                 if CAPTURE_ID.match(capture_id)]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return None
+        if fmt == 'pstats':
+            return marshal.dumps(pstats.Stats(*paths).stats)
+        counts = {}
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    counts[stack] = counts.get(stack, 0) + int(count)
+        return ''.join(f'{stack} {count}\n' for stack, count in counts.items()).encode()
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'slow_ms': self.slow_ms,
+            'interval_ms': self.interval * 1000,
+            'expires_in': round(self.expires - time.time()) if self.enabled and self.expires else None,
+            'in_flight': len(self._active),
+            'captured': self.captured
+        }
+
+
+def _capture_order(path):
+    at, pid, seq = os.path.basename(path)[:-len('.json')].split('-')
+    return int(at), int(pid), int(seq)
+
+
+def _label(code):
+    # package-relative path keeps lines short and identical across hosts
+    filename = code.co_filename
+    for root in sorted(sys.path, key=len, reverse=True):
+        if root and filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse(stacks):
+    """``{'outer;...;inner': samples}`` - Brendan Gregg's collapsed-stack format"""
+    labels, lines = {}, {}
+    for stack, count in stacks.items():
+        for code in stack:
+            if code not in labels:
+                labels[code] = _label(code)
+        line = ';'.join(labels[code] for code in reversed(stack))
+        lines[line] = lines.get(line, 0) + count
+    return lines
+
+
+def stacks_to_pstats(stacks, interval):
+    """A ``pstats``-loadable dict from stack samples: times are samples x ``interval``
+    (seconds per sample), call counts are sample counts"""
+    stats = {}
+
+    def entry(code):
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        if key not in stats:
+            stats[key] = [0, 0, 0.0, 0.0, {}]
+        return key, stats[key]
+
+    for stack, count in stacks.items():
+        seconds = count * interval
+        seen = set()
+        for depth, code in enumerate(stack):
+            key, func = entry(code)
+            if depth == 0:
+                func[2] += seconds      # own time: only the innermost frame was running
+            if key not in seen:
+                # recursion: charge the cumulative time once per stack
+                seen.add(key)
+                func[0] += count
+                func[1] += count
+                func[3] += seconds
+            if depth + 1 < len(stack):
+                caller = stack[depth + 1]
+                caller_key = (caller.co_filename, caller.co_firstlineno, caller.co_name)
+                nc, cc, tt, ct = func[4].get(caller_key, (0, 0, 0.0, 0.0))
+                func[4][caller_key] = (nc + count, cc + count, tt + (seconds if depth == 0 else 0.0), ct + seconds)
+    return {key: tuple(func) for key, func in stats.items()}
+
@@ -0,0 +1,260 @@
+"""🎫 Atomic ticket reservation engine
+
+Checks inventory, decrements it and records the registration in ONE step.
+
+* ``rpc`` mode (default): a single call to the ``reserve_tickets`` Postgres
+  function (see ``sql/reserve_tickets.sql``). The conditional UPDATE holds the
+  event row lock, so concurrent bookings serialize in the database and can
+  never oversell.
+* ``cas`` mode (fallback when the function is not installed yet, logged as
+  a warning): optimistic compare-and-set on ``total_tickets`` - the
+  decrement only applies if the count is still the one we read, otherwise
+  we re-read and retry. The registration insert is a second write; if it
+  fails the tickets are given back (same compare-and-set) before the error
+  is raised, so a failed booking never eats inventory.
+
+Group bookings (``reserve_many``) check every line against one read of the
+inventory and commit all-or-nothing via ``reserve_tickets_batch``.
+"""
+import logging
+from datetime import datetime
+
+from logs import get_logger, log
+
+logger = get_logger('reservations')
+
+
+class ReservationError(Exception):
+    """Booking rejected - carries the HTTP status the route should return"""
+
+    def __init__(self, message, status=400, remaining=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.remaining = remaining
+
+
+class BatchReservationError(ReservationError):
+    """Group booking rejected as a whole - ``results`` says which lines failed"""
+
+    def __init__(self, message, results, status=400):
+        super().__init__(message, status=status)
+        self.results = results
+
+
+MAX_BATCH_LINES = 50
+
+
+def parse_tickets(value):
+    """A requested ticket count from a request body -> positive int"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ReservationError('tickets must be a positive whole number')
+    try:
+        tickets = int(value)
+    except (TypeError, ValueError):
+        raise ReservationError('tickets must be a positive whole number')
+    if tickets <= 0:
+        raise ReservationError('tickets must be a positive whole number')
+    return tickets
+
+
+def normalize_lines(lines):
+    """``[{event_id, tickets}, ...]`` -> ``[(event_id, tickets), ...]``"""
+    if not isinstance(lines, list) or not lines:
+        raise ReservationError('lines must be a non-empty list')
+    if len(lines) > MAX_BATCH_LINES:
+        raise ReservationError(f'At most {MAX_BATCH_LINES} lines per booking')
+    normalized = []
+    for line in lines:
+        try:
+            normalized.append((str(line['event_id']), int(line['tickets'])))
+        except (KeyError, TypeError, ValueError):
+            raise ReservationError('Each line needs an event_id and a number of tickets')
+    return normalized
+
+
+def settle_batch(lines, available):
+    """Check every line against ``available`` (``{event_id: total_tickets}``).
+
+    Lines for the same event draw from one running count. Returns the
+    per-line results; ``remaining`` is the count left once the whole batch
+    is applied (or what was left for that line, if it failed).
+    """
+    left = dict(available)
+    results = []
+    for event_id, tickets in lines:
+        have = left.get(event_id)
+        if tickets <= 0:
+            status = 'invalid'
+        elif have is None:
+            status = 'not_found'
+        elif have < tickets:
+            status = 'insufficient'
+        else:
+            status = 'ok'
+            left[event_id] = have - tickets
+        results.append({'event_id': event_id, 'tickets': tickets, 'status': status, 'remaining': have})
+    for result in results:
+        if result['status'] == 'ok':
+            result['remaining'] = left[result['event_id']]
+    return results
+
+
+def check_batch(results):
+    """Return ``results`` if every line is ok, else raise ``BatchReservationError``"""
+    failed = [r for r in results if r['status'] != 'ok']
+    if not failed:
+        return results
+    status = 404 if all(r['status'] == 'not_found' for r in failed) else 400
+    raise BatchReservationError(
+        f'{len(failed)} of {len(results)} lines could not be booked - nothing was booked',
+        results, status=status
+    )
+
+
+class ReservationEngine:
+    CAS_RETRIES = 8
+
+    def __init__(self, db, mode='rpc'):
+        self.db = db
+        self.mode = mode
+
+    def reserve(self, event_id, tickets, name, email):
+        """Book ``tickets`` for ``event_id`` and return the remaining count"""
+        tickets = int(tickets)
+        if tickets <= 0:
+            raise ReservationError('Tickets must be a positive number')
+
+        client = self.db.get_client()
+        if self.mode == 'rpc':
+            try:
+                return self._reserve_rpc(client, event_id, tickets, name, email)
+            except ReservationError:
+                raise
+            except Exception as e:
+                # PGRST202 = function not found -> database not migrated yet
+                if getattr(e, 'code', None) != 'PGRST202':
+                    raise
+                log(logger, logging.WARNING, 'reserve_tickets_function_missing', fix='run sql/reserve_tickets.sql',
+                    fallback='cas')
+                self.mode = 'cas'
+        return self._reserve_cas(client, event_id, tickets, name, email)
+
+    def reserve_many(self, lines, name, email):
+        """Book every ``(event_id, tickets)`` line or none - one round trip"""
+        lines = normalize_lines(lines)
+        client = self.db.get_client()
+        try:
+            response = client.rpc('reserve_tickets_batch', {
+                'p_lines': [{'event_id': e, 'tickets': t} for e, t in lines],
+                'p_name': name,
+                'p_email': email
+            }).execute()
+        except Exception as e:
+            if getattr(e, 'code', None) != 'PGRST202':
+                raise
+            # no way to make several PostgREST writes atomic without the function
+            log(logger, logging.WARNING, 'reserve_tickets_batch_function_missing', fix='run sql/reserve_tickets.sql')
+            raise ReservationError('Group booking is not available yet', status=501)
+        rows = response.data or []
+        if len(rows) != len(lines):
+            raise ReservationError('Reservation failed', status=500)
+        return check_batch([{
+            'event_id': row['event_id'],
+            'tickets': row['tickets'],
+            'status': row['status'],
+            'remaining': row['remaining']
+        } for row in rows])
+
+    def lease(self, event_id, want):
+        """Take up to ``want`` tickets off the count - ``(taken, remaining)`` (see journal.py)"""
+        client = self.db.get_client()
+        for _ in range(self.CAS_RETRIES):
+            event_resp = client.table('events').select('total_tickets').eq('id', event_id).execute()
+            if not event_resp.data:
+                self._check_status('not_found', None)
+            available = event_resp.data[0]['total_tickets']
+            taken = min(want, available)
+            if taken <= 0:
+                return 0, available
+            update = client.table('events').update({
+                'total_tickets': available - taken
+            }).eq('id', event_id).eq('total_tickets', available).execute()
+            if update.data:
+                return taken, available - taken
+        raise ReservationError('Event is busy, please retry', status=409)
+
+    def give_back(self, event_id, tickets):
+        """Return unsold leased tickets - the new count, or None if the event is gone"""
+        client = self.db.get_client()
+        for _ in range(self.CAS_RETRIES):
+            event_resp = client.table('events').select('total_tickets').eq('id', event_id).execute()
+            if not event_resp.data:
+                return None
+            available = event_resp.data[0]['total_tickets']
+            update = client.table('events').update({
+                'total_tickets': available + tickets
+            }).eq('id', event_id).eq('total_tickets', available).execute()
+            if update.data:
+                return available + tickets
+        raise ReservationError('Event is busy, please retry', status=409)
+
+    def _reserve_rpc(self, client, event_id, tickets, name, email):
+        """🔒 One round trip: conditional decrement + insert in one transaction"""
+        response = client.rpc('reserve_tickets', {
+            'p_event_id': event_id,
+            'p_tickets': tickets,
+            'p_name': name,
+            'p_email': email
+        }).execute()
+        rows = response.data if isinstance(response.data, list) else [response.data]
+        if not rows or not rows[0]:
+            raise ReservationError('Reservation failed', status=500)
+        return self._check_status(rows[0]['status'], rows[0]['remaining'])
+
+    def _reserve_cas(self, client, event_id, tickets, name, email):
+        """🔁 Optimistic fallback: decrement only if nobody changed the count"""
+        for _ in range(self.CAS_RETRIES):
+            event_resp = client.table('events').select('total_tickets').eq('id', event_id).execute()
+            if not event_resp.data:
+                self._check_status('not_found', None)
+            available = event_resp.data[0]['total_tickets']
+            if available < tickets:
+                self._check_status('insufficient', available)
+
+            update = client.table('events').update({
+                'total_tickets': available - tickets
+            }).eq('id', event_id).eq('total_tickets', available).execute()
+            if not update.data:
+                continue  # lost the race - somebody else booked first
+
+            try:
+                client.table('registrations').insert({
+                    'name': name,
+                    'user_email': email,
+                    'event_id': event_id,
+                    'tickets': tickets,
+                    'registered_at': datetime.now().isoformat()
+                }).execute()
+            except Exception:
+                self._undo_decrement(event_id, tickets)
+                raise
+            return available - tickets
+        raise ReservationError('Event is busy, please retry', status=409)
+
+    def _undo_decrement(self, event_id, tickets):
+        # the count went down but no registration was stored - put the tickets back
+        try:
+            self.give_back(event_id, tickets)
+        except Exception:
+            log(logger, logging.ERROR, 'reservation_rollback_failed', exc_info=True, event_id=event_id, tickets=tickets)
+
+    @staticmethod
+    def _check_status(status, remaining):
+        if status == 'ok':
+            return remaining
+        if status == 'not_found':
+            raise ReservationError('Event not found', status=404)
+        if status == 'insufficient':
+            raise ReservationError(f'Only {remaining} tickets available', remaining=remaining)
+        raise ReservationError('Tickets must be a positive number')
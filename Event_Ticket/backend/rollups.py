@@ -0,0 +1,273 @@
+"""📈 Per-minute sales rollups for /api/admin/sales-timeseries
+
+The booking paths call ``record()``, which adds the booking to the current
+minute of that event's ``_Ring`` - two ``array('I')`` (tickets, bookings)
+indexed by minute modulo ``ring_minutes``. O(1), no database call.
+
+Every ``flush_interval`` seconds the rings are swapped out and written to
+the ``sales_rollups`` table, downsampled on the way: each minute's counts
+are added onto its minute, hour and day rows. The write is an additive
+upsert, so every worker (and the MCP server) adds into the same rows. A
+failed flush puts the counts back into the rings for the next attempt;
+minutes older than ``ring_minutes`` are dropped (and logged) if the
+database stays away that long. At exit the rings get one last flush; if
+storage is already gone that is a one-line warning, not a traceback. Minute rows are kept for
+``minute_retention`` seconds, hour rows for ``hour_retention``, day rows
+forever.
+
+``series()`` answers a range at one resolution from those rows plus the
+counts still waiting in this process's rings - O(buckets in the range),
+however many registrations there are. Other processes' bookings appear
+after their next flush.
+"""
+import atexit
+import logging
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+from logs import get_logger, log
+
+logger = get_logger('rollups')
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+DEFAULT_BUCKETS = 120
+MAX_BUCKETS = 5000
+PRUNE_INTERVAL = 3600
+
+
+def parse_time(value):
+    """ISO 8601 (naive = UTC) or epoch seconds -> epoch seconds; None passes through"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Invalid time: {value}')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+class _Ring:
+    """One event's unflushed per-minute counts"""
+
+    __slots__ = ('head', 'low', 'tickets', 'bookings')
+
+    def __init__(self, slots):
+        self.head = None        # newest minute held
+        self.low = None         # oldest minute with counts
+        self.tickets = array('I', bytes(4 * slots))
+        self.bookings = array('I', bytes(4 * slots))
+
+    def add(self, minute, tickets, bookings):
+        """Returns the tickets that fell out of the window to make room"""
+        slots = len(self.tickets)
+        lost = 0
+        if self.head is None:
+            self.head = self.low = minute
+        elif minute > self.head:
+            # the slots we move onto still hold minutes a full ring older
+            for passed in range(self.head + 1, min(minute, self.head + slots) + 1):
+                slot = passed % slots
+                lost += self.tickets[slot]
+                self.tickets[slot] = self.bookings[slot] = 0
+            self.head = minute
+            self.low = max(self.low, minute - slots + 1)
+        elif minute <= self.head - slots:
+            return tickets
+        else:
+            self.low = min(self.low, minute)
+        slot = minute % slots
+        self.tickets[slot] += tickets
+        self.bookings[slot] += bookings
+        return lost
+
+    def counts(self):
+        """``(minute, tickets, bookings)`` for every minute with a booking"""
+        if self.head is None:
+            return []
+        slots = len(self.tickets)
+        return [(minute, self.tickets[minute % slots], self.bookings[minute % slots])
+                for minute in range(self.low, self.head + 1) if self.bookings[minute % slots]]
+
+
+class SalesRollups:
+    def __init__(self, db, flush_interval=60, minute_retention=2 * 86400, hour_retention=90 * 86400,
+                 ring_minutes=1440):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.retention = {'minute': minute_retention, 'hour': hour_retention}
+        self.ring_minutes = ring_minutes
+        self.flushed = 0
+        self.dropped = 0
+        self._rings = {}        # event_id -> _Ring, filled by record()
+        self._inflight = {}     # rings being written by flush()
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    # ✍️ Write-path hooks
+    def record(self, event_id, tickets, at=None):
+        self._ensure_started()
+        minute = int((time.time() if at is None else at) // 60)
+        with self._lock:
+            self._add(event_id, minute, tickets, 1)
+
+    def forget(self, event_id):
+        with self._lock:
+            self._rings.pop(event_id, None)
+
+    def _add(self, event_id, minute, tickets, bookings):
+        ring = self._rings.get(event_id)
+        if ring is None:
+            ring = self._rings[event_id] = _Ring(self.ring_minutes)
+        lost = ring.add(minute, tickets, bookings)
+        if lost:
+            self.dropped += lost
+            log(logger, logging.WARNING, 'sales_rollup_dropped', event_id=event_id, tickets=lost)
+
+    # 📖 Reads
+    def series(self, event_id=None, resolution='hour', start=None, end=None):
+        """Buckets of ``resolution`` covering ``start``..``end`` (epoch seconds), all events
+        unless ``event_id`` - None if the database is unavailable"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f'resolution must be one of {", ".join(RESOLUTIONS)}')
+        step = RESOLUTIONS[resolution]
+        last = (int(time.time()) if end is None else end) // step * step
+        first = last - (DEFAULT_BUCKETS - 1) * step if start is None else start // step * step
+        if first > last:
+            raise ValueError('from must not be after to')
+        size = (last - first) // step + 1
+        if size > MAX_BUCKETS:
+            raise ValueError(f'Range spans {size} {resolution} buckets, at most {MAX_BUCKETS} allowed')
+
+        storage = self.db.get_storage()
+        if not storage:
+            return None
+        tickets, bookings = [0] * size, [0] * size
+        for row in storage.sales_rollups(resolution, first, last, event_id):
+            index = (row['bucket'] - first) // step
+            tickets[index] += row['tickets']
+            bookings[index] += row['bookings']
+
+        # counts this process hasn't written yet
+        with self._lock:
+            pending = [ring.counts() for rings in (self._inflight, self._rings)
+                       for ring_event, ring in rings.items() if event_id is None or ring_event == event_id]
+        for counts in pending:
+            for minute, minute_tickets, minute_bookings in counts:
+                index = (minute * 60 - first) // step
+                if 0 <= index < size:
+                    tickets[index] += minute_tickets
+                    bookings[index] += minute_bookings
+
+        return {
+            'event_id': event_id,
+            'resolution': resolution,
+            'from': _iso(first),
+            'to': _iso(last + step),
+            'totals': {'tickets': sum(tickets), 'bookings': sum(bookings)},
+            'buckets': [
+                {'start': _iso(first + index * step), 'tickets': tickets[index], 'bookings': bookings[index]}
+                for index in range(size)
+            ]
+        }
+
+    # 💾 Persistence
+    def flush(self):
+        """Add the pending minutes to the minute/hour/day rows - returns rows written"""
+        storage = self.db.get_storage()
+        if not storage:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                rings, self._rings = self._rings, {}
+                self._inflight = rings
+            rows = _downsample(rings)
+            try:
+                if rows:
+                    storage.add_sales_rollups(rows)
+            except Exception:
+                with self._lock:
+                    for event_id, ring in rings.items():
+                        for minute, tickets, bookings in ring.counts():
+                            self._add(event_id, minute, tickets, bookings)
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self._inflight = {}
+                self.flushed += len(rows)
+
+            if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                now = int(time.time())
+                for resolution, keep in self.retention.items():
+                    if keep:
+                        storage.prune_sales_rollups(resolution, now - keep)
+        return len(rows)
+
+    def status(self):
+        with self._lock:
+            return {'events_pending': len(self._rings), 'flushed_rows': self.flushed, 'dropped_tickets': self.dropped}
+
+    def _ensure_started(self):
+        # started on first use, i.e. after gunicorn has forked the worker
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='rollup-flush', daemon=True)
+            self._thread.start()
+        # a clean shutdown writes what's left instead of losing up to flush_interval of sales
+        atexit.register(self._flush_at_exit)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            log(logger, logging.ERROR, 'sales_rollup_flush_failed', exc_info=True)
+
+    def _flush_at_exit(self):
+        # best effort: by now the storage may be torn down (e.g. a test's temp directory)
+        try:
+            self.flush()
+        except Exception as e:
+            with self._lock:
+                pending = sum(tickets for ring in self._rings.values() for _, tickets, _ in ring.counts())
+            log(logger, logging.WARNING, 'sales_rollup_exit_flush_skipped', error=str(e), tickets=pending)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush_quietly()
+
+
+def _downsample(rings):
+    """Rows for ``Storage.add_sales_rollups`` - each minute added to its minute, hour and day"""
+    totals = {}
+    for event_id, ring in rings.items():
+        for minute, tickets, bookings in ring.counts():
+            for resolution, step in RESOLUTIONS.items():
+                key = (resolution, event_id, minute * 60 // step * step)
+                entry = totals.get(key)
+                if entry is None:
+                    totals[key] = [tickets, bookings]
+                else:
+                    entry[0] += tickets
+                    entry[1] += bookings
+    return [
+        {'event_id': event_id, 'resolution': resolution, 'bucket': bucket, 'tickets': tickets, 'bookings': bookings}
+        for (resolution, event_id, bucket), (tickets, bookings) in totals.items()
+    ]
@@ -1,29 +1,93 @@
-from flask import Blueprint, jsonify
-from database import get_supabase_client
+from flask import Blueprint, request, jsonify, current_app
+from profiling import FORMATS
+from rollups import parse_time
+from tokens import require_role
 
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/admin/stats', methods=['GET'])
+@require_role('admin', message='Admin access required')
 def admin_stats():
+    """📊 Served from the running totals in stats.py - O(1) per request"""
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not token.startswith('admin-token-'):
-            return jsonify({'error': 'Admin access required'}), 403
+        stats = current_app.extensions['stats']
         
-        client = get_supabase_client()
+        event_id = request.args.get('event_id')
+        snapshot = stats.snapshot(event_id)
+        if snapshot is None:
+            return jsonify({'error': 'Event not found'}), 404
         
-        # Total events
-        events = client.table('events').select('count', count='exact').execute()
-        total_events = events.count
+        return jsonify(snapshot), 200
         
-        # Total tickets booked
-        registrations = client.table('registrations').select('sum(tickets)', count='exact').execute()
-        total_tickets = sum([r['tickets'] for r in registrations.data]) if registrations.data else 0
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/sales-timeseries', methods=['GET'])
+@require_role('admin', message='Admin access required')
+def sales_timeseries():
+    """📈 Served from the per-minute rollups in rollups.py - O(buckets), not O(registrations)
+
+    ?resolution=minute|hour|day (default hour), ?from= / ?to= as ISO 8601
+    or epoch seconds (default: the last 120 buckets), ?event_id= for one event
+    """
+    try:
+        rollups = current_app.extensions['rollups']
+        
+        series = rollups.series(
+            request.args.get('event_id'),
+            request.args.get('resolution', 'hour'),
+            parse_time(request.args.get('from')),
+            parse_time(request.args.get('to'))
+        )
+        if series is None:
+            return jsonify({'error': 'Database unavailable'}), 503
+        
+        return jsonify(series), 200
         
-        return jsonify({
-            'total_events': total_events,
-            'total_tickets': total_tickets
-        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/profiling', methods=['GET'])
+@require_role('admin', message='Admin access required')
+def profiling_status():
+    """🔬 Profiler settings and the captures on disk, newest first"""
+    profiler = current_app.extensions['profiler']
+    return jsonify({**profiler.status(), 'captures': profiler.captures()}), 200
+
+@admin_bp.route('/admin/profiling', methods=['PUT'])
+@require_role('admin', message='Admin access required')
+def configure_profiling():
+    """🔬 {"enabled": true, "sample_rate": 0.05, "slow_ms": 500} - any subset, every worker follows"""
+    try:
+        data = request.get_json(silent=True) or {}
+        status = current_app.extensions['profiler'].configure(
+            enabled=data.get('enabled'),
+            sample_rate=data.get('sample_rate'),
+            slow_ms=data.get('slow_ms')
+        )
+        return jsonify(status), 200
         
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/profiling/captures/<capture_id>', methods=['GET'])
+@require_role('admin', message='Admin access required')
+def download_profile(capture_id):
+    """🔬 ?format=pstats|collapsed - ``capture_id`` may be several ids joined with commas (merged)"""
+    fmt = request.args.get('format', 'collapsed')
+    try:
+        body = current_app.extensions['profiler'].download(capture_id.split(','), fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if body is None:
+        return jsonify({'error': 'Capture not found'}), 404
+    
+    filename = capture_id if ',' not in capture_id else 'merged'
+    return current_app.response_class(body, mimetype=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="profile-{filename}.{fmt}"',
+        'Cache-Control': 'no-store'
+    })
@@ -0,0 +1,417 @@
+"""🔎 In-memory search index for /api/events/search
+
+An inverted index over event titles and descriptions. The write paths keep
+it current (``add`` on create/import, ``remove`` on delete) - nothing is
+rebuilt per write. A background refresh re-reads the catalogue every
+``refresh_interval`` seconds to pick up events written by other processes -
+sooner with a ``channel`` (coherence.py): a search that sees another worker
+changed the catalogue schedules a reload, at most every
+``coherence_interval`` seconds.
+
+* words are casefolded and accent-stripped; every query word matches as a
+  prefix (``jaz fest`` finds "Jazz Festival") and all of them must match
+* the vocabulary is a sorted list, so a prefix is a ``bisect`` range
+* postings are ``array('I')`` document numbers - 4 bytes per entry
+* documents are numbered in ``(date, id)`` order when the index is built,
+  so results come back in /api/events order by sorting numbers, and a date
+  window is a bisect range. Events added later sit in a small date-sorted
+  tail until the background thread rebuilds (from memory, no database).
+
+A query is answered whichever way touches fewer entries: intersect the
+postings of its words (smallest first) and take the earliest matches, or -
+for broad prefixes like ``a`` - walk the date window in order and stop
+after ``limit`` hits.
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from datetime import datetime
+
+from logs import get_logger, log
+from pagination import EventQuery
+
+logger = get_logger('search')
+
+SEARCH_FIELDS = ['id', 'title', 'description', 'date']
+# + 1 look-ahead row = PostgREST's 1000 row response cap
+LOAD_PAGE = 999
+# sorts after every real word / id
+HIGHEST = '\U0010ffff'
+# events added (or removed) since the last build before it is redone
+REBUILD_AFTER = 2000
+# query planning, in units of one walked document: a posting entry put into
+# a set, a step of a merge over several terms (at most MAX_MERGE of them);
+# how much bigger a word's set may be than the candidates and still be intersected
+SET_COST = 0.1
+MERGE_COST = 3
+MAX_MERGE = 16
+INTERSECT_RATIO = 20
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Casefolded, accent-stripped words, each once, in order"""
+    if not text:
+        return []
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return list(dict.fromkeys(_WORD_RE.findall(text.casefold())))
+
+
+def window(query):
+    """``(lo, hi)`` date-order keys for an ``EventQuery``'s from/to/when"""
+    lo, hi = ('',), (HIGHEST,)
+    if query.date_from:
+        lo = max(lo, (query.date_from,))
+    if query.date_to:
+        hi = min(hi, (query.date_to, HIGHEST))
+    if query.when == 'upcoming':
+        lo = max(lo, (query.today,))
+    elif query.when == 'past':
+        hi = min(hi, (query.today,))
+    return lo, hi
+
+
+def load_events(storage):
+    """Every event's searchable fields, one keyset page at a time"""
+    cursor = None
+    while True:
+        rows = storage.list_events(EventQuery(limit=LOAD_PAGE, cursor=cursor, fields=SEARCH_FIELDS))
+        yield from rows[:LOAD_PAGE]
+        if len(rows) <= LOAD_PAGE:
+            return
+        cursor = (rows[LOAD_PAGE - 1]['date'], rows[LOAD_PAGE - 1]['id'])
+
+
+def _doc(event):
+    words = tokenize(f"{event.get('title') or ''} {event.get('description') or ''}")
+    return str(event.get('date') or ''), event['id'], event.get('title'), words
+
+
+def _unique(docnos):
+    """Drop repeats from a sorted stream (a doc can match several terms of a prefix)"""
+    previous = None
+    for docno in docnos:
+        if docno != previous:
+            yield docno
+            previous = docno
+
+
+class _Index:
+    """The data structure alone - callers hold the lock.
+
+    Documents numbered below ``sealed`` were loaded in one ``build()`` and are
+    numbered in ``(date, id)`` order, so sorting docnos sorts by date. Events
+    added since then get higher numbers and are also kept in ``tail``, a small
+    date-sorted list, until the next build folds them in.
+    """
+
+    def __init__(self):
+        self.docs = []          # docno -> (date, event_id, title, ' word word ...') or None once removed
+        self.ids = {}           # event_id -> docno
+        self.postings = {}      # word -> array('I') of docnos, ascending
+        self.terms = []         # sorted vocabulary
+        self.keys = []          # (date, event_id) of the sealed docs, ascending
+        self.sealed = 0
+        self.tail = []          # sorted (date, event_id, docno) added after the build
+        self.removed = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, docs):
+        """Bulk load ``(date, event_id, title, words)`` tuples"""
+        index = cls()
+        for date, event_id, title, words in sorted(docs, key=lambda doc: doc[:2]):
+            if event_id in index.ids:
+                continue
+            index.keys.append((date, event_id))
+            index._add(date, event_id, title, words, bulk=True)
+        index.terms.sort()
+        index.sealed = len(index.docs)
+        return index
+
+    def add(self, event):
+        self.remove(event['id'])
+        date, event_id, title, words = _doc(event)
+        self._add(date, event_id, title, words)
+        bisect.insort(self.tail, (date, event_id, self.ids[event_id]))
+
+    def _add(self, date, event_id, title, words, bulk=False):
+        docno = len(self.docs)
+        self.docs.append((date, event_id, title, ' ' + ' '.join(words)))
+        self.ids[event_id] = docno
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = array('I')
+                if bulk:
+                    self.terms.append(word)
+                else:
+                    bisect.insort(self.terms, word)
+            # docnos only grow, so appending keeps every posting sorted
+            posting.append(docno)
+
+    def remove(self, event_id):
+        docno = self.ids.pop(event_id, None)
+        if docno is None:
+            return False
+        date = self.docs[docno][0]
+        self.docs[docno] = None
+        if docno >= self.sealed:
+            del self.tail[bisect.bisect_left(self.tail, (date, event_id, docno))]
+        # postings and keys keep the dead docno - skipped by queries, dropped by the next build
+        self.removed += 1
+        return True
+
+    def needs_rebuild(self):
+        return len(self.tail) > REBUILD_AFTER or (self.removed > REBUILD_AFTER and self.removed > len(self.ids))
+
+    def live_docs(self):
+        return [(date, event_id, title, text.split()) for date, event_id, title, text in filter(None, self.docs)]
+
+    def _prefix_range(self, word):
+        return bisect.bisect_left(self.terms, word), bisect.bisect_left(self.terms, word + HIGHEST)
+
+    def _matches(self, first, last, cap):
+        """Posting entries in a term range, counted up to ``cap``"""
+        size = 0
+        for position in range(first, last):
+            size += len(self.postings[self.terms[position]])
+            if size >= cap:
+                return cap
+        return size
+
+    def _docset(self, first, last):
+        docs = set()
+        for position in range(first, last):
+            docs.update(self.postings[self.terms[position]])
+        return docs
+
+    def search(self, words, lo, hi, limit, plan=None):
+        """Up to ``limit`` docs matching every word, ``lo <= (date, id) < hi``, in date order.
+
+        ``plan`` forces ``'window'``, ``'driver'`` or ``'sets'`` over the cheapest one.
+        """
+        total = len(self.ids)
+        if not total:
+            return []
+        # the window as a docno range of the sealed docs
+        start, stop = bisect.bisect_left(self.keys, lo), bisect.bisect_left(self.keys, hi)
+        span = stop - start + len(self.tail)
+
+        ranges = []
+        for word in words:
+            first, last = self._prefix_range(word)
+            if first == last:
+                return []
+            ranges.append((self._matches(first, last, total), word, first, last))
+        ranges.sort()
+        size, _, first, last = ranges[0]
+
+        # rough cost of each plan, assuming words occur independently
+        others = 1.0
+        for other, _, _, _ in ranges[1:]:
+            others *= other / total
+        expected = span * size / total * others
+        plans = {
+            # every doc in the window, in date order
+            'window': span if expected < limit else limit * span / expected,
+            # the rarest word's docs in date order (its postings are)
+            'driver': (size * span / total if expected < limit else limit / others)
+            * (1 if last - first == 1 else MERGE_COST) if last - first <= MAX_MERGE else float('inf'),
+            # materialize + intersect the sets in C
+            'sets': SET_COST * sum(other for other, _, _, _ in ranges)
+        }
+        plan = plan or min(plans, key=plans.get)
+
+        candidates = None
+        needles = [f' {word}' for word in words]
+        if plan == 'window':
+            hits = self._walk(range(start, stop), needles, limit)
+        elif plan == 'driver':
+            streams = []
+            for position in range(first, last):
+                posting = self.postings[self.terms[position]]
+                streams.append(itertools.islice(posting, bisect.bisect_left(posting, start),
+                                                bisect.bisect_left(posting, stop)))
+            docnos = streams[0] if len(streams) == 1 else _unique(heapq.merge(*streams))
+            hits = self._walk(docnos, [f' {word}' for _, word, _, _ in ranges[1:]], limit)
+        else:
+            # smallest set first, intersect while the next set is comparable,
+            # the rest are checked word by word as candidates come up in date order
+            candidates = self._docset(first, last)
+            needles = []
+            for other, word, first, last in ranges[1:]:
+                if other <= len(candidates) * INTERSECT_RATIO:
+                    candidates &= self._docset(first, last)
+                else:
+                    needles.append(f' {word}')
+            ordered = sorted(candidates)
+            first = bisect.bisect_left(ordered, start)
+            last = bisect.bisect_left(ordered, stop, first)
+            hits = self._walk(itertools.islice(ordered, first, last), needles, limit)
+
+        if self.tail:
+            tail = itertools.islice(self.tail, bisect.bisect_left(self.tail, lo), bisect.bisect_left(self.tail, hi))
+            tail = (docno for _, _, docno in tail if candidates is None or docno in candidates)
+            hits = heapq.nsmallest(limit, hits + self._walk(tail, needles, limit))
+        return [{'id': event_id, 'title': title, 'date': date} for date, event_id, title, _ in hits]
+
+    def _walk(self, docnos, needles, limit):
+        """Live docs from ``docnos`` (in date order) containing every needle, up to ``limit``"""
+        docs = self.docs
+        hits = []
+        for docno in docnos:
+            doc = docs[docno]
+            if doc is not None and all(needle in doc[3] for needle in needles):
+                hits.append(doc)
+                if len(hits) == limit:
+                    break
+        return hits
+
+
+class SearchIndex:
+    def __init__(self, db, refresh_interval=300, channel=None, coherence_interval=30):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.channel = channel
+        self.coherence_interval = coherence_interval
+        self.refreshed_at = None
+        self._index = _Index()
+        self._pending = None    # writes made while a rebuild is running
+        self._seen = None       # shared catalogue version the index includes
+        self._refresh_due = False
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+
+    @property
+    def size(self):
+        return len(self._index)
+
+    # ✍️ Write-path hooks
+    def add(self, events):
+        """Index new events (dicts with id, title, description, date)"""
+        with self._lock:
+            for event in events:
+                self._index.add(event)
+            if self._pending is not None:
+                self._pending.extend(('add', event) for event in events)
+            if self._index.needs_rebuild():
+                self._wake.set()
+        self._announce()
+
+    def remove(self, event_id):
+        with self._lock:
+            self._index.remove(event_id)
+            if self._pending is not None:
+                self._pending.append(('remove', event_id))
+            if self._index.needs_rebuild():
+                self._wake.set()
+        self._announce()
+
+    def _announce(self):
+        if self.channel is None:
+            return
+        shared = self.channel.bump()
+        with self._lock:
+            # indexed locally already - only someone else's writes need a reload
+            if self._seen is not None and shared == self._seen + 1:
+                self._seen = shared
+
+    # 📖 Reads
+    def search(self, text, query, limit=20):
+        """Events matching every word of ``text`` inside ``query``'s date window"""
+        self._ensure_started()
+        words = tokenize(text)
+        if not words:
+            return []
+        lo, hi = window(query)
+        if self.channel is not None and not self._refresh_due and self.channel.version() != self._seen:
+            self._refresh_due = True
+            self._wake.set()
+        with self._lock:
+            return self._index.search(words, lo, hi, limit)
+
+    # 🔁 Rebuilds
+    def refresh(self):
+        """Rebuild from the database (O(events), off the hot path)"""
+        storage = self.db.get_storage()
+        if not storage:
+            return False
+        # read first: a write announced during the load schedules another one
+        seen = self.channel.version() if self.channel is not None else None
+        self._refresh_due = False
+        self._last_refresh = time.monotonic()
+        index = self._rebuild(_doc(event) for event in load_events(storage))
+        self.refreshed_at = datetime.now().isoformat()
+        with self._lock:
+            self._seen = seen
+        log(logger, logging.INFO, 'search_index_refreshed', events=len(index), terms=len(index.terms))
+        return True
+
+    def _rebuild(self, source=None):
+        """Build a fresh index off the lock and swap it in (``source=None``: from memory)"""
+        with self._lock:
+            self._pending = []
+            if source is None:
+                live = list(filter(None, self._index.docs))
+                source = ((date, event_id, title, text.split()) for date, event_id, title, text in live)
+        try:
+            index = _Index.build(source)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            # local writes that raced the build win over the snapshot
+            for op, arg in self._pending:
+                if op == 'add':
+                    index.add(arg)
+                else:
+                    index.remove(arg)
+            self._pending = None
+            self._index = index
+        return index
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='search-refresh', daemon=True)
+        # First search pays one full load, later ones are served from memory
+        try:
+            self.refresh()
+        except Exception:
+            log(logger, logging.ERROR, 'search_refresh_failed', exc_info=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            # woken early once enough local writes piled up -> rebuild from memory,
+            # or once another worker changed the catalogue -> reload (throttled)
+            woken = self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            try:
+                if self._refresh_due:
+                    time.sleep(max(0.0, self._last_refresh + self.coherence_interval - time.monotonic()))
+                    self.refresh()
+                elif woken:
+                    self._rebuild()
+                else:
+                    self.refresh()
+            except Exception:
+                log(logger, logging.ERROR, 'search_refresh_failed', exc_info=True)
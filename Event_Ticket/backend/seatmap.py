@@ -0,0 +1,385 @@
+"""💺 Reserved seating: bitset seat maps with short holds
+
+An event can opt into a seat map - sections of rows of seats. Each section
+is one Python int used as a bitset (a set bit = sold / held seat), rows laid
+out back to back with a spare bit between them so a block never spans two
+rows. "N adjacent free seats" is a handful of shifts and ANDs over the whole
+section (``_runs``), so allocation costs O(log N) word-parallel operations on
+``section size / 64`` machine words - no per-seat loop, no per-seat row.
+
+* ``hold`` takes the best block (front-most row, closest to its centre) for
+  ``hold_seconds``; ``confirm`` turns it into a booking, ``release`` frees
+  it. Holds that run out are dropped the next time anyone touches the map.
+* the whole map - layout, sold bits and open holds - is one compact binary
+  blob (``to_blob`` / ``from_blob``); 50k seats in 50-seat rows take
+  about 8 KB.
+* every change is read-modify-write of that blob through
+  ``Storage.update_seat_map``: one transaction on SQLite, a version
+  compare-and-set on Supabase (``sql/seat_maps.sql``). Confirming also
+  decrements ``total_tickets`` and records the registration atomically, so
+  the event's ticket count stays the guard against overselling.
+"""
+import base64
+import secrets
+import struct
+import threading
+import time
+
+from reservations import ReservationError
+
+MAGIC = b'SEAT'
+FORMAT_VERSION = 1
+MAX_SECTIONS = 255
+MAX_ROW_SEATS = 1000
+MAX_SEATS = 200_000
+MAX_HOLD_SEATS = 20
+
+_HEADER = struct.Struct('<4sBB')
+_HOLD = struct.Struct('<6sdHHHH')    # id, expires (epoch), section, row, first seat, seats
+
+
+class SeatMapError(ReservationError):
+    """Seat map request rejected - carries the HTTP status"""
+
+
+class Hold:
+    __slots__ = ('hold_id', 'expires', 'section', 'row', 'start', 'count')
+
+    def __init__(self, hold_id, expires, section, row, start, count):
+        self.hold_id = hold_id
+        self.expires = expires
+        self.section = section
+        self.row = row
+        self.start = start
+        self.count = count
+
+
+class Section:
+    __slots__ = ('name', 'rows', 'stride', 'valid', 'sold', 'held')
+
+    def __init__(self, name, rows, sold=0):
+        self.name = name
+        self.rows = rows
+        # one spare (never free) bit after the longest row keeps blocks inside a row
+        self.stride = max(rows) + 1
+        self.valid = 0
+        for index, length in enumerate(rows):
+            self.valid |= ((1 << length) - 1) << (index * self.stride)
+        self.sold = sold
+        self.held = 0
+
+    @property
+    def free(self):
+        return self.valid & ~(self.sold | self.held)
+
+    def mask(self, row, start, count):
+        return ((1 << count) - 1) << (row * self.stride + start)
+
+    def best_block(self, count):
+        """``(row, first seat)`` of the best free block of ``count`` seats, or None"""
+        runs = _runs(self.free, count)
+        if not runs:
+            return None
+        # lowest set bit -> front-most row with room
+        row = ((runs & -runs).bit_length() - 1) // self.stride
+        row_runs = (runs >> (row * self.stride)) & ((1 << self.stride) - 1)
+        # then the start closest to the middle of that row
+        centre = (self.rows[row] - count) // 2
+        above = row_runs >> centre
+        below = row_runs & ((1 << (centre + 1)) - 1)
+        candidates = []
+        if above:
+            candidates.append(centre + (above & -above).bit_length() - 1)
+        if below:
+            candidates.append(below.bit_length() - 1)
+        return row, min(candidates, key=lambda start: (abs(start - centre), start))
+
+
+def _runs(free, count):
+    """Bit ``i`` set where seats ``i .. i + count - 1`` are all free"""
+    runs, width = free, 1
+    while width * 2 <= count:
+        runs &= runs >> width
+        width *= 2
+    if width < count:
+        runs &= runs >> (count - width)
+    return runs
+
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+
+def _bitmap_bytes(section):
+    return (len(section.rows) * section.stride + 7) // 8
+
+
+class SeatMap:
+    def __init__(self, sections, holds=None):
+        self.sections = sections
+        self.holds = {}
+        for hold in holds or ():
+            self._apply_hold(hold)
+
+    # 🏗️ Layout
+    @classmethod
+    def from_layout(cls, layout):
+        """``{"sections": [{"name": "Stalls", "rows": [20, 22, ...]}, ...]}``
+
+        A section may give ``"rows": 30, "seats": 40`` for a regular block.
+        Raises ``SeatMapError`` on a bad layout.
+        """
+        sections = layout.get('sections') if isinstance(layout, dict) else None
+        if not isinstance(sections, list) or not 1 <= len(sections) <= MAX_SECTIONS:
+            raise SeatMapError(f'sections must be a list of 1-{MAX_SECTIONS} sections')
+        built, names, total = [], set(), 0
+        for entry in sections:
+            if not isinstance(entry, dict):
+                raise SeatMapError('Each section needs a name and rows')
+            name = str(entry.get('name') or '').strip()
+            rows = entry.get('rows')
+            if isinstance(rows, int) and isinstance(entry.get('seats'), int):
+                rows = [entry['seats']] * rows
+            if not name or len(name.encode()) > 40 or name in names:
+                raise SeatMapError('Section names must be unique, 1-40 characters')
+            if (not isinstance(rows, list) or not 1 <= len(rows) <= 65_535
+                    or not all(isinstance(n, int) and 1 <= n <= MAX_ROW_SEATS for n in rows)):
+                raise SeatMapError(f'Section {name}: rows must be seat counts of 1-{MAX_ROW_SEATS}')
+            names.add(name)
+            total += sum(rows)
+            built.append(Section(name, tuple(rows)))
+        if total > MAX_SEATS:
+            raise SeatMapError(f'At most {MAX_SEATS} seats per event')
+        return cls(built)
+
+    @property
+    def seats(self):
+        return sum(sum(section.rows) for section in self.sections)
+
+    def counts(self):
+        sold = sum(_popcount(section.sold) for section in self.sections)
+        held = sum(_popcount(section.held) for section in self.sections)
+        return {'seats': self.seats, 'sold': sold, 'held': held, 'free': self.seats - sold - held}
+
+    # ⏳ Holds
+    def _apply_hold(self, hold):
+        section = self.sections[hold.section]
+        section.held |= section.mask(hold.row, hold.start, hold.count)
+        self.holds[hold.hold_id] = hold
+
+    def _drop_hold(self, hold):
+        section = self.sections[hold.section]
+        section.held &= ~section.mask(hold.row, hold.start, hold.count)
+        del self.holds[hold.hold_id]
+
+    def expire(self, now=None):
+        """Release holds that ran out - returns how many"""
+        now = time.time() if now is None else now
+        expired = [hold for hold in self.holds.values() if hold.expires <= now]
+        for hold in expired:
+            self._drop_hold(hold)
+        return len(expired)
+
+    def hold(self, count, ttl, section=None, now=None):
+        """Hold the best block of ``count`` adjacent seats - raises ``SeatMapError``"""
+        if not 1 <= count <= MAX_HOLD_SEATS:
+            raise SeatMapError(f'Choose 1-{MAX_HOLD_SEATS} seats')
+        now = time.time() if now is None else now
+        self.expire(now)
+        choices = range(len(self.sections))
+        if section is not None:
+            choices = [index for index in choices if self.sections[index].name == section]
+            if not choices:
+                raise SeatMapError(f'No section named {section}', status=404)
+        for index in choices:
+            block = self.sections[index].best_block(count)
+            if block is not None:
+                hold = Hold(secrets.token_bytes(6), now + ttl, index, block[0], block[1], count)
+                self._apply_hold(hold)
+                return hold
+        raise SeatMapError(f'No {count} adjacent seats left' + (f' in {section}' if section else ''), status=409)
+
+    def take(self, hold_id, now=None):
+        """Hold -> sold; returns the ``Hold`` (raises if unknown or expired)"""
+        self.expire(now)
+        hold = self.holds.get(self._hold_key(hold_id))
+        if hold is None:
+            raise SeatMapError('Hold expired or unknown - please choose seats again', status=410)
+        self._drop_hold(hold)
+        section = self.sections[hold.section]
+        section.sold |= section.mask(hold.row, hold.start, hold.count)
+        return hold
+
+    def release(self, hold_id):
+        hold = self.holds.get(self._hold_key(hold_id))
+        if hold is None:
+            return False
+        self._drop_hold(hold)
+        return True
+
+    @staticmethod
+    def _hold_key(hold_id):
+        try:
+            key = bytes.fromhex(hold_id)
+        except (TypeError, ValueError):
+            return None
+        return key if len(key) == 6 else None
+
+    def describe(self, hold):
+        """JSON-friendly seats of a hold - seat and row numbers start at 1"""
+        section = self.sections[hold.section]
+        return {
+            'hold_id': hold.hold_id.hex(),
+            'section': section.name,
+            'row': hold.row + 1,
+            'seats': list(range(hold.start + 1, hold.start + hold.count + 1)),
+            'expires_in': max(0, round(hold.expires - time.time()))
+        }
+
+    def availability(self):
+        """Layout + free-seat bitmaps (base64, little-endian, ``stride`` bits per row)"""
+        return {
+            **self.counts(),
+            'sections': [{
+                'name': section.name,
+                'rows': list(section.rows),
+                'stride': section.stride,
+                'free': base64.b64encode(section.free.to_bytes(_bitmap_bytes(section), 'little')).decode()
+            } for section in self.sections]
+        }
+
+    # 💾 Binary blob
+    def to_blob(self):
+        parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(self.sections))]
+        for section in self.sections:
+            name = section.name.encode()
+            parts.append(struct.pack(f'<B{len(name)}sH{len(section.rows)}H', len(name), name,
+                                     len(section.rows), *section.rows))
+            parts.append(section.sold.to_bytes(_bitmap_bytes(section), 'little'))
+        parts.append(struct.pack('<H', len(self.holds)))
+        for hold in self.holds.values():
+            parts.append(_HOLD.pack(hold.hold_id, hold.expires, hold.section, hold.row, hold.start, hold.count))
+        return b''.join(parts)
+
+    @classmethod
+    def from_blob(cls, blob):
+        blob = bytes(blob)
+        magic, version, section_count = _HEADER.unpack_from(blob)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Not a seat map blob')
+        offset = _HEADER.size
+        sections = []
+        for _ in range(section_count):
+            length = blob[offset]
+            name = blob[offset + 1:offset + 1 + length].decode()
+            offset += 1 + length
+            (row_count,) = struct.unpack_from('<H', blob, offset)
+            rows = struct.unpack_from(f'<{row_count}H', blob, offset + 2)
+            offset += 2 + 2 * row_count
+            section = Section(name, rows)
+            size = _bitmap_bytes(section)
+            section.sold = int.from_bytes(blob[offset:offset + size], 'little')
+            offset += size
+            sections.append(section)
+        (hold_count,) = struct.unpack_from('<H', blob, offset)
+        offset += 2
+        holds = [Hold(*_HOLD.unpack_from(blob, offset + index * _HOLD.size)) for index in range(hold_count)]
+        return cls(sections, holds)
+
+
+class SeatMaps:
+    """Seat map operations on top of ``Storage.update_seat_map``"""
+
+    def __init__(self, hold_seconds=120, registry_ttl=30, channel=None):
+        self.hold_seconds = hold_seconds
+        self.registry_ttl = registry_ttl
+        self.channel = channel
+        self._seated = frozenset()
+        self._seated_expires = 0.0
+        self._seated_version = None
+        self._lock = threading.Lock()
+
+    def create(self, storage, event_id, layout):
+        seat_map = SeatMap.from_layout(layout)
+        storage.create_seat_map(event_id, seat_map.to_blob(), seat_map.seats)
+        self._changed(lambda seated: seated | {event_id})
+        return seat_map.counts()
+
+    def get(self, storage, event_id):
+        blob = storage.get_seat_map(event_id)
+        if blob is None:
+            raise SeatMapError('This event has no seat map', status=404)
+        seat_map = SeatMap.from_blob(blob)
+        seat_map.expire()
+        return seat_map
+
+    def hold(self, storage, event_id, tickets, section=None):
+        def change(seat_map):
+            return seat_map.describe(seat_map.hold(tickets, self.hold_seconds, section)), None
+        return self._update(storage, event_id, change)[0]
+
+    def release(self, storage, event_id, hold_id):
+        return self._update(storage, event_id, lambda seat_map: (seat_map.release(hold_id), None))[0]
+
+    def confirm(self, storage, event_id, hold_id, name, email):
+        """Book a held block - ``(seats, remaining)``"""
+        def change(seat_map):
+            hold = seat_map.take(hold_id)
+            return self._booked(seat_map, hold, name, email)
+        return self._update(storage, event_id, change)
+
+    def book_best(self, storage, event_id, tickets, name, email):
+        """Hold + confirm in one step - what a plain booking of a seated event does"""
+        def change(seat_map):
+            hold = seat_map.hold(tickets, self.hold_seconds)
+            seat_map.take(hold.hold_id.hex())
+            return self._booked(seat_map, hold, name, email)
+        return self._update(storage, event_id, change)
+
+    def is_seated(self, storage, event_id):
+        """Cheap check for the booking route (refreshed every ``registry_ttl`` seconds,
+        or as soon as another worker creates or deletes a seat map)"""
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    version = self.channel.version() if self.channel is not None else None
+                    self._seated = frozenset(storage.seated_event_ids())
+                    self._seated_expires = time.monotonic() + self.registry_ttl
+                    self._seated_version = version
+        return event_id in self._seated
+
+    def forget(self, event_id):
+        self._changed(lambda seated: seated - {event_id})
+
+    def _stale(self):
+        if time.monotonic() >= self._seated_expires:
+            return True
+        return self.channel is not None and self.channel.version() != self._seated_version
+
+    def _changed(self, apply):
+        shared = self.channel.bump() if self.channel is not None else None
+        with self._lock:
+            self._seated = apply(self._seated)
+            # our own bump doesn't make the registry stale
+            if shared is not None and self._seated_version is not None and shared == self._seated_version + 1:
+                self._seated_version = shared
+
+    @staticmethod
+    def _booked(seat_map, hold, name, email):
+        seats = seat_map.describe(hold)
+        del seats['hold_id'], seats['expires_in']
+        booking = {
+            'tickets': hold.count, 'name': name, 'email': email,
+            'section': seats['section'], 'row': seats['row'], 'first_seat': seats['seats'][0]
+        }
+        return seats, booking
+
+    @staticmethod
+    def _update(storage, event_id, change):
+        """``change(seat_map) -> (result, booking)`` applied atomically; ``(result, remaining)``"""
+        def apply(blob):
+            seat_map = SeatMap.from_blob(blob)
+            seat_map.expire()
+            result, booking = change(seat_map)
+            return seat_map.to_blob(), result, booking
+        return storage.update_seat_map(event_id, apply)
@@ -0,0 +1,6 @@
+-- 📤 Attendee export (export.py): run once in the Supabase SQL Editor.
+-- The export reads an event's registrations in id order, one page after
+-- another (event_id = $1 and id > $last order by id limit 1000); this
+-- index answers every page as a range scan instead of a sort.
+create index if not exists idx_registrations_event_id_id
+    on registrations (event_id, id);
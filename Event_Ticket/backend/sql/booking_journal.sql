@@ -0,0 +1,9 @@
+-- 📒 Write-behind booking journal (journal.py): run once in the Supabase
+-- SQL Editor before setting JOURNAL_ENABLED=1. Every journalled booking
+-- is inserted with its journal id; the unique index lets a replay after a
+-- crash skip the ones that already made it (on_conflict=journal_id).
+-- Bookings made through reserve_tickets() leave it null.
+alter table registrations add column if not exists journal_id text;
+
+create unique index if not exists idx_registrations_journal_id
+    on registrations (journal_id);
@@ -0,0 +1,20 @@
+-- 🎟️ Per-user booking history for /api/me/registrations: run once in the
+-- Supabase SQL Editor. The index serves "this user's bookings, newest
+-- first" as a range scan; the view joins each booking's event so a page
+-- is one request. security_invoker keeps the registrations/events access
+-- policies in force for whoever queries the view (Postgres 15+).
+create index if not exists idx_registrations_user_time
+    on registrations (user_email, registered_at desc, id desc);
+
+create or replace view registration_history
+with (security_invoker = true)
+as
+select r.id,
+       r.user_email,
+       r.event_id,
+       r.tickets,
+       r.registered_at,
+       e.title as event_title,
+       e.date as event_date
+  from registrations r
+  left join events e on e.id = r.event_id;
@@ -0,0 +1,124 @@
+-- 🎫 Atomic reservation: run once in the Supabase SQL Editor.
+-- Checks inventory, decrements it and records the registration in one
+-- transaction. The conditional UPDATE takes the event row lock, so
+-- concurrent bookings serialize here and can never oversell.
+create or replace function reserve_tickets(
+    p_event_id text,
+    p_tickets integer,
+    p_name text,
+    p_email text
+)
+returns table (status text, remaining integer)
+language plpgsql
+as $$
+declare
+    v_remaining integer;
+begin
+    if p_tickets is null or p_tickets <= 0 then
+        return query select 'invalid'::text, null::integer;
+        return;
+    end if;
+
+    update events
+       set total_tickets = total_tickets - p_tickets
+     where id = p_event_id
+       and total_tickets >= p_tickets
+    returning total_tickets into v_remaining;
+
+    if not found then
+        select total_tickets into v_remaining from events where id = p_event_id;
+        if not found then
+            return query select 'not_found'::text, null::integer;
+        else
+            return query select 'insufficient'::text, v_remaining;
+        end if;
+        return;
+    end if;
+
+    insert into registrations (name, user_email, event_id, tickets, registered_at)
+    values (p_name, p_email, p_event_id, p_tickets, now());
+
+    return query select 'ok'::text, v_remaining;
+end;
+$$;
+
+-- 🎟️ Group booking: every line or none, in one round trip.
+-- p_lines = [{"event_id": "...", "tickets": 2}, ...]. All events involved
+-- are locked in id order (no deadlocks between overlapping groups), every
+-- line is checked against one running count per event, and only if all of
+-- them fit are the counts decremented and the registrations inserted.
+create or replace function reserve_tickets_batch(
+    p_lines jsonb,
+    p_name text,
+    p_email text
+)
+returns table (event_id text, tickets integer, status text, remaining integer)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    v_left jsonb;
+    v_line record;
+    v_have integer;
+    v_status text;
+    v_failed boolean := false;
+    v_results jsonb := '[]'::jsonb;
+begin
+    perform 1
+       from events e
+      where e.id in (select l->>'event_id' from jsonb_array_elements(p_lines) l)
+      order by e.id
+        for update;
+
+    select coalesce(jsonb_object_agg(e.id, e.total_tickets), '{}'::jsonb)
+      into v_left
+      from events e
+     where e.id in (select l->>'event_id' from jsonb_array_elements(p_lines) l);
+
+    for v_line in
+        select l->>'event_id' as line_event, (l->>'tickets')::integer as line_tickets
+          from jsonb_array_elements(p_lines) with ordinality as t(l, ord)
+         order by ord
+    loop
+        v_have := (v_left->>v_line.line_event)::integer;
+        if v_line.line_tickets is null or v_line.line_tickets <= 0 then
+            v_status := 'invalid';
+        elsif v_have is null then
+            v_status := 'not_found';
+        elsif v_have < v_line.line_tickets then
+            v_status := 'insufficient';
+        else
+            v_status := 'ok';
+            v_left := jsonb_set(v_left, array[v_line.line_event], to_jsonb(v_have - v_line.line_tickets));
+        end if;
+        v_failed := v_failed or v_status <> 'ok';
+        v_results := v_results || jsonb_build_object(
+            'event_id', v_line.line_event,
+            'tickets', v_line.line_tickets,
+            'status', v_status,
+            'remaining', v_have
+        );
+    end loop;
+
+    if not v_failed then
+        update events e
+           set total_tickets = (v_left->>e.id)::integer
+         where e.id in (select jsonb_object_keys(v_left));
+
+        insert into registrations (name, user_email, event_id, tickets, registered_at)
+        select p_name, p_email, r->>'event_id', (r->>'tickets')::integer, now()
+          from jsonb_array_elements(v_results) r;
+    end if;
+
+    -- ok lines report what is left after the whole group
+    return query
+        select r->>'event_id',
+               (r->>'tickets')::integer,
+               r->>'status',
+               case when r->>'status' = 'ok'
+                    then (v_left->>(r->>'event_id'))::integer
+                    else (r->>'remaining')::integer end
+          from jsonb_array_elements(v_results) with ordinality as t(r, ord)
+         order by ord;
+end;
+$$;
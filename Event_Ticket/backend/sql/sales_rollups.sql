@@ -0,0 +1,41 @@
+-- 📈 Sales rollups (rollups.py): run once in the Supabase SQL Editor.
+-- Each worker adds its per-minute booking counts onto minute, hour and day
+-- rows every ROLLUP_FLUSH_SECONDS; /api/admin/sales-timeseries reads a
+-- range of one resolution instead of scanning registrations.
+create table if not exists sales_rollups (
+    resolution text not null check (resolution in ('minute', 'hour', 'day')),
+    event_id text not null references events (id) on delete cascade,
+    bucket bigint not null,         -- bucket start, epoch seconds (UTC)
+    tickets integer not null default 0,
+    bookings integer not null default 0,
+    primary key (resolution, event_id, bucket)
+);
+create index if not exists idx_sales_rollups_bucket on sales_rollups (resolution, bucket);
+
+-- Additive upsert for a whole flush in one statement. Rows for events
+-- deleted since the booking are skipped rather than failing the batch.
+create or replace function add_sales_rollups(p_rows jsonb)
+returns void
+language sql
+as $$
+    insert into sales_rollups (resolution, event_id, bucket, tickets, bookings)
+    select r.resolution, r.event_id, r.bucket, r.tickets, r.bookings
+    from jsonb_to_recordset(p_rows) as r(resolution text, event_id text, bucket bigint, tickets integer, bookings integer)
+    where exists (select 1 from events e where e.id = r.event_id)
+    on conflict (resolution, event_id, bucket) do update
+        set tickets = sales_rollups.tickets + excluded.tickets,
+            bookings = sales_rollups.bookings + excluded.bookings;
+$$;
+
+-- One-off backfill from the registrations made before the rollups existed
+-- (run right after creating the table, before the app starts flushing).
+insert into sales_rollups (resolution, event_id, bucket, tickets, bookings)
+select s.resolution, r.event_id,
+       floor(extract(epoch from r.registered_at) / s.step)::bigint * s.step,
+       sum(r.tickets), count(*)
+from registrations r
+cross join (values ('minute', 60), ('hour', 3600), ('day', 86400)) as s (resolution, step)
+where r.registered_at is not null
+  and exists (select 1 from events e where e.id = r.event_id)
+group by 1, 2, 3
+on conflict do nothing;
@@ -0,0 +1,80 @@
+-- 💺 Reserved seating (seatmap.py): run once in the Supabase SQL Editor.
+-- A seat map is one bytea blob per event - layout, sold-seat bitsets and
+-- open holds. Holds and releases rewrite it with a version check from the
+-- app; book_seats() does the confirming write together with the ticket
+-- count and the registration, so a seat is never sold without a ticket.
+create table if not exists seat_maps (
+    event_id text primary key references events (id) on delete cascade,
+    blob bytea not null,
+    version integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create table if not exists seat_assignments (
+    id bigint generated always as identity primary key,
+    event_id text not null references events (id) on delete cascade,
+    user_email text not null,
+    section text not null,
+    seat_row integer not null,
+    first_seat integer not null,
+    seats integer not null,
+    assigned_at timestamptz not null default now()
+);
+create index if not exists idx_seat_assignments_event_id on seat_assignments (event_id);
+
+-- Confirm a held block: p_blob is the map with the block marked sold,
+-- computed from version p_version. 'conflict' means someone else changed
+-- the map since - re-read and try again.
+create or replace function book_seats(
+    p_event_id text,
+    p_version integer,
+    p_blob bytea,
+    p_tickets integer,
+    p_name text,
+    p_email text,
+    p_section text,
+    p_row integer,
+    p_first_seat integer
+)
+returns table (status text, remaining integer)
+language plpgsql
+as $$
+declare
+    v_remaining integer;
+begin
+    -- same lock order as reserve_tickets: the event row first
+    select total_tickets into v_remaining from events where id = p_event_id for update;
+    if not found then
+        return query select 'not_found'::text, null::integer;
+        return;
+    end if;
+
+    perform 1 from seat_maps where event_id = p_event_id and version = p_version for update;
+    if not found then
+        return query select 'conflict'::text, v_remaining;
+        return;
+    end if;
+
+    if v_remaining < p_tickets then
+        return query select 'insufficient'::text, v_remaining;
+        return;
+    end if;
+
+    update seat_maps
+       set blob = p_blob, version = version + 1, updated_at = now()
+     where event_id = p_event_id;
+
+    update events
+       set total_tickets = total_tickets - p_tickets
+     where id = p_event_id
+    returning total_tickets into v_remaining;
+
+    insert into registrations (name, user_email, event_id, tickets, registered_at)
+    values (p_name, p_email, p_event_id, p_tickets, now());
+
+    insert into seat_assignments (event_id, user_email, section, seat_row, first_seat, seats)
+    values (p_event_id, p_email, p_section, p_row, p_first_seat, p_tickets);
+
+    return query select 'ok'::text, v_remaining;
+end;
+$$;
@@ -0,0 +1,137 @@
+"""🗂️ Preloaded, precompressed frontend
+
+At startup every page and asset is read into memory once:
+
+* assets (``css/``, ``js/``) get a content-hash name - ``js/app.3f2a1b9c.js``
+  - served with ``Cache-Control: immutable`` for a year; pages are rewritten
+  to reference those names
+* pages and the plain asset paths are served with ``no-cache`` + ETag, so
+  browsers revalidate them with a 304
+* each file is stored gzip-compressed too (and brotli, if the ``brotli``
+  package is installed); ``Accept-Encoding`` picks the smallest variant
+
+Serving is a dict lookup plus a header check - no filesystem access.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# below this, compression costs more than it saves
+MIN_COMPRESS_BYTES = 256
+
+
+class StaticFile:
+    __slots__ = ('variants', 'etag', 'mimetype', 'cache_control')
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+        # encoding -> bytes, smallest first ('identity' always present)
+        variants = {'identity': body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=11)
+            variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        self.variants = dict(sorted(
+            ((enc, data) for enc, data in variants.items() if enc == 'identity' or len(data) < len(body)),
+            key=lambda item: len(item[1])
+        ))
+
+
+class StaticSite:
+    def __init__(self, root, pages, asset_dirs=('css', 'js'), fallback='index.html', auto_reload=False):
+        self.root = root
+        self.pages = pages
+        self.asset_dirs = asset_dirs
+        self.fallback = fallback
+        self.auto_reload = auto_reload
+        self.files = {}
+        self._mtime = None
+        self.load()
+
+    # 📥 Startup
+    def load(self):
+        files = {}
+        fingerprinted = {}
+        for directory in self.asset_dirs:
+            base = os.path.join(self.root, directory)
+            if not os.path.isdir(base):
+                continue
+            for name in sorted(os.listdir(base)):
+                path = f'{directory}/{name}'
+                with open(os.path.join(base, name), 'rb') as f:
+                    body = f.read()
+                stem, ext = os.path.splitext(name)
+                hashed = f'{directory}/{stem}.{hashlib.sha1(body).hexdigest()[:8]}{ext}'
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                files[path] = StaticFile(body, mimetype, REVALIDATE)
+                files[hashed] = StaticFile(body, mimetype, IMMUTABLE)
+                fingerprinted[path] = hashed
+
+        for page in self.pages:
+            full = os.path.join(self.root, page)
+            if not os.path.exists(full):
+                continue
+            with open(full, encoding='utf-8') as f:
+                html = f.read()
+            for path, hashed in fingerprinted.items():
+                html = re.sub(r'(["\'])(/?)' + re.escape(path) + r'\1', rf'\1\2{hashed}\1', html)
+            files[page] = StaticFile(html.encode('utf-8'), 'text/html', REVALIDATE)
+
+        self.files = files
+        self._mtime = self._latest_mtime()
+
+    def _latest_mtime(self):
+        latest = 0
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                latest = max(latest, os.path.getmtime(os.path.join(dirpath, name)))
+        return latest
+
+    # 🚚 Serving
+    def lookup(self, path):
+        """Exact file, then ``<path>.html``, then the fallback page (None if missing)"""
+        if self.auto_reload and self._latest_mtime() != self._mtime:
+            self.load()
+        files = self.files
+        return files.get(path) or files.get(f'{path}.html') or files.get(self.fallback)
+
+    def respond(self, static_file, request):
+        encoding = negotiate(static_file.variants, request.headers.get('Accept-Encoding', ''))
+        etag = static_file.etag if encoding == 'identity' else f'{static_file.etag}-{encoding}'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(static_file.variants[encoding], mimetype=static_file.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = static_file.cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+def negotiate(variants, accept_encoding):
+    """Smallest variant the client accepts (``q=0`` excludes one)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding)
+    for encoding in variants:
+        if encoding == 'identity' or encoding in accepted or '*' in accepted:
+            return encoding
+    return 'identity'
@@ -0,0 +1,144 @@
+"""📊 Running admin statistics
+
+Totals are kept in memory and bumped by the write paths (event created,
+event deleted, tickets booked), so reading them is O(1) no matter how many
+registrations exist. A background thread reconciles against the database
+every ``reconcile_interval`` seconds to pick up writes made by other
+processes and correct any drift. With a ``channel`` (coherence.py) the
+write hooks announce themselves, and a read that finds another worker has
+written since the last recount schedules one early - at most every
+``coherence_interval`` seconds, since a recount is O(registrations).
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from logs import get_logger, log
+
+logger = get_logger('stats')
+
+
+class StatsAggregator:
+    def __init__(self, db, reconcile_interval=300, channel=None, coherence_interval=10):
+        self.db = db
+        self.reconcile_interval = reconcile_interval
+        self.channel = channel
+        self.coherence_interval = coherence_interval
+        self.total_events = 0
+        self.total_tickets = 0
+        self.total_bookings = 0
+        self.per_event = {}
+        self.reconciled_at = None
+        self._seen = None       # shared version the totals include
+        self._last_reconcile = 0.0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ✍️ Write-path hooks
+    def event_created(self, event_id):
+        with self._lock:
+            if event_id not in self.per_event:
+                self.per_event[event_id] = {'tickets': 0, 'bookings': 0}
+                self.total_events += 1
+        self._announce()
+
+    def event_deleted(self, event_id):
+        with self._lock:
+            if self.per_event.pop(event_id, None) is not None:
+                self.total_events -= 1
+        self._announce()
+
+    def booking(self, event_id, tickets):
+        with self._lock:
+            entry = self.per_event.setdefault(event_id, {'tickets': 0, 'bookings': 0})
+            entry['tickets'] += tickets
+            entry['bookings'] += 1
+            self.total_tickets += tickets
+            self.total_bookings += 1
+        self._announce()
+
+    def _announce(self):
+        if self.channel is None:
+            return
+        shared = self.channel.bump()
+        with self._lock:
+            # counted locally already - only someone else's writes make us stale
+            if self._seen is not None and shared == self._seen + 1:
+                self._seen = shared
+
+    # 📖 Reads
+    def snapshot(self, event_id=None):
+        """Current totals - ``event_id`` narrows to one event (None if unknown)"""
+        self._ensure_started()
+        if self.channel is not None and self.channel.version() != self._seen:
+            self._wake.set()
+        with self._lock:
+            if event_id is not None:
+                entry = self.per_event.get(event_id)
+                if entry is None:
+                    return None
+                return {'event_id': event_id, **entry, 'reconciled_at': self.reconciled_at}
+            return {
+                'total_events': self.total_events,
+                'total_tickets': self.total_tickets,
+                'total_bookings': self.total_bookings,
+                'reconciled_at': self.reconciled_at
+            }
+
+    # 🔁 Reconciliation
+    def reconcile(self):
+        """Recount everything from the database (O(registrations), off the hot path)"""
+        storage = self.db.get_storage()
+        if not storage:
+            return False
+
+        # read first: writes announced during the recount trigger another one
+        seen = self.channel.version() if self.channel is not None else None
+        self._last_reconcile = time.monotonic()
+        per_event = {event_id: {'tickets': 0, 'bookings': 0} for event_id in storage.event_ids()}
+        total_tickets = total_bookings = 0
+
+        for event_id, (tickets, bookings) in storage.registration_totals().items():
+            total_tickets += tickets
+            total_bookings += bookings
+            # registrations of deleted events still count towards the global totals
+            entry = per_event.get(event_id)
+            if entry is not None:
+                entry['tickets'] = tickets
+                entry['bookings'] = bookings
+
+        with self._lock:
+            self.per_event = per_event
+            self.total_events = len(per_event)
+            self.total_tickets = total_tickets
+            self.total_bookings = total_bookings
+            self.reconciled_at = datetime.now().isoformat()
+            self._seen = seen
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='stats-reconcile', daemon=True)
+        # First read pays one full count, later ones are served from memory
+        try:
+            self.reconcile()
+        except Exception:
+            log(logger, logging.ERROR, 'stats_reconcile_failed', exc_info=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            # woken early when another worker wrote (see snapshot), but never more often than coherence_interval
+            if self._wake.wait(self.reconcile_interval):
+                time.sleep(max(0.0, self._last_reconcile + self.coherence_interval - time.monotonic()))
+            self._wake.clear()
+            try:
+                self.reconcile()
+            except Exception:
+                log(logger, logging.ERROR, 'stats_reconcile_failed', exc_info=True)
@@ -0,0 +1,737 @@
+"""🗄️ Storage backends
+
+Every route talks to a ``Storage`` - the handful of operations the app
+actually needs - instead of chaining ``client.table(...)`` calls itself.
+
+* ``SupabaseStorage`` - the hosted Postgres via the Supabase client
+* ``SQLiteStorage``   - local file (WAL mode) for single-node deployments,
+  offline development and load tests
+
+Pick one with ``STORAGE_BACKEND=supabase|sqlite`` (see config.py).
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from logs import get_logger, log
+from reservations import ReservationEngine, ReservationError, check_batch, normalize_lines, settle_batch
+from rollups import RESOLUTIONS
+
+logger = get_logger('storage')
+
+REGISTRATION_PAGE = 1000
+# PostgREST "relation does not exist" (older / newer versions)
+MISSING_RELATION = ('42P01', 'PGRST205')
+
+
+def _to_bytea(blob):
+    # PostgREST takes and returns bytea in Postgres' hex text form
+    return '\\x' + bytes(blob).hex()
+
+
+def _from_bytea(value):
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+
+class Storage:
+    """Interface shared by all backends"""
+
+    name = 'base'
+
+    # 📋 Events
+    def list_events(self, query):
+        """Rows for an ``EventQuery`` (limit + 1 look-ahead row when paging)"""
+        raise NotImplementedError
+
+    def insert_event(self, event):
+        """Insert one event dict, return the stored rows"""
+        raise NotImplementedError
+
+    def insert_events(self, events):
+        """Insert a batch of event dicts in one round trip (all or nothing)"""
+        raise NotImplementedError
+
+    def delete_event(self, event_id):
+        raise NotImplementedError
+
+    def event_ids(self):
+        raise NotImplementedError
+
+    def event_exists(self, event_id):
+        raise NotImplementedError
+
+    # 🎫 Registrations
+    def reserve_tickets(self, event_id, tickets, name, email):
+        """Atomically check + decrement inventory and record the registration.
+
+        Returns the remaining ticket count, raises ``ReservationError``.
+        """
+        raise NotImplementedError
+
+    def reserve_many(self, lines, name, email):
+        """Group booking: every ``{event_id, tickets}`` line or none of them.
+
+        Returns the per-line results, raises ``BatchReservationError``.
+        """
+        raise NotImplementedError
+
+    def registration_totals(self):
+        """``{event_id: (tickets, bookings)}`` over all registrations"""
+        raise NotImplementedError
+
+    def event_attendees(self, query):
+        """One ``AttendeeQuery`` page of an event's registrations"""
+        raise NotImplementedError
+
+    # 📒 Write-behind journal (see journal.py)
+    def lease_tickets(self, event_id, want):
+        """Take up to ``want`` tickets off ``total_tickets`` - ``(taken, remaining)``"""
+        raise NotImplementedError
+
+    def return_tickets(self, event_id, tickets):
+        """Add leased tickets back - the new count, or None if the event is gone"""
+        raise NotImplementedError
+
+    def insert_registrations(self, rows):
+        """Bulk insert; rows whose ``journal_id`` is already stored are skipped"""
+        raise NotImplementedError
+
+    # 💺 Seat maps (see seatmap.py)
+    def create_seat_map(self, event_id, blob, seats):
+        """Store a new seat map and set the event's ``total_tickets`` to ``seats``"""
+        raise NotImplementedError
+
+    def get_seat_map(self, event_id):
+        """The seat map blob, or None"""
+        raise NotImplementedError
+
+    def update_seat_map(self, event_id, apply):
+        """Atomic read-modify-write of one seat map.
+
+        ``apply(blob) -> (new_blob, result, booking)``; a ``booking`` dict also
+        decrements ``total_tickets`` and records the registration and seat
+        assignment in the same step. Returns ``(result, remaining)``.
+        """
+        raise NotImplementedError
+
+    def seated_event_ids(self):
+        raise NotImplementedError
+
+    def user_registrations(self, query):
+        """Rows for a ``RegistrationQuery`` with the event title/date joined in (limit + 1)"""
+        raise NotImplementedError
+
+    # 📈 Sales rollups (see rollups.py)
+    def add_sales_rollups(self, rows):
+        """Add each row's tickets/bookings onto its ``(resolution, event_id, bucket)`` row.
+
+        Rows for events that no longer exist are skipped.
+        """
+        raise NotImplementedError
+
+    def sales_rollups(self, resolution, start, end, event_id=None):
+        """Rows with ``start <= bucket <= end`` - every event's unless ``event_id``"""
+        raise NotImplementedError
+
+    def prune_sales_rollups(self, resolution, before):
+        """Delete the rows of ``resolution`` older than ``before``"""
+        raise NotImplementedError
+
+    # 👤 Users
+    def get_user(self, email):
+        raise NotImplementedError
+
+    def insert_user(self, user):
+        raise NotImplementedError
+
+    def update_user_password(self, email, password_hash):
+        raise NotImplementedError
+
+    def ping(self):
+        """Cheap round trip used by health checks"""
+        raise NotImplementedError
+
+
+class SupabaseStorage(Storage):
+    name = 'supabase'
+
+    def __init__(self, client, reservation_mode='rpc'):
+        self.client = client
+        self.reservations = ReservationEngine(self, mode=reservation_mode)
+        self.history_view = True
+
+    def get_client(self):
+        return self.client
+
+    def list_events(self, query):
+        return query.apply(self.client).execute().data
+
+    def insert_event(self, event):
+        return self.client.table('events').insert(event).execute().data
+
+    def insert_events(self, events):
+        return self.client.table('events').insert(events).execute().data
+
+    def delete_event(self, event_id):
+        self.client.table('events').delete().eq('id', event_id).execute()
+
+    def event_ids(self):
+        return [e['id'] for e in self.client.table('events').select('id').execute().data]
+
+    def event_exists(self, event_id):
+        return bool(self.client.table('events').select('id').eq('id', event_id).limit(1).execute().data)
+
+    def reserve_tickets(self, event_id, tickets, name, email):
+        return self.reservations.reserve(event_id, tickets, name, email)
+
+    def reserve_many(self, lines, name, email):
+        return self.reservations.reserve_many(lines, name, email)
+
+    def event_attendees(self, query):
+        return query.apply(self.client).execute().data
+
+    def lease_tickets(self, event_id, want):
+        return self.reservations.lease(event_id, want)
+
+    def return_tickets(self, event_id, tickets):
+        return self.reservations.give_back(event_id, tickets)
+
+    def insert_registrations(self, rows):
+        try:
+            self.client.table('registrations').upsert(
+                rows, on_conflict='journal_id', ignore_duplicates=True, returning='minimal'
+            ).execute()
+        except Exception as e:
+            if getattr(e, 'code', None) in ('42703', 'PGRST204', '42P10'):
+                log(logger, logging.WARNING, 'journal_id_column_missing', fix='run sql/booking_journal.sql')
+            raise
+
+    def registration_totals(self):
+        # PostgREST caps responses at 1000 rows - page through
+        totals = {}
+        start = 0
+        while True:
+            rows = self.client.table('registrations').select('event_id,tickets').order('id') \
+                .range(start, start + REGISTRATION_PAGE).execute().data
+            for row in rows:
+                tickets, bookings = totals.get(row['event_id'], (0, 0))
+                totals[row['event_id']] = (tickets + row['tickets'], bookings + 1)
+            if len(rows) < REGISTRATION_PAGE:
+                return totals
+            start += REGISTRATION_PAGE
+
+    def user_registrations(self, query):
+        if self.history_view:
+            try:
+                return query.apply(self.client).execute().data
+            except Exception as e:
+                if getattr(e, 'code', None) not in MISSING_RELATION:
+                    raise
+                log(logger, logging.WARNING, 'registration_history_view_missing', fix='run sql/registration_history.sql')
+                self.history_view = False
+        # without the view: the page, then one lookup for all of its events
+        rows = query.apply(self.client, source='registrations').execute().data
+        event_ids = sorted({row['event_id'] for row in rows})
+        events = {}
+        if event_ids:
+            events = {e['id']: e for e in
+                      self.client.table('events').select('id,title,date').in_('id', event_ids).execute().data}
+        for row in rows:
+            event = events.get(row['event_id'], {})
+            row['event_title'] = event.get('title')
+            row['event_date'] = event.get('date')
+        return rows
+
+    def get_user(self, email):
+        rows = self.client.table('users').select('*').eq('email', email).execute().data
+        return rows[0] if rows else None
+
+    def insert_user(self, user):
+        self.client.table('users').insert(user).execute()
+
+    def update_user_password(self, email, password_hash):
+        self.client.table('users').update({'password': password_hash}).eq('email', email).execute()
+
+    def create_seat_map(self, event_id, blob, seats):
+        if not self.client.table('events').select('id').eq('id', event_id).execute().data:
+            raise ReservationError('Event not found', status=404)
+        try:
+            self.client.table('seat_maps').insert({'event_id': event_id, 'blob': _to_bytea(blob), 'version': 0}).execute()
+        except Exception as e:
+            code = getattr(e, 'code', None)
+            if code == '23505':
+                raise ReservationError('This event already has a seat map', status=409)
+            if code in MISSING_RELATION:
+                raise ReservationError('Seat maps are not available yet - run sql/seat_maps.sql', status=501)
+            raise
+        self.client.table('events').update({'total_tickets': seats}).eq('id', event_id).execute()
+
+    def get_seat_map(self, event_id):
+        rows = self._seat_map_rows(self.client.table('seat_maps').select('blob').eq('event_id', event_id))
+        return _from_bytea(rows[0]['blob']) if rows else None
+
+    def update_seat_map(self, event_id, apply):
+        # optimistic: re-read and re-apply when another writer bumped the version
+        for _ in range(self.reservations.CAS_RETRIES):
+            rows = self._seat_map_rows(self.client.table('seat_maps').select('blob,version').eq('event_id', event_id))
+            if not rows:
+                raise ReservationError('This event has no seat map', status=404)
+            version = rows[0]['version']
+            blob, result, booking = apply(_from_bytea(rows[0]['blob']))
+            if booking is None:
+                if self.client.table('seat_maps').update({'blob': _to_bytea(blob), 'version': version + 1}) \
+                        .eq('event_id', event_id).eq('version', version).execute().data:
+                    return result, None
+                continue
+            status, remaining = self._book_seats(event_id, version, blob, booking)
+            if status == 'ok':
+                return result, remaining
+            if status == 'not_found':
+                raise ReservationError('Event not found', status=404)
+            if status == 'insufficient':
+                raise ReservationError(f'Only {remaining} tickets available', remaining=remaining)
+        raise ReservationError('Seat map is busy - please retry', status=409)
+
+    def _book_seats(self, event_id, version, blob, booking):
+        try:
+            rows = self.client.rpc('book_seats', {
+                'p_event_id': event_id,
+                'p_version': version,
+                'p_blob': _to_bytea(blob),
+                'p_tickets': booking['tickets'],
+                'p_name': booking['name'],
+                'p_email': booking['email'],
+                'p_section': booking['section'],
+                'p_row': booking['row'],
+                'p_first_seat': booking['first_seat']
+            }).execute().data
+        except Exception as e:
+            if getattr(e, 'code', None) != 'PGRST202':
+                raise
+            log(logger, logging.WARNING, 'book_seats_function_missing', fix='run sql/seat_maps.sql')
+            raise ReservationError('Seat booking is not available yet', status=501)
+        if not rows:
+            raise ReservationError('Reservation failed', status=500)
+        return rows[0]['status'], rows[0]['remaining']
+
+    def add_sales_rollups(self, rows):
+        try:
+            self.client.rpc('add_sales_rollups', {'p_rows': rows}).execute()
+        except Exception as e:
+            if getattr(e, 'code', None) == 'PGRST202':
+                log(logger, logging.WARNING, 'add_sales_rollups_function_missing', fix='run sql/sales_rollups.sql')
+            raise
+
+    def sales_rollups(self, resolution, start, end, event_id=None):
+        # PostgREST caps responses at 1000 rows - page through
+        rows = []
+        while True:
+            query = self.client.table('sales_rollups').select('event_id,bucket,tickets,bookings') \
+                .eq('resolution', resolution).gte('bucket', start).lte('bucket', end)
+            if event_id is not None:
+                query = query.eq('event_id', event_id)
+            # one order param - repeating it would keep only the last column
+            page = query.order('bucket,event_id') \
+                .range(len(rows), len(rows) + REGISTRATION_PAGE).execute().data
+            rows.extend(page)
+            if len(page) < REGISTRATION_PAGE:
+                return rows
+
+    def prune_sales_rollups(self, resolution, before):
+        self.client.table('sales_rollups').delete(returning='minimal') \
+            .eq('resolution', resolution).lt('bucket', before).execute()
+
+    def seated_event_ids(self):
+        return [row['event_id'] for row in self._seat_map_rows(self.client.table('seat_maps').select('event_id'))]
+
+    @staticmethod
+    def _seat_map_rows(query):
+        try:
+            return query.execute().data
+        except Exception as e:
+            # not migrated yet -> no event has a seat map
+            if getattr(e, 'code', None) in MISSING_RELATION:
+                return []
+            raise
+
+    def ping(self):
+        self.client.table('events').select('id').limit(1).execute()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    date TEXT NOT NULL,
+    total_tickets INTEGER NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, id);
+
+CREATE TABLE IF NOT EXISTS registrations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    user_email TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    tickets INTEGER NOT NULL,
+    registered_at TEXT,
+    journal_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_registrations_event_id ON registrations (event_id);
+CREATE INDEX IF NOT EXISTS idx_registrations_user_email ON registrations (user_email);
+CREATE INDEX IF NOT EXISTS idx_registrations_user_time ON registrations (user_email, registered_at, id);
+
+CREATE TABLE IF NOT EXISTS seat_maps (
+    event_id TEXT PRIMARY KEY,
+    blob BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS seat_assignments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    user_email TEXT NOT NULL,
+    section TEXT NOT NULL,
+    seat_row INTEGER NOT NULL,
+    first_seat INTEGER NOT NULL,
+    seats INTEGER NOT NULL,
+    assigned_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_seat_assignments_event_id ON seat_assignments (event_id);
+
+CREATE TABLE IF NOT EXISTS sales_rollups (
+    resolution TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    tickets INTEGER NOT NULL DEFAULT 0,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, event_id, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_sales_rollups_bucket ON sales_rollups (resolution, bucket);
+
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+"""
+
+
+class SQLiteStorage(Storage):
+    """One connection per thread, WAL so readers never block the writer"""
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        backfill = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sales_rollups'").fetchone()
+        conn.executescript(SQLITE_SCHEMA)
+        # databases created before the booking journal
+        if 'journal_id' not in {row['name'] for row in conn.execute('PRAGMA table_info(registrations)')}:
+            conn.execute('ALTER TABLE registrations ADD COLUMN journal_id TEXT')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_registrations_journal_id ON registrations (journal_id)')
+        if backfill:
+            self._backfill_sales_rollups(conn)
+
+    @staticmethod
+    def _backfill_sales_rollups(conn):
+        # databases created before the rollups: one pass over the registrations
+        # (registered_at is the server's local time - read as UTC, like on a UTC host)
+        for resolution, step in RESOLUTIONS.items():
+            conn.execute(
+                'INSERT OR IGNORE INTO sales_rollups (resolution, event_id, bucket, tickets, bookings) '
+                f"SELECT ?, event_id, CAST(strftime('%s', registered_at) AS INTEGER) / {step} * {step}, "
+                'SUM(tickets), COUNT(*) FROM registrations WHERE registered_at IS NOT NULL GROUP BY 2, 3',
+                (resolution,)
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None -> we issue BEGIN/COMMIT ourselves
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def list_events(self, query):
+        sql, params = query.to_sql()
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def insert_event(self, event):
+        columns = ', '.join(event)
+        placeholders = ', '.join('?' for _ in event)
+        self._conn().execute(f'INSERT INTO events ({columns}) VALUES ({placeholders})', list(event.values()))
+        return [dict(event)]
+
+    def insert_events(self, events):
+        if not events:
+            return []
+        columns = list(events[0])
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                f'INSERT INTO events ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})',
+                [[event.get(c) for c in columns] for event in events]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [dict(event) for event in events]
+
+    def delete_event(self, event_id):
+        conn = self._conn()
+        conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+        conn.execute('DELETE FROM seat_maps WHERE event_id = ?', (event_id,))
+        conn.execute('DELETE FROM sales_rollups WHERE event_id = ?', (event_id,))
+
+    def event_ids(self):
+        return [row['id'] for row in self._conn().execute('SELECT id FROM events')]
+
+    def event_exists(self, event_id):
+        return self._conn().execute('SELECT 1 FROM events WHERE id = ?', (event_id,)).fetchone() is not None
+
+    def reserve_tickets(self, event_id, tickets, name, email):
+        tickets = int(tickets)
+        if tickets <= 0:
+            raise ReservationError('Tickets must be a positive number')
+
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front: check + decrement + insert are one unit
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # fetchall() steps the statement to completion before COMMIT
+            rows = conn.execute(
+                'UPDATE events SET total_tickets = total_tickets - ? '
+                'WHERE id = ? AND total_tickets >= ? RETURNING total_tickets',
+                (tickets, event_id, tickets)
+            ).fetchall()
+            if not rows:
+                current = conn.execute('SELECT total_tickets FROM events WHERE id = ?', (event_id,)).fetchone()
+                conn.execute('ROLLBACK')
+                if current is None:
+                    raise ReservationError('Event not found', status=404)
+                raise ReservationError(f'Only {current[0]} tickets available', remaining=current[0])
+            conn.execute(
+                'INSERT INTO registrations (name, user_email, event_id, tickets, registered_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (name, email, event_id, tickets, datetime.now().isoformat())
+            )
+            conn.execute('COMMIT')
+            return rows[0][0]
+        except ReservationError:
+            raise
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def reserve_many(self, lines, name, email):
+        lines = normalize_lines(lines)
+        event_ids = sorted({event_id for event_id, _ in lines})
+
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # one read for the whole group, under the write lock
+            rows = conn.execute(
+                f'SELECT id, total_tickets FROM events WHERE id IN ({", ".join("?" for _ in event_ids)})',
+                event_ids
+            ).fetchall()
+            results = settle_batch(lines, {row[0]: row[1] for row in rows})
+            try:
+                check_batch(results)
+            except ReservationError:
+                conn.execute('ROLLBACK')
+                raise
+
+            left = {r['event_id']: r['remaining'] for r in results}
+            conn.executemany('UPDATE events SET total_tickets = ? WHERE id = ?',
+                             [(remaining, event_id) for event_id, remaining in left.items()])
+            now = datetime.now().isoformat()
+            conn.executemany(
+                'INSERT INTO registrations (name, user_email, event_id, tickets, registered_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(name, email, event_id, tickets, now) for event_id, tickets in lines]
+            )
+            conn.execute('COMMIT')
+            return results
+        except ReservationError:
+            raise
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def registration_totals(self):
+        rows = self._conn().execute(
+            'SELECT event_id, SUM(tickets), COUNT(*) FROM registrations GROUP BY event_id'
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def user_registrations(self, query):
+        sql, params = query.to_sql()
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def event_attendees(self, query):
+        sql, params = query.to_sql()
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def lease_tickets(self, event_id, want):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT total_tickets FROM events WHERE id = ?', (event_id,)).fetchone()
+            if row is None:
+                raise ReservationError('Event not found', status=404)
+            taken = max(0, min(want, row[0]))
+            if taken:
+                conn.execute('UPDATE events SET total_tickets = total_tickets - ? WHERE id = ?', (taken, event_id))
+            conn.execute('COMMIT')
+            return taken, row[0] - taken
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def return_tickets(self, event_id, tickets):
+        rows = self._conn().execute(
+            'UPDATE events SET total_tickets = total_tickets + ? WHERE id = ? RETURNING total_tickets',
+            (tickets, event_id)
+        ).fetchall()
+        return rows[0][0] if rows else None
+
+    def insert_registrations(self, rows):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR IGNORE INTO registrations (journal_id, name, user_email, event_id, tickets, registered_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(row['journal_id'], row['name'], row['user_email'], row['event_id'], row['tickets'],
+                  row['registered_at']) for row in rows]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def create_seat_map(self, event_id, blob, seats):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if not conn.execute('UPDATE events SET total_tickets = ? WHERE id = ? RETURNING id',
+                                (seats, event_id)).fetchall():
+                raise ReservationError('Event not found', status=404)
+            try:
+                conn.execute('INSERT INTO seat_maps (event_id, blob, version, updated_at) VALUES (?, ?, 0, ?)',
+                             (event_id, blob, datetime.now().isoformat()))
+            except sqlite3.IntegrityError:
+                raise ReservationError('This event already has a seat map', status=409)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get_seat_map(self, event_id):
+        row = self._conn().execute('SELECT blob FROM seat_maps WHERE event_id = ?', (event_id,)).fetchone()
+        return row[0] if row else None
+
+    def update_seat_map(self, event_id, apply):
+        conn = self._conn()
+        # the write lock is held from the read to the commit - no lost updates, no retries
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT blob FROM seat_maps WHERE event_id = ?', (event_id,)).fetchone()
+            if row is None:
+                raise ReservationError('This event has no seat map', status=404)
+            blob, result, booking = apply(row[0])
+            now = datetime.now().isoformat()
+            conn.execute('UPDATE seat_maps SET blob = ?, version = version + 1, updated_at = ? WHERE event_id = ?',
+                         (blob, now, event_id))
+            remaining = None
+            if booking:
+                tickets = booking['tickets']
+                rows = conn.execute(
+                    'UPDATE events SET total_tickets = total_tickets - ? '
+                    'WHERE id = ? AND total_tickets >= ? RETURNING total_tickets',
+                    (tickets, event_id, tickets)
+                ).fetchall()
+                if not rows:
+                    current = conn.execute('SELECT total_tickets FROM events WHERE id = ?', (event_id,)).fetchone()
+                    if current is None:
+                        raise ReservationError('Event not found', status=404)
+                    raise ReservationError(f'Only {current[0]} tickets available', remaining=current[0])
+                remaining = rows[0][0]
+                conn.execute(
+                    'INSERT INTO registrations (name, user_email, event_id, tickets, registered_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (booking['name'], booking['email'], event_id, tickets, now)
+                )
+                conn.execute(
+                    'INSERT INTO seat_assignments (event_id, user_email, section, seat_row, first_seat, seats, '
+                    'assigned_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (event_id, booking['email'], booking['section'], booking['row'], booking['first_seat'],
+                     tickets, now)
+                )
+            conn.execute('COMMIT')
+            return result, remaining
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def add_sales_rollups(self, rows):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO sales_rollups (resolution, event_id, bucket, tickets, bookings) '
+                'SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM events WHERE id = ?) '
+                'ON CONFLICT (resolution, event_id, bucket) DO UPDATE SET '
+                'tickets = tickets + excluded.tickets, bookings = bookings + excluded.bookings',
+                [(row['resolution'], row['event_id'], row['bucket'], row['tickets'], row['bookings'],
+                  row['event_id']) for row in rows]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def sales_rollups(self, resolution, start, end, event_id=None):
+        sql = 'SELECT event_id, bucket, tickets, bookings FROM sales_rollups WHERE resolution = ? AND bucket BETWEEN ? AND ?'
+        params = [resolution, start, end]
+        if event_id is not None:
+            sql += ' AND event_id = ?'
+            params.append(event_id)
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def prune_sales_rollups(self, resolution, before):
+        self._conn().execute('DELETE FROM sales_rollups WHERE resolution = ? AND bucket < ?', (resolution, before))
+
+    def seated_event_ids(self):
+        return [row[0] for row in self._conn().execute('SELECT event_id FROM seat_maps')]
+
+    def get_user(self, email):
+        row = self._conn().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return dict(row) if row else None
+
+    def insert_user(self, user):
+        columns = ', '.join(user)
+        placeholders = ', '.join('?' for _ in user)
+        self._conn().execute(f'INSERT INTO users ({columns}) VALUES ({placeholders})', list(user.values()))
+
+    def update_user_password(self, email, password_hash):
+        self._conn().execute('UPDATE users SET password = ? WHERE email = ?', (password_hash, email))
+
+    def ping(self):
+        self._conn().execute('SELECT 1').fetchone()
@@ -0,0 +1,37 @@
+"""✅ Shared payload validation
+
+``build_event`` is the single set of rules for a new event, used by both
+``POST /api/events`` and the bulk importer.
+"""
+import uuid
+from datetime import datetime
+
+REQUIRED_EVENT_FIELDS = ['title', 'description', 'date', 'total_tickets']
+
+
+class EventValidationError(ValueError):
+    pass
+
+
+def build_event(data):
+    """Validate a create-event payload and return the row to insert"""
+    if not data:
+        raise EventValidationError('No data sent from frontend')
+
+    missing = [f for f in REQUIRED_EVENT_FIELDS if not data.get(f)]
+    if missing:
+        raise EventValidationError(f'Missing fields: {missing}')
+
+    try:
+        total_tickets = int(data['total_tickets'])
+    except (TypeError, ValueError) as e:
+        raise EventValidationError(f'Invalid data type: {e}')
+
+    return {
+        'id': str(uuid.uuid4())[:8],
+        'title': str(data['title'])[:100],
+        'description': str(data['description'])[:500],
+        'date': str(data['date']),
+        'total_tickets': total_tickets,
+        'created_at': datetime.now().isoformat()
+    }
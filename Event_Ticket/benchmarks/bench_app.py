@@ -0,0 +1,29 @@
+"""🧪 WSGI entry point for load tests
+
+The real Flask app on SQLite storage, with ``BENCH_LATENCY_MS`` of injected
+latency per storage call to emulate a remote database:
+
+    STORAGE_BACKEND=sqlite SQLITE_PATH=/tmp/bench.db BENCH_LATENCY_MS=5 \
+        gunicorn -w 4 --chdir benchmarks bench_app:app
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'backend'))
+sys.path.insert(0, HERE)
+
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+
+from database import db
+from standin import LatencyStorage
+
+# Wrap before importing the app so its metrics include the injected latency
+latency_ms = float(os.environ.get('BENCH_LATENCY_MS', 0))
+if latency_ms:
+    db.wrap_storage(lambda storage: LatencyStorage(storage, latency=latency_ms / 1000))
+
+from app import app
+
+# what gunicorn serves (bench_app:app)
+__all__ = ['app']
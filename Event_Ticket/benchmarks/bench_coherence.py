@@ -0,0 +1,90 @@
+"""🔗 Coherence benchmark: cost of the shared counters, cross-worker visibility
+
+    python benchmarks/bench_coherence.py --processes 4 --writes 2000
+
+Measures what a cache read pays for the version check and what a write
+pays for the bump, then has ``--processes`` workers bump a shared counter
+and reports how long the others take to see each bump (the window in
+which another worker could still serve the old cache entry).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from coherence import SharedState
+
+
+def per_call_us(func, number=200_000):
+    return round(timeit.timeit(func, number=number) / number * 1e6, 3)
+
+
+def watcher(path, writes, written_at, ready, results):
+    channel = SharedState(path).channel('events')
+    seen, lags = channel.version(), []
+    ready.wait()
+    while seen < writes:
+        version = channel.version()
+        if version != seen:
+            lags.append(time.perf_counter_ns() - written_at.value)
+            seen = version
+    results.put(lags)
+
+
+def measure(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'coherence.shm')
+        state = SharedState(path)
+        channel = state.channel('events')
+        costs = {
+            'version_us': per_call_us(channel.version),
+            'scoped_version_us': per_call_us(lambda: channel.version('a@example.com')),
+            'bump_us': per_call_us(channel.bump, 50_000)
+        }
+        # restart the counter for the visibility run
+        os.remove(path)
+        state = SharedState(path)
+        channel = state.channel('events')
+
+        # the writer's clock just before each bump - perf_counter_ns is system-wide on Linux
+        written_at = multiprocessing.Value('q', 0, lock=False)
+        ready, results = multiprocessing.Event(), multiprocessing.Queue()
+        watchers = [multiprocessing.Process(target=watcher, args=(path, args.writes, written_at, ready, results))
+                    for _ in range(args.processes - 1)]
+        for process in watchers:
+            process.start()
+        time.sleep(0.5)
+        ready.set()
+        for _ in range(args.writes):
+            written_at.value = time.perf_counter_ns()
+            channel.bump()
+            time.sleep(args.gap_us / 1e6)
+        lags = [lag / 1000 for _ in watchers for lag in results.get()]
+        for process in watchers:
+            process.join()
+
+    lags.sort()
+    return {**costs, 'processes': args.processes, 'observed_bumps': len(lags),
+            'visible_p50_us': round(statistics.median(lags), 1),
+            'visible_p99_us': round(lags[int(len(lags) * 0.99) - 1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--gap-us', type=float, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(measure(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
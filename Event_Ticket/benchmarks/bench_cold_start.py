@@ -0,0 +1,53 @@
+"""🥶 Worker cold start: time to import the app in a fresh interpreter
+
+    python benchmarks/bench_cold_start.py --runs 5 --backend supabase
+
+Every run starts a new Python process and imports ``app`` - what a gunicorn
+worker (or a test) pays before it can serve its first request. With the
+``supabase`` backend this includes any network round trip made at import.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, '..', 'backend')
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import app
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(backend, env):
+    env = dict(os.environ, STORAGE_BACKEND=backend, LOG_LEVEL='OFF', **env)
+    out = subprocess.check_output([sys.executable, '-c', PROBE.format(backend=BACKEND)], env=env)
+    return float(out.decode().strip().splitlines()[-1]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', choices=('supabase', 'sqlite'), default='supabase')
+    parser.add_argument('--sqlite-path', default='/tmp/bench_cold_start.db')
+    args = parser.parse_args()
+
+    env = {'SQLITE_PATH': args.sqlite_path} if args.backend == 'sqlite' else {}
+    samples = [cold_start(args.backend, env) for _ in range(args.runs)]
+    print(json.dumps({
+        'backend': args.backend,
+        'runs': args.runs,
+        'median_ms': round(statistics.median(samples), 1),
+        'max_ms': round(max(samples), 1),
+        'samples_ms': [round(s, 1) for s in samples]
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
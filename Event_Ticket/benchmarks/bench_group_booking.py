@@ -0,0 +1,88 @@
+"""🎟️ Group booking benchmark: N single bookings vs one reserve_many
+
+    python benchmarks/bench_group_booking.py --lines 1,2,5,10,20 --latency-ms 5
+
+For a group buying tickets for ``--lines`` different events, times booking
+them one ``reserve_tickets`` call at a time against one ``reserve_many``
+call. ``rpc`` runs against the in-memory stand-in client (one round trip
+per ``execute()``), ``sqlite`` against SQLiteStorage wrapped with
+``--latency-ms`` per storage call.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from storage import SQLiteStorage, SupabaseStorage
+from standin import LatencyStorage, StandInClient
+
+
+def seed(storage, count, capacity):
+    for i in range(count):
+        storage.insert_event({'id': f'ev{i}', 'title': f'Session {i}', 'date': '2026-12-01',
+                              'total_tickets': capacity})
+
+
+def time_ms(fn, rounds):
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def measure(storage, lines, args):
+    group = [{'event_id': f'ev{i}', 'tickets': 1} for i in range(lines)]
+
+    def sequential(i):
+        for line in group:
+            storage.reserve_tickets(line['event_id'], line['tickets'], f'user{i}', f'user{i}@example.com')
+
+    def batch(i):
+        storage.reserve_many(group, f'user{i}', f'user{i}@example.com')
+
+    return {
+        'lines': lines,
+        'sequential_ms': time_ms(sequential, args.rounds),
+        'batch_ms': time_ms(batch, args.rounds)
+    }
+
+
+def run(mode, args):
+    line_counts = [int(n) for n in args.lines.split(',')]
+    capacity = args.rounds * 2 * len(line_counts)
+    events = max(line_counts)
+
+    if mode == 'rpc':
+        client = StandInClient(latency=args.latency_ms / 1000)
+        storage = SupabaseStorage(client)
+        seed(storage, events, capacity)
+        return [measure(storage, n, args) for n in line_counts]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inner = SQLiteStorage(os.path.join(tmp, 'bench.db'))
+        seed(inner, events, capacity)
+        storage = LatencyStorage(inner, latency=args.latency_ms / 1000)
+        return [measure(storage, n, args) for n in line_counts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', default='1,2,5,10,20')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--modes', default='rpc,sqlite')
+    args = parser.parse_args()
+
+    print(json.dumps({mode: run(mode, args) for mode in args.modes.split(',')}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""📒 Booking journal benchmark: direct database booking vs write-behind journal
+
+    python benchmarks/bench_journal.py --rtt-ms 20 --threads 8 --bookings 2000
+
+Books ``--bookings`` single tickets from ``--threads`` threads twice - once
+with ``reserve_tickets`` and once through ``BookingJournal`` - against a
+SQLite database whose every call is delayed by ``--rtt-ms`` to stand in
+for a hosted one. Reports booking latency, throughput, how many database
+calls each path made, and checks that every booking reached the database.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from journal import BookingJournal
+from storage import SQLiteStorage
+
+
+class RemoteStorage:
+    """Adds a fixed round trip to every storage call"""
+
+    def __init__(self, storage, rtt):
+        self.storage = storage
+        self.rtt = rtt
+        self.calls = 0
+
+    def get_storage(self):
+        return self
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+
+        def delayed(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self.rtt)
+            return method(*args, **kwargs)
+        return delayed
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p99_ms': round(samples[int(len(samples) * 0.99) - 1], 3)
+    }
+
+
+def run(book, args):
+    samples, lock = [], threading.Lock()
+    per_thread = args.bookings // args.threads
+
+    def worker(worker_id):
+        for i in range(per_thread):
+            started = time.perf_counter()
+            book(f'w{worker_id}-{i}@example.com')
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                samples.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def measure(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        local = SQLiteStorage(os.path.join(tmp, 'bench.db'))
+        local.insert_event({'id': 'bench', 'title': 'Bench', 'description': '', 'date': '2027-01-01',
+                            'total_tickets': args.bookings * 2})
+        remote = RemoteStorage(local, args.rtt_ms / 1000)
+
+        if mode == 'direct':
+            samples, elapsed = run(lambda email: remote.reserve_tickets('bench', 1, 'Bench', email), args)
+        else:
+            journal = BookingJournal(remote, os.path.join(tmp, 'journal'), lease_size=args.lease_size,
+                                     flush_interval=0.05)
+            samples, elapsed = run(lambda email: journal.book(remote, 'bench', 1, 'Bench', email), args)
+            while journal.status()['pending']:
+                time.sleep(0.05)
+
+        stored = local._conn().execute('SELECT COUNT(*) FROM registrations').fetchone()[0]
+        return {'mode': mode, 'bookings': len(samples), 'stored': stored, 'db_calls': remote.calls,
+                'bookings_per_s': round(len(samples) / elapsed), **percentiles(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt-ms', type=float, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=2000)
+    parser.add_argument('--lease-size', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps([measure(mode, args) for mode in ('direct', 'journal')], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""🔌 MCP list_events under concurrency: client-per-call vs shared pooled client
+
+    python benchmarks/bench_mcp_list_events.py --calls 50 --connect-ms 40 --latency-ms 20
+
+``before`` replays the old handler: build a new client (``--connect-ms``
+emulates the HTTP session + TLS handshake) and run the query synchronously
+inside the coroutine, which blocks the event loop. ``after`` uses
+EventTicketTools with one SupabasePool. Reports wall time for N concurrent
+calls and per-call p50/p99.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'backend', 'mcp'))
+sys.path.insert(0, HERE)
+
+from handlers import EventTicketTools, SupabasePool
+from standin import StandInClient
+
+
+def make_factory(args, created):
+    def factory():
+        created.append(1)
+        time.sleep(args.connect_ms / 1000)
+        client = StandInClient(latency=args.latency_ms / 1000)
+        client.tables['events'] = [
+            {'id': f'e{i}', 'title': f'Event {i}', 'date': f'2026-11-{i % 28 + 1:02d}', 'total_tickets': 100}
+            for i in range(args.events)
+        ]
+        return client
+    return factory
+
+
+async def legacy_list_events(factory):
+    """The old handler: new client per call, blocking query in the coroutine"""
+    client = factory()
+    response = client.table('events').select('*').order('date').execute()
+    return json.dumps({
+        "events": [{"id": e['id'], "title": e['title'], "date": e['date'],
+                    "tickets_available": e['total_tickets']} for e in response.data],
+        "message": f"Found {len(response.data)} events"
+    })
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(mode, args):
+    created = []
+    factory = make_factory(args, created)
+    if mode == 'before':
+        call = lambda: legacy_list_events(factory)
+    else:
+        tools = EventTicketTools(SupabasePool(client_factory=factory, max_workers=args.workers))
+        await tools.list_events({})  # warm the shared client once
+        created.clear()
+        call = lambda: tools.list_events({})
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(call()) for _ in range(args.calls)))
+    wall = (time.perf_counter() - started) * 1000
+    ordered = sorted(latencies)
+    return {
+        'mode': mode,
+        'calls': args.calls,
+        'wall_ms': round(wall, 1),
+        'p50_ms': round(statistics.median(ordered), 1),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))], 1),
+        'clients_created': len(created)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--connect-ms', type=float, default=40.0)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    results = [asyncio.run(run(mode, args)) for mode in ('before', 'after')]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""🎫 Concurrent booking benchmark: legacy 3-call path vs ReservationEngine
+
+    python benchmarks/bench_reservations.py --threads 32 --bookings 400 --capacity 250
+
+Modes: ``legacy``, ``rpc`` and ``cas`` run against the in-memory stand-in
+client, ``sqlite`` books through SQLiteStorage on a temporary file.
+
+Every booking asks for 1 ticket against an event with ``--capacity`` tickets,
+so demand exceeds supply. Reports p50/p99 booking latency, round trips per
+booking and how many tickets were sold beyond capacity (oversell).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reservations import ReservationEngine, ReservationError
+from storage import SQLiteStorage
+from standin import StandInClient, StandInDB
+
+
+def legacy_reserve(client, event_id, tickets, name, email):
+    """The pre-engine register_tickets flow: select, insert, write back"""
+    event = client.table('events').select('*').eq('id', event_id).execute().data[0]
+    if event['total_tickets'] < tickets:
+        raise ReservationError(f'Only {event["total_tickets"]} tickets available')
+    client.table('registrations').insert({
+        'name': name,
+        'user_email': email,
+        'event_id': event_id,
+        'tickets': tickets,
+        'registered_at': datetime.now().isoformat()
+    }).execute()
+    client.table('events').update({
+        'total_tickets': event['total_tickets'] - tickets
+    }).eq('id', event_id).execute()
+    return event['total_tickets'] - tickets
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_sqlite(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(os.path.join(tmp, 'bench.db'))
+        storage.insert_event({'id': 'bench', 'title': 'Bench', 'date': '2026-12-01',
+                              'total_tickets': args.capacity})
+        book = lambda i: storage.reserve_tickets('bench', 1, f'user{i}', f'user{i}@example.com')
+        result = measure('sqlite', book, args)
+        totals = storage.registration_totals().get('bench', (0, 0))
+        remaining = storage._conn().execute("SELECT total_tickets FROM events WHERE id = 'bench'").fetchone()[0]
+    result.update({
+        'round_trips_per_booking': 0,
+        'sold': totals[0],
+        'oversell': max(0, totals[0] - args.capacity),
+        'remaining_counter': remaining
+    })
+    return result
+
+
+def run(mode, args):
+    if mode == 'sqlite':
+        return run_sqlite(args)
+
+    client = StandInClient(latency=args.latency_ms / 1000)
+    client.tables['events'].append({'id': 'bench', 'title': 'Bench', 'total_tickets': args.capacity})
+
+    if mode == 'legacy':
+        book = lambda i: legacy_reserve(client, 'bench', 1, f'user{i}', f'user{i}@example.com')
+    else:
+        engine = ReservationEngine(StandInDB(client), mode=mode)
+        book = lambda i: engine.reserve('bench', 1, f'user{i}', f'user{i}@example.com')
+
+    result = measure(mode, book, args)
+    sold = sum(r['tickets'] for r in client.tables['registrations'])
+    result.update({
+        'round_trips_per_booking': round(client.round_trips / args.bookings, 2),
+        'sold': sold,
+        'oversell': max(0, sold - args.capacity),
+        'remaining_counter': client.tables['events'][0]['total_tickets']
+    })
+    return result
+
+
+def measure(mode, book, args):
+    latencies, rejected, errors = [], 0, 0
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            book(i)
+            return time.perf_counter() - start, None
+        except ReservationError:
+            return time.perf_counter() - start, 'rejected'
+        except Exception:
+            return time.perf_counter() - start, 'error'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for elapsed, outcome in pool.map(one, range(args.bookings)):
+            latencies.append(elapsed * 1000)
+            rejected += outcome == 'rejected'
+            errors += outcome == 'error'
+    wall = time.perf_counter() - started
+
+    return {
+        'mode': mode,
+        'bookings': args.bookings,
+        'throughput_rps': round(args.bookings / wall, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'rejected': rejected,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--bookings', type=int, default=400)
+    parser.add_argument('--capacity', type=int, default=250)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--modes', default='legacy,rpc,cas,sqlite')
+    args = parser.parse_args()
+
+    results = [run(mode, args) for mode in args.modes.split(',')]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
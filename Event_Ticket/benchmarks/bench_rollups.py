@@ -0,0 +1,98 @@
+"""📈 Sales rollups benchmark: scanning registrations vs reading rollup buckets
+
+    python benchmarks/bench_rollups.py --registrations 500000 --days 30
+
+Seeds one event with ``--registrations`` bookings spread over ``--days``
+days in SQLite, then answers "tickets per hour over that period" twice:
+with a GROUP BY over ``registrations.registered_at`` (what a dashboard
+would do without rollups) and with ``SalesRollups.series`` reading the
+hour rows. Also reports what ``record()`` costs the booking path.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from rollups import SalesRollups
+from storage import SQLiteStorage
+
+
+class Database:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get_storage(self):
+        return self.storage
+
+
+def timed_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def measure(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        end = int(time.time()) // 3600 * 3600
+        start = end - args.days * 86400
+        storage = SQLiteStorage(path)
+        storage.insert_event({'id': 'bench', 'title': 'Bench', 'description': '', 'date': '2027-01-01',
+                              'total_tickets': 0})
+        rng = random.Random(7)
+        conn = storage._conn()
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO registrations (name, user_email, event_id, tickets, registered_at) VALUES (?, ?, ?, ?, ?)',
+            (('n', f'{i}@example.com', 'bench', rng.randint(1, 4),
+              datetime.fromtimestamp(rng.randrange(start, end), timezone.utc).replace(tzinfo=None).isoformat())
+             for i in range(args.registrations))
+        )
+        conn.execute('COMMIT')
+        # a database that predates the rollups: the first open backfills them
+        conn.execute('DROP TABLE sales_rollups')
+        storage = SQLiteStorage(path)
+        rollups = SalesRollups(Database(storage))
+
+        def scan():
+            return storage._conn().execute(
+                "SELECT CAST(strftime('%s', registered_at) AS INTEGER) / 3600 AS hour, SUM(tickets), COUNT(*) "
+                "FROM registrations WHERE event_id = ? AND registered_at >= ? GROUP BY hour",
+                ('bench', datetime.fromtimestamp(start, timezone.utc).replace(tzinfo=None).isoformat())
+            ).fetchall()
+
+        series = rollups.series('bench', 'hour', start, end - 1)
+        scanned = sum(row[1] for row in scan())
+        record_us = round(timed_ms(lambda: [rollups.record('bench', 1) for _ in range(10_000)], 5) / 10, 3)
+        return {
+            'registrations': args.registrations,
+            'buckets': len(series['buckets']),
+            'same_totals': scanned == series['totals']['tickets'],
+            'scan_ms': timed_ms(scan, args.repeat),
+            'rollup_ms': timed_ms(lambda: rollups.series('bench', 'hour', start, end - 1), args.repeat),
+            'record_us': record_us
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=500_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(measure(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""🔎 Search index benchmark: build time and query latency by catalogue size
+
+    python benchmarks/bench_search.py --events 10000,100000 --rounds 200
+
+Builds a ``SearchIndex`` over synthetic events (titles and descriptions
+drawn from a fixed vocabulary plus a unique performer name each) and times
+typical typeahead queries against it: one rare word, several words, short
+and one-letter prefixes, a date window and a miss. Also times the
+incremental add/remove the write paths make.
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from pagination import EventQuery
+from search import SearchIndex
+
+KINDS = ['Jazz', 'Rock', 'Techno', 'Folk', 'Opera', 'Comedy', 'Poetry', 'Film', 'Dance', 'Chess',
+         'Startup', 'Python', 'Cooking', 'Wine', 'Marathon', 'Yoga', 'Photography', 'Theatre']
+FORMATS = ['Festival', 'Night', 'Meetup', 'Workshop', 'Conference', 'Gala', 'Showcase', 'Session']
+FILLER = ('an evening of live music talks food and drinks with local artists friends families '
+          'beginners experts welcome tickets limited seating outdoor indoor stage hall garden '
+          'city center downtown riverside open air weekend special guests award winning').split()
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'dor', 'sel', 'tu', 'bri', 'zan', 'qui', 'mo']
+
+QUERIES = {
+    'rare_word': ('zanquiven', {}),
+    'two_words': ('jazz fest', {}),
+    'prefix_3': ('wor', {}),
+    'prefix_1': ('a', {}),
+    'date_window': ('rock night', {'from': '2027-03-01', 'to': '2027-03-31'}),
+    'no_match': ('xylophone', {}),
+}
+
+
+def synthetic_events(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+        yield {
+            'id': f'ev{i:07d}',
+            'title': f'{rng.choice(KINDS)} {rng.choice(FORMATS)} with {name}',
+            'description': ' '.join(rng.choice(FILLER) for _ in range(rng.randint(8, 30))),
+            'date': f'2027-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        }
+
+
+class CatalogueStorage:
+    """``list_events`` over an in-memory catalogue, keyset paged like the real backends"""
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda e: (e['date'], e['id']))
+        self.keys = [(e['date'], e['id']) for e in self.events]
+
+    def get_storage(self):
+        return self
+
+    def list_events(self, query):
+        position = 0
+        if query.cursor:
+            position = bisect.bisect_right(self.keys, tuple(query.cursor))
+        return self.events[position:position + query.limit + 1]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(samples), 4),
+        'p99_ms': round(samples[int(len(samples) * 0.99) - 1], 4)
+    }
+
+
+def measure(count, args):
+    index = SearchIndex(CatalogueStorage(synthetic_events(count)))
+    # one load, no background refresh thread
+    index._thread = True
+
+    start = time.perf_counter()
+    index.refresh()
+    build_s = time.perf_counter() - start
+
+    result = {'events': count, 'build_s': round(build_s, 2)}
+    for name, (text, params) in QUERIES.items():
+        query = EventQuery.from_args(params)
+        samples, hits = [], 0
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            hits = len(index.search(text, query, limit=args.limit))
+            samples.append((time.perf_counter() - started) * 1000)
+        result[name] = {'hits': hits, **percentiles(samples)}
+
+    extra = list(synthetic_events(args.rounds, seed=11))
+    for event in extra:
+        event['id'] = f'new-{event["id"]}'
+    add, remove = [], []
+    for event in extra:
+        started = time.perf_counter()
+        index.add([event])
+        add.append((time.perf_counter() - started) * 1000)
+    for event in extra:
+        started = time.perf_counter()
+        index.remove(event['id'])
+        remove.append((time.perf_counter() - started) * 1000)
+    result['add_one'] = percentiles(add)
+    result['remove_one'] = percentiles(remove)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', default='10000,100000')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps([measure(int(n), args) for n in args.events.split(',')], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""💺 Seat map benchmark: hold latency by venue size and fill level
+
+    python benchmarks/bench_seatmap.py --seats 1000,10000,50000 --rounds 200
+
+For each venue size (one section, 50 seats a row) and fill level it times
+the full read-modify-write a hold costs - ``from_blob``, ``hold``,
+``to_blob`` - and reports the blob size. Sold seats are scattered at
+random, so high fill levels leave few adjacent blocks to find. Then it
+books a whole SQLite-backed event from several threads to show the
+end-to-end rate and that no seat is sold twice.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from reservations import ReservationError
+from seatmap import SeatMap, SeatMaps
+from storage import SQLiteStorage
+
+ROW_SEATS = 50
+
+
+def venue(seats, fill, seed=3):
+    seat_map = SeatMap.from_layout({'sections': [{'name': 'Hall', 'rows': seats // ROW_SEATS, 'seats': ROW_SEATS}]})
+    section = seat_map.sections[0]
+    rng = random.Random(seed)
+    for index in rng.sample(range(seats), int(seats * fill)):
+        row, seat = divmod(index, ROW_SEATS)
+        section.sold |= section.mask(row, seat, 1)
+    return seat_map
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(samples), 4),
+        'p99_ms': round(samples[int(len(samples) * 0.99) - 1], 4)
+    }
+
+
+def measure_holds(seats, fill, args):
+    blob = venue(seats, fill).to_blob()
+    samples, found = [], 0
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        seat_map = SeatMap.from_blob(blob)
+        try:
+            seat_map.hold(args.tickets, 120)
+            found += 1
+        except ReservationError:
+            pass
+        seat_map.to_blob()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'seats': seats, 'fill': fill, 'blob_bytes': len(blob), 'found': found == args.rounds,
+            **percentiles(samples)}
+
+
+def measure_sqlite(seats, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(os.path.join(tmp, 'bench.db'))
+        storage.insert_event({'id': 'bench', 'title': 'Bench', 'description': '', 'date': '2027-01-01',
+                              'total_tickets': 0})
+        seatmaps = SeatMaps()
+        seatmaps.create(storage, 'bench', {'sections': [{'name': 'Hall', 'rows': seats // ROW_SEATS,
+                                                         'seats': ROW_SEATS}]})
+        booked, samples, lock = [], [], threading.Lock()
+
+        def worker(worker_id):
+            while True:
+                started = time.perf_counter()
+                try:
+                    seats_taken, _ = seatmaps.book_best(storage, 'bench', args.tickets, 'Bench', f'w{worker_id}@x.com')
+                except ReservationError:
+                    return
+                with lock:
+                    samples.append((time.perf_counter() - started) * 1000)
+                    booked.extend((seats_taken['row'], seat) for seat in seats_taken['seats'])
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        left = SeatMap.from_blob(storage.get_seat_map('bench')).counts()['free']
+        return {'seats': seats, 'threads': args.threads, 'bookings': len(samples),
+                'bookings_per_s': round(len(samples) / elapsed), 'double_booked': len(booked) - len(set(booked)),
+                'seats_left': left, **percentiles(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seats', default='1000,10000,50000')
+    parser.add_argument('--fill', default='0,0.5,0.9')
+    parser.add_argument('--tickets', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sqlite-seats', type=int, default=2000)
+    args = parser.parse_args()
+
+    holds = [measure_holds(int(seats), float(fill), args)
+             for seats in args.seats.split(',') for fill in args.fill.split(',')]
+    print(json.dumps({'holds': holds, 'sqlite': measure_sqlite(args.sqlite_seats, args)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
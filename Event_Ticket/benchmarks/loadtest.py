@@ -0,0 +1,341 @@
+"""📈 Load test for the Flask API hot paths
+
+    python benchmarks/loadtest.py --mode both --workers 4 --concurrency 16 \\
+        --requests 500 --latency-ms 5 --output bench_results.json
+
+    # compare against a run from another commit
+    python benchmarks/loadtest.py --baseline bench_results_main.json
+
+Drives GET /api/events, POST /api/tickets/register, POST /api/auth/user-login
+and POST /api/events against the real app on a throwaway SQLite database
+with ``--latency-ms`` injected per storage call (see bench_app.py):
+
+* ``testclient`` - in-process through Flask's test client
+* ``gunicorn``   - over HTTP against ``gunicorn -w --workers``
+
+Per endpoint it reports req/s, p50/p95/p99 latency, status counts and
+errors (5xx or transport failures); registration also reports oversell
+(tickets sold beyond an event's capacity). Bookings that get queued by the
+admission layer (202) poll their place in line and retry once admitted, like
+the register page does, so their latency includes the wait. Results are
+printed and written as JSON.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, '..', 'backend')
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, HERE)
+
+# Config reads the environment once, on first import - set it up front
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+
+ENDPOINTS = ('events_list', 'tickets_register', 'user_login', 'events_create')
+QUEUE_POLL_SECONDS = 0.05
+
+
+# 🌱 Fixtures
+def seed(db_path, args):
+    from storage import SQLiteStorage
+    storage = SQLiteStorage(db_path)
+    ids = []
+    for i in range(args.events):
+        event_id = f'ev{i:05d}'
+        storage.insert_event({
+            'id': event_id,
+            'title': f'Bench event {i}',
+            'description': 'Load test fixture ' * 10,
+            'date': f'2027-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+            'total_tickets': args.capacity,
+            'created_at': datetime.now().isoformat()
+        })
+        ids.append(event_id)
+    return ids
+
+
+def oversell(db_path, event_ids, capacity):
+    """Tickets sold beyond capacity, summed over events"""
+    from storage import SQLiteStorage
+    totals = SQLiteStorage(db_path).registration_totals()
+    return sum(max(0, totals.get(e, (0, 0))[0] - capacity) for e in event_ids)
+
+
+# 🚚 Transports
+class TestClientTransport:
+    name = 'testclient'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+    name = 'gunicorn'
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            headers = dict(headers or {})
+            payload = None
+            if body is not None:
+                payload = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            try:
+                return response.status, json.loads(data) if data else None
+            except ValueError:
+                return response.status, None
+        finally:
+            conn.close()
+
+
+# 🎯 Workloads
+def build_request(endpoint, i, ctx):
+    if endpoint == 'events_list':
+        return 'GET', '/api/events', None, None
+    if endpoint == 'tickets_register':
+        event_id = ctx['hot_events'][i % len(ctx['hot_events'])]
+        return 'POST', '/api/tickets/register', {
+            'name': f'Bench User {i}',
+            'email': f'buyer{i}@bench.test',
+            'event_id': event_id,
+            'tickets': 1
+        }, None
+    if endpoint == 'user_login':
+        # a fixed pool: first touch auto-registers, later ones verify
+        return 'POST', '/api/auth/user-login', {
+            'email': f'user{i % ctx["users"]}@bench.test',
+            'password': 'bench-secret'
+        }, None
+    if endpoint == 'events_create':
+        return 'POST', '/api/events', {
+            'title': f'Created {i}',
+            'description': 'Created by the load test',
+            'date': '2027-06-01',
+            'total_tickets': 50
+        }, {'Authorization': f'Bearer {ctx["admin_token"]}'}
+    raise ValueError(endpoint)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def follow_queue(transport, method, path, body, headers):
+    """Send a request; on 202 wait in the admission queue, then resend"""
+    status, payload = transport.request(method, path, body, headers)
+    while status == 202 and payload and payload.get('queue_ticket'):
+        ticket = payload['queue_ticket']
+        while status == 202:
+            time.sleep(QUEUE_POLL_SECONDS)
+            status, payload = transport.request('GET', f'/api/tickets/queue/{ticket}')
+        if status != 200:
+            break
+        status, payload = transport.request(method, path, body, {**(headers or {}), 'X-Queue-Ticket': ticket})
+    return status, payload
+
+
+def drive(transport, endpoint, args, ctx):
+    statuses = Counter()
+
+    def one(i):
+        method, path, body, headers = build_request(endpoint, i, ctx)
+        start = time.perf_counter()
+        try:
+            status, _ = follow_queue(transport, method, path, body, headers)
+        except Exception:
+            status = 'exception'
+        return (time.perf_counter() - start) * 1000, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    for _, status in results:
+        statuses[str(status)] += 1
+    errors = sum(n for s, n in statuses.items() if s == 'exception' or s.startswith('5'))
+    return {
+        'requests': args.requests,
+        'rps': round(args.requests / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'errors': errors,
+        'statuses': dict(statuses)
+    }
+
+
+def run_suite(transport, db_path, event_ids, args):
+    status, body = transport.request('POST', '/api/auth/admin-login', {
+        'email': os.environ.get('BENCH_ADMIN_EMAIL', 'admin@example.com'),
+        'password': os.environ.get('BENCH_ADMIN_PASSWORD', 'admin123')
+    })
+    if status != 200:
+        raise RuntimeError(f'admin login failed: {status} {body}')
+    ctx = {
+        'admin_token': body['token'],
+        'hot_events': event_ids[:args.hot_events],
+        'users': args.users
+    }
+
+    results = {}
+    for endpoint in args.endpoints.split(','):
+        results[endpoint] = drive(transport, endpoint, args, ctx)
+        print(f"  {transport.name:10s} {endpoint:18s} {results[endpoint]['rps']:>9.1f} req/s  "
+              f"p50 {results[endpoint]['p50_ms']:.1f}ms  p99 {results[endpoint]['p99_ms']:.1f}ms  "
+              f"errors {results[endpoint]['errors']}", file=sys.stderr)
+    if 'tickets_register' in results:
+        results['tickets_register']['oversell'] = oversell(db_path, event_ids, args.capacity)
+    return results
+
+
+# 🏃 Modes
+def bench_env(db_path, args):
+    env = dict(os.environ)
+    env.update({
+        'STORAGE_BACKEND': 'sqlite',
+        'SQLITE_PATH': db_path,
+        'BENCH_LATENCY_MS': str(args.latency_ms)
+    })
+    return env
+
+
+def run_testclient(tmp, args):
+    db_path = os.path.join(tmp, 'testclient.db')
+    event_ids = seed(db_path, args)
+    os.environ.update(bench_env(db_path, args))
+    from config import Config
+    Config.SQLITE_PATH = db_path
+    import bench_app
+    try:
+        return run_suite(TestClientTransport(bench_app.app), db_path, event_ids, args)
+    finally:
+        # pending sales rollups go out while the temporary database still exists
+        bench_app.app.extensions['rollups'].flush()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_gunicorn(tmp, args):
+    db_path = os.path.join(tmp, 'gunicorn.db')
+    event_ids = seed(db_path, args)
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+         '-b', f'127.0.0.1:{port}', '--chdir', HERE, '--log-level', 'warning', 'bench_app:app'],
+        env=bench_env(db_path, args),
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        transport = HttpTransport('127.0.0.1', port)
+        deadline = time.time() + 30
+        while True:
+            try:
+                if transport.request('GET', '/api/health')[0] == 200:
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline or proc.poll() is not None:
+                raise RuntimeError('gunicorn did not come up')
+            time.sleep(0.2)
+        return run_suite(transport, db_path, event_ids, args)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline):
+    """Print per-endpoint deltas against a previous results file"""
+    for mode, endpoints in current['results'].items():
+        for endpoint, now in endpoints.items():
+            before = baseline.get('results', {}).get(mode, {}).get(endpoint)
+            if not before:
+                continue
+            rps = (now['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0
+            p99 = (now['p99_ms'] - before['p99_ms']) / before['p99_ms'] * 100 if before['p99_ms'] else 0
+            print(f"  {mode:10s} {endpoint:18s} req/s {rps:+6.1f}%  p99 {p99:+6.1f}%", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Flask API hot paths')
+    parser.add_argument('--mode', choices=('testclient', 'gunicorn', 'both'), default='both')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='injected per storage call')
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=50, help='tickets per seeded event')
+    parser.add_argument('--hot-events', type=int, default=3, help='events the bookings target')
+    parser.add_argument('--users', type=int, default=100, help='distinct login emails')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    modes = ('testclient', 'gunicorn') if args.mode == 'both' else (args.mode,)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # gunicorn first: the test client mode imports the app into this process
+        for mode in sorted(modes):
+            results[mode] = (run_gunicorn if mode == 'gunicorn' else run_testclient)(tmp, args)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'params': vars(args),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
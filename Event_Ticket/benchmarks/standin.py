@@ -0,0 +1,193 @@
+"""🧪 Local stand-in for the Supabase client
+
+Implements just enough of the ``client.table(...).select/insert/update/eq/
+order/execute()`` chain and ``client.rpc(...)`` for the backend code paths,
+backed by plain dicts. Every ``execute()`` sleeps ``latency`` seconds to
+emulate one network round trip.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from reservations import settle_batch
+
+
+class StandInClient:
+    def __init__(self, latency=0.005):
+        self.latency = latency
+        self.tables = {'events': [], 'registrations': [], 'users': []}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, fn, params):
+        return _Rpc(self, fn, params)
+
+    def _round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class _Query:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.op = 'select'
+        self.payload = None
+        self.filters = []
+        self.order_by = None
+        self.count = None
+        self.slice = None
+
+    def select(self, *columns, count=None):
+        self.op = 'select'
+        self.count = count
+        return self
+
+    def insert(self, row):
+        self.op, self.payload = 'insert', row
+        return self
+
+    def update(self, values):
+        self.op, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, size):
+        self.slice = (0, size)
+        return self
+
+    def range(self, start, end):
+        self.slice = (start, end)
+        return self
+
+    def _matches(self, row):
+        return all(row.get(column) == value for column, value in self.filters)
+
+    def execute(self):
+        self.client._round_trip()
+        rows = self.client.tables[self.name]
+        with self.client.lock:
+            if self.op == 'insert':
+                new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                rows.extend(dict(r) for r in new_rows)
+                return SimpleNamespace(data=[dict(r) for r in new_rows])
+            matched = [r for r in rows if self._matches(r)]
+            if self.op == 'update':
+                for r in matched:
+                    r.update(self.payload)
+            elif self.op == 'delete':
+                self.client.tables[self.name] = [r for r in rows if not self._matches(r)]
+            data = [dict(r) for r in matched]
+        if self.count:
+            return SimpleNamespace(data=data, count=len(data))
+        if self.order_by:
+            columns, desc = self.order_by
+            data.sort(key=lambda r: [r.get(c) for c in columns.split(',')], reverse=desc)
+        if self.slice:
+            data = data[self.slice[0]:self.slice[1]]
+        return SimpleNamespace(data=data)
+
+
+class _Rpc:
+    """Emulates the ``reserve_tickets`` / ``reserve_tickets_batch`` SQL
+    functions (one round trip, row locks)"""
+
+    def __init__(self, client, fn, params):
+        self.client = client
+        self.fn = fn
+        self.params = params
+
+    def execute(self):
+        if self.fn == 'reserve_tickets_batch':
+            return self._reserve_batch()
+        if self.fn != 'reserve_tickets':
+            raise NotImplementedError(self.fn)
+        self.client._round_trip()
+        p = self.params
+        with self.client.lock:
+            event = next((e for e in self.client.tables['events'] if e['id'] == p['p_event_id']), None)
+            if event is None:
+                return SimpleNamespace(data=[{'status': 'not_found', 'remaining': None}])
+            if event['total_tickets'] < p['p_tickets']:
+                return SimpleNamespace(data=[{'status': 'insufficient', 'remaining': event['total_tickets']}])
+            event['total_tickets'] -= p['p_tickets']
+            self.client.tables['registrations'].append({
+                'name': p['p_name'],
+                'user_email': p['p_email'],
+                'event_id': p['p_event_id'],
+                'tickets': p['p_tickets']
+            })
+            return SimpleNamespace(data=[{'status': 'ok', 'remaining': event['total_tickets']}])
+
+    def _reserve_batch(self):
+        self.client._round_trip()
+        p = self.params
+        lines = [(line['event_id'], line['tickets']) for line in p['p_lines']]
+        with self.client.lock:
+            events = {e['id']: e for e in self.client.tables['events']}
+            results = settle_batch(lines, {e: events[e]['total_tickets'] for e, _ in lines if e in events})
+            if all(r['status'] == 'ok' for r in results):
+                for r in results:
+                    events[r['event_id']]['total_tickets'] = r['remaining']
+                    self.client.tables['registrations'].append({
+                        'name': p['p_name'],
+                        'user_email': p['p_email'],
+                        'event_id': r['event_id'],
+                        'tickets': r['tickets']
+                    })
+            return SimpleNamespace(data=results)
+
+
+class StandInDB:
+    """Drop-in for ``database.DatabaseManager``"""
+
+    def __init__(self, client, reservation_mode='rpc'):
+        from storage import SupabaseStorage
+        self.client = client
+        self.storage = SupabaseStorage(client, reservation_mode=reservation_mode)
+
+    def get_client(self):
+        return self.client
+
+    def get_storage(self):
+        return self.storage
+
+    def is_connected(self):
+        return True
+
+
+class LatencyStorage:
+    """Wraps any ``storage.Storage`` and sleeps ``latency`` seconds per call,
+    emulating one network round trip to a remote database"""
+
+    def __init__(self, inner, latency=0.005):
+        self.inner = inner
+        self.latency = latency
+        self.name = f'{inner.name}+{int(latency * 1000)}ms'
+
+    def __getattr__(self, attr):
+        value = getattr(self.inner, attr)
+        if not callable(value) or attr.startswith('_'):
+            return value
+
+        def delayed(*args, **kwargs):
+            if self.latency:
+                time.sleep(self.latency)
+            return value(*args, **kwargs)
+        return delayed
@@ -26,6 +26,30 @@ async function safeFetch(url, options = {}) {
     }
 }
 
+// 📦 EVENTS PAGES WITH ETAG - repeat polls get a 304 with no body
+const EVENTS_PAGE_SIZE = 20;
+const eventsCache = {};
+
+async function fetchEvents(params = {}) {
+    const url = `${API_BASE}/events?${new URLSearchParams(params)}`;
+    const cached = eventsCache[url];
+    const headers = {};
+    if (cached) headers['If-None-Match'] = cached.etag;
+    
+    // no-store: we do the revalidation ourselves so the 304 reaches us
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) return cached.data;
+    
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || `HTTP ${response.status}`);
+    }
+    
+    const data = await response.json();
+    eventsCache[url] = { etag: response.headers.get('ETag'), data };
+    return data;
+}
+
 // 🔒 FORM VALIDATION
 function validateEmail(email) {
     if (!email || email.trim() === '') return 'Please enter your email';
@@ -182,6 +206,14 @@ async function userLogin() {
 }
 
 // 🎫 REGISTER TICKETS
+// 🔁 One Idempotency-Key per booking - a retry or double click reuses it
+let registerAttempt = null;
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 async function userRegister() {
     const name = document.getElementById('user-name')?.value?.trim();
     const email = document.getElementById('register-email')?.value?.trim();
@@ -212,24 +244,43 @@ async function userRegister() {
     hideError('register-error');
     
     try {
-        const data = await safeFetch(`${API_BASE}/tickets/register`, {
+        const body = JSON.stringify({
+            name,
+            email,
+            event_id: eventId,
+            tickets: parseInt(tickets)
+        });
+        if (!registerAttempt || registerAttempt.body !== body) {
+            registerAttempt = { body, key: newIdempotencyKey() };
+        }
+        const headers = { 'Content-Type': 'application/json', 'Idempotency-Key': registerAttempt.key };
+        let data = await safeFetch(`${API_BASE}/tickets/register`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                name,
-                email,
-                event_id: eventId,
-                tickets: parseInt(tickets)
-            })
+            headers,
+            body
         });
         
+        // 🚦 Busy on-sale: wait our turn, then book with the queue ticket
+        while (data.queued) {
+            await waitForAdmission(data);
+            data = await safeFetch(`${API_BASE}/tickets/register`, {
+                method: 'POST',
+                headers: { ...headers, 'X-Queue-Ticket': data.queue_ticket },
+                body
+            });
+        }
+        hideQueueStatus();
+        registerAttempt = null;
+        
         showSuccess('✅ Tickets registered successfully!');
+        loadMyRegistrations();
         document.getElementById('user-name').value = '';
         document.getElementById('register-email').value = '';
         document.getElementById('tickets').value = '1';
         if (eventSelect) eventSelect.selectedIndex = 0;
         
     } catch (error) {
+        hideQueueStatus();
         showError('register-error', error.message);
         console.error('Registration error:', error);
     }
@@ -237,7 +288,121 @@ async function userRegister() {
     setLoading('register-btn', false);
 }
 
-// 📊 LOAD EVENTS FOR DASHBOARD
+// 🎟️ MY REGISTRATIONS - the logged-in user's bookings, newest first
+const MY_REGISTRATIONS_PAGE_SIZE = 10;
+let myRegistrationsCursor = null;
+
+function renderRegistration(registration) {
+    const eventDate = registration.event_date ? new Date(registration.event_date).toLocaleDateString() : '-';
+    const tickets = registration.tickets;
+    return `
+                <div class="event">
+                    <h3>${registration.event_title || 'Event removed'}</h3>
+                    <p>📅 ${eventDate}</p>
+                    <p>🎫 ${tickets} ticket${tickets !== 1 ? 's' : ''} - booked ${new Date(registration.registered_at).toLocaleString()}</p>
+                </div>`;
+}
+
+async function loadMyRegistrations(more = false) {
+    const userToken = localStorage.getItem('userToken');
+    const container = document.getElementById('my-registrations-container');
+    const list = document.getElementById('my-registrations');
+    if (!userToken || !container || !list) return;
+    
+    const params = { limit: MY_REGISTRATIONS_PAGE_SIZE };
+    if (more && myRegistrationsCursor) params.cursor = myRegistrationsCursor;
+    
+    try {
+        const page = await safeFetch(`${API_BASE}/me/registrations?${new URLSearchParams(params)}`, {
+            headers: { 'Authorization': `Bearer ${userToken}` },
+            cache: 'no-store'
+        });
+        const html = page.registrations.map(renderRegistration).join('');
+        list.innerHTML = more ? list.innerHTML + html : (html || '<p>No registrations yet</p>');
+        myRegistrationsCursor = page.next_cursor;
+        document.getElementById('my-registrations-more').style.display = myRegistrationsCursor ? '' : 'none';
+        container.style.display = '';
+    } catch (error) {
+        console.error('My registrations error:', error);
+    }
+}
+
+// ⏳ ADMISSION QUEUE - poll our place in line until it's our turn
+function showQueueStatus(spot) {
+    let statusDiv = document.getElementById('queue-status');
+    if (!statusDiv) {
+        statusDiv = document.createElement('div');
+        statusDiv.id = 'queue-status';
+        statusDiv.className = 'success';
+        document.getElementById('register-error')?.before(statusDiv);
+    }
+    statusDiv.textContent = `⏳ You're in line - position ${spot.position}, about ${spot.eta_seconds}s to go`;
+}
+
+function hideQueueStatus() {
+    document.getElementById('queue-status')?.remove();
+}
+
+async function waitForAdmission(spot) {
+    showQueueStatus(spot);
+    while (true) {
+        // poll faster near the front of the line, at most every 5s
+        const wait = Math.min(5, Math.max(0.5, spot.eta_seconds / 2));
+        await new Promise(resolve => setTimeout(resolve, wait * 1000));
+        
+        const response = await fetch(`${API_BASE}/tickets/queue/${spot.queue_ticket}`, { cache: 'no-store' });
+        const data = await response.json().catch(() => ({}));
+        if (response.status === 200) return;
+        if (response.status !== 202) throw new Error(data.error || `HTTP ${response.status}`);
+        spot = { ...spot, ...data };
+        showQueueStatus(spot);
+    }
+}
+
+// 📊 LOAD EVENTS FOR DASHBOARD - first page now, the rest on demand
+let dashboardCursor = null;
+let dashboardShown = 0;
+
+function renderEventCard(event) {
+    return `
+                <div class="event" data-event-id="${event.id}">
+                    <h3>${event.title || 'Untitled'}</h3>
+                    <p>📅 ${new Date(event.date).toLocaleDateString()}</p>
+                    <p>🎫 <span class="tickets-left">${event.total_tickets || 0}</span> tickets available</p>
+                    ${event.description ? `<p>${event.description}</p>` : ''}
+                </div>
+            `;
+}
+
+function updateEventCount() {
+    const counter = document.getElementById('event-count');
+    if (!counter) return;
+    const more = dashboardCursor ? '+' : '';
+    counter.textContent = `${dashboardShown}${more} event${dashboardShown !== 1 || more ? 's' : ''}`;
+}
+
+function updateLoadMore(eventsList) {
+    let btn = document.getElementById('load-more-btn');
+    if (!dashboardCursor) {
+        if (btn) btn.remove();
+        return;
+    }
+    if (!btn) {
+        btn = document.createElement('button');
+        btn.id = 'load-more-btn';
+        btn.className = 'btn-secondary';
+        btn.textContent = '⬇️ Load more events';
+        btn.addEventListener('click', loadMoreEvents);
+        eventsList.after(btn);
+        // Fetch the next page as soon as the button scrolls into view
+        if ('IntersectionObserver' in window) {
+            new IntersectionObserver(entries => {
+                if (entries[0].isIntersecting && !btn.disabled) loadMoreEvents();
+            }).observe(btn);
+        }
+    }
+}
+
 async function loadEvents() {
     const eventsList = document.getElementById('events-list');
     if (!eventsList) return;
@@ -251,32 +416,42 @@ async function loadEvents() {
     eventsList.innerHTML = '<div style="text-align:center;padding:20px;">🔄 Loading events...</div>';
     
     try {
-        const events = await safeFetch(`${API_BASE}/events`);
+        const page = await fetchEvents({ limit: EVENTS_PAGE_SIZE });
+        dashboardCursor = page.next_cursor;
+        dashboardShown = page.events.length;
         
-        if (events.length === 0) {
+        if (page.events.length === 0) {
             eventsList.innerHTML = '<div style="text-align:center;color:#666;padding:40px;">📭 No events yet<br><small>Create your first event below!</small></div>';
-            if (document.getElementById('event-count')) {
-                document.getElementById('event-count').textContent = '0 events';
-            }
         } else {
-            eventsList.innerHTML = events.map(event => `
-                <div class="event">
-                    <h3>${event.title || 'Untitled'}</h3>
-                    <p>📅 ${new Date(event.date).toLocaleDateString()}</p>
-                    <p>🎫 ${event.total_tickets || 0} tickets available</p>
-                    ${event.description ? `<p>${event.description}</p>` : ''}
-                </div>
-            `).join('');
-            if (document.getElementById('event-count')) {
-                document.getElementById('event-count').textContent = `${events.length} event${events.length !== 1 ? 's' : ''}`;
-            }
+            eventsList.innerHTML = page.events.map(renderEventCard).join('');
         }
+        updateEventCount();
+        updateLoadMore(eventsList);
     } catch (error) {
         eventsList.innerHTML = '<div style="color:#e74c3c;text-align:center;padding:40px;">❌ Failed to load events: ' + error.message + '</div>';
         console.error('Load events error:', error);
     }
 }
 
+async function loadMoreEvents() {
+    const eventsList = document.getElementById('events-list');
+    const btn = document.getElementById('load-more-btn');
+    if (!eventsList || !dashboardCursor || (btn && btn.disabled)) return;
+    
+    if (btn) btn.disabled = true;
+    try {
+        const page = await fetchEvents({ limit: EVENTS_PAGE_SIZE, cursor: dashboardCursor });
+        dashboardCursor = page.next_cursor;
+        dashboardShown += page.events.length;
+        eventsList.insertAdjacentHTML('beforeend', page.events.map(renderEventCard).join(''));
+        updateEventCount();
+    } catch (error) {
+        console.error('Load more events error:', error);
+    }
+    if (btn) btn.disabled = false;
+    updateLoadMore(eventsList);
+}
+
 // ✨ CREATE EVENT - FIXED (Single fetch call)
 async function createEvent() {
     const title = document.getElementById('event-title')?.value?.trim();
@@ -330,7 +505,37 @@ async function createEvent() {
     setLoading('create-event-btn', false);
 }
 
-// ✨ LOAD EVENTS FOR REGISTER DROPDOWN
+// ✨ LOAD EVENTS FOR REGISTER DROPDOWN - upcoming only, slim fields, paged
+const REGISTER_QUERY = { limit: 50, when: 'upcoming', fields: 'id,title,date,total_tickets' };
+let registerCursor = null;
+
+function appendEventOptions(eventSelect, events) {
+    const moreOption = eventSelect.querySelector('option[value="__more__"]');
+    if (moreOption) moreOption.remove();
+    
+    events.forEach(event => {
+        const option = document.createElement('option');
+        option.value = event.id;
+        option.dataset.label = `${event.title} (${new Date(event.date).toLocaleDateString()})`;
+        setOptionTickets(option, event.total_tickets);
+        eventSelect.appendChild(option);
+    });
+    
+    if (registerCursor) {
+        const option = document.createElement('option');
+        option.value = '__more__';
+        option.textContent = '⬇️ Load more events...';
+        eventSelect.appendChild(option);
+    }
+}
+
+function setOptionTickets(option, remaining) {
+    option.textContent = remaining > 0
+        ? `${option.dataset.label} - ${remaining} tickets`
+        : `${option.dataset.label} - sold out`;
+    option.disabled = !(remaining > 0);
+}
+
 async function loadEventsForRegister() {
     const eventSelect = document.getElementById('event-select');
     if (!eventSelect) return;
@@ -338,19 +543,26 @@ async function loadEventsForRegister() {
     eventSelect.innerHTML = '<option>Loading events...</option>';
     
     try {
-        const events = await safeFetch(`${API_BASE}/events`);
+        const page = await fetchEvents(REGISTER_QUERY);
+        registerCursor = page.next_cursor;
         eventSelect.innerHTML = '<option value="">Select an event...</option>';
         
-        if (events.length === 0) {
+        if (page.events.length === 0) {
             eventSelect.innerHTML = '<option value="">No events available - Contact admin</option>';
             return;
         }
         
-        events.forEach(event => {
-            const option = document.createElement('option');
-            option.value = event.id;
-            option.textContent = `${event.title} (${new Date(event.date).toLocaleDateString()}) - ${event.total_tickets} tickets`;
-            eventSelect.appendChild(option);
+        appendEventOptions(eventSelect, page.events);
+        eventSelect.addEventListener('change', async () => {
+            if (eventSelect.value !== '__more__' || !registerCursor) return;
+            eventSelect.selectedIndex = 0;
+            try {
+                const next = await fetchEvents({ ...REGISTER_QUERY, cursor: registerCursor });
+                registerCursor = next.next_cursor;
+                appendEventOptions(eventSelect, next.events);
+            } catch (error) {
+                console.error('Load more events error:', error);
+            }
         });
     } catch (error) {
         eventSelect.innerHTML = '<option value="">Failed to load events</option>';
@@ -358,6 +570,43 @@ async function loadEventsForRegister() {
     }
 }
 
+// 📡 LIVE AVAILABILITY - patch counts in place as bookings land
+async function subscribeAvailability(onDelta, onReset) {
+    if (!('EventSource' in window)) return;
+    // only where the server's workers can hold a stream open (not gunicorn's sync worker)
+    const health = await safeFetch(`${API_BASE}/health`).catch(() => null);
+    if (!health || !health.streaming) return;
+    const source = new EventSource(`${API_BASE}/events/stream`);
+    source.addEventListener('availability', message => {
+        JSON.parse(message.data).forEach(([eventId, remaining]) => onDelta(eventId, remaining));
+    });
+    // we missed deltas (reconnected too late) - start over from a fresh list
+    source.addEventListener('reset', () => onReset && onReset());
+}
+
+function patchEventCard(eventId, remaining) {
+    const card = document.querySelector(`.event[data-event-id="${CSS.escape(eventId)}"]`);
+    if (!card) return;
+    if (remaining === null) {
+        card.remove();
+        dashboardShown = Math.max(0, dashboardShown - 1);
+        updateEventCount();
+        return;
+    }
+    card.querySelector('.tickets-left').textContent = remaining;
+}
+
+function patchEventOption(eventId, remaining) {
+    const option = document.querySelector(`#event-select option[value="${CSS.escape(eventId)}"]`);
+    if (!option) return;
+    if (remaining === null) {
+        if (option.selected) option.parentElement.selectedIndex = 0;
+        option.remove();
+        return;
+    }
+    setOptionTickets(option, remaining);
+}
+
 // 🚀 PAGE INITIALIZATION
 document.addEventListener('DOMContentLoaded', function() {
     console.log('🎉 App loaded - Page:', window.location.pathname);
@@ -370,6 +619,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (adminToken && adminToken.startsWith('admin-')) {
                 statusDiv.textContent = '✅ Admin authenticated';
                 loadEvents();
+                subscribeAvailability(patchEventCard, loadEvents);
             } else {
                 statusDiv.textContent = '⚠️ Please login as admin';
                 setTimeout(() => redirectTo('admin_login.html'), 2000);
@@ -380,5 +630,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Register: Load events dropdown
     if (window.location.pathname.includes('register.html')) {
         loadEventsForRegister();
+        subscribeAvailability(patchEventOption);
+        loadMyRegistrations();
     }
 });
@@ -0,0 +1,129 @@
+"""Shared fixtures - the app runs on a throwaway SQLite file.
+
+The backend reads its settings when ``config`` is imported, so the
+environment is set here, before any test module imports the app.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+
+import httpx
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix='event-ticket-tests-')
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+os.environ.update({
+    'STORAGE_BACKEND': 'sqlite',
+    'SQLITE_PATH': os.path.join(DATA_DIR, 'event_tickets.db'),
+    'ADMISSION_PATH': os.path.join(DATA_DIR, 'admission.db'),
+    'COHERENCE_PATH': os.path.join(DATA_DIR, 'coherence.shm'),
+    'JOURNAL_DIR': os.path.join(DATA_DIR, 'journal'),
+    'PROFILE_DIR': os.path.join(DATA_DIR, 'profiles'),
+    'SECRET_KEY': 'test-secret-key',
+    'ADMISSION_ENABLED': '0',
+    'PASSWORD_ITERATIONS': '1000',
+    'LOG_LEVEL': 'WARNING',
+})
+sys.path.insert(0, BACKEND)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers():
+    from tokens import issue_token
+    return {'Authorization': 'Bearer ' + issue_token('admin', 'admin@example.com')}
+
+
+class LocalDB:
+    """Stands in for DatabaseManager - one storage, always up"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get_storage(self):
+        return self.storage
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh SQLite database holding events e1 and e2 (100 tickets each)"""
+    from storage import SQLiteStorage
+    storage = SQLiteStorage(str(tmp_path / 'tickets.db'))
+    for event_id in ('e1', 'e2'):
+        storage.insert_event({'id': event_id, 'title': 'Gig', 'description': 'Loud', 'date': '2030-01-01',
+                              'total_tickets': 100, 'created_at': '2026-01-01T00:00:00'})
+    return LocalDB(storage)
+
+
+@pytest.fixture
+def make_event(client, admin_headers):
+    """POST a new event and return its id"""
+    def make(total_tickets=100, title='Test event'):
+        response = client.post('/api/events', headers=admin_headers, json={
+            'title': title,
+            'description': 'Created by the test suite',
+            'date': '2030-01-01',
+            'total_tickets': total_tickets
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['event_id']
+    return make
+
+
+class FakePostgREST:
+    """Tables served over the real postgrest-py client and an in-process transport.
+
+    Like Postgres, rows come back in no particular order unless the query
+    orders them - and like PostgREST, only the last ``order`` param counts.
+    """
+
+    OPS = {'eq': lambda a, b: a == b, 'gte': lambda a, b: a >= b, 'lte': lambda a, b: a <= b}
+
+    def __init__(self):
+        from postgrest import SyncPostgrestClient
+        self.tables = {}
+        self.ranges = []
+        self.client = SyncPostgrestClient('http://postgrest.test')
+        self.client.session = httpx.Client(base_url='http://postgrest.test',
+                                           transport=httpx.MockTransport(self.handle))
+
+    def handle(self, request):
+        rows = list(self.tables[request.url.path.strip('/')])
+        for column, condition in request.url.params.multi_items():
+            if column in ('select', 'order'):
+                continue
+            op, value = condition.split('.', 1)
+            rows = [row for row in rows if self.OPS[op](str(row[column]), value)]
+        random.shuffle(rows)
+        order = request.url.params.get_list('order')
+        if order:
+            columns = order[-1].split(',')
+            rows.sort(key=lambda row: [row[column] for column in columns])
+        start, end = 0, len(rows) - 1
+        if 'range' in request.headers:
+            start, end = map(int, request.headers['range'].split('-'))
+            self.ranges.append((start, end))
+        columns = request.url.params.get('select', '*')
+        if columns != '*':
+            rows = [{column: row[column] for column in columns.split(',')} for row in rows]
+        return httpx.Response(200, content=json.dumps(rows[start:end + 1]),
+                              headers={'content-type': 'application/json'})
+
+
+@pytest.fixture
+def postgrest():
+    return FakePostgREST()
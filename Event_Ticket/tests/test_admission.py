@@ -0,0 +1,107 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import admission
+from admission import ADMITTED, FULL, SOLD_OUT, WAITING, MemoryAdmissionStore, SQLiteAdmissionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    options = {'limit': 2, 'hold_seconds': 30, 'idle_seconds': 20, 'max_queue': 3, 'sold_out_seconds': 60}
+    if request.param == 'sqlite':
+        return SQLiteAdmissionStore(str(tmp_path / 'admission.db'), **options)
+    return MemoryAdmissionStore(**options)
+
+
+def test_first_come_first_served(store):
+    first, second = store.enter('e1'), store.enter('e1')
+    assert [first['state'], second['state']] == [ADMITTED, ADMITTED]
+
+    waiting = [store.enter('e1') for _ in range(3)]
+    assert [spot['state'] for spot in waiting] == [WAITING] * 3
+    assert [spot['position'] for spot in waiting] == [1, 2, 3]
+
+    # the next one in line - not whoever polls first - gets the freed slot
+    store.release(first['ticket'], 0.5)
+    assert store.status(waiting[2]['ticket'])['position'] == 2
+    assert store.status(waiting[0]['ticket'])['state'] == ADMITTED
+    assert store.status(waiting[1]['ticket'])['position'] == 1
+
+
+def test_reentering_keeps_the_place(store):
+    for _ in range(2):
+        store.enter('e1')
+    spot = store.enter('e1')
+    store.enter('e1')
+
+    again = store.enter('e1', spot['ticket'])
+    assert (again['ticket'], again['position']) == (spot['ticket'], 1)
+
+
+def test_queues_are_per_event(store):
+    for _ in range(2):
+        store.enter('e1')
+    assert store.enter('e1')['state'] == WAITING
+    assert store.enter('e2')['state'] == ADMITTED
+
+
+def test_full_queue_is_turned_away(store):
+    for _ in range(2 + 3):
+        store.enter('e1')
+    assert store.enter('e1')['state'] == FULL
+
+
+def test_sold_out_sheds_everyone(store):
+    admitted = store.enter('e1')
+    store.mark_sold_out('e1')
+
+    assert store.enter('e1')['state'] == SOLD_OUT
+    assert store.status(admitted['ticket'])['state'] == SOLD_OUT
+
+
+def test_tracks_only_events_with_a_queue(store):
+    assert not store.tracks('e1')
+    store.enter('e1')
+    assert store.tracks('e1')
+
+
+def test_idle_queues_are_dropped(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission, 'time', SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    for event in range(100):
+        spot = store.enter(f'e{event}')
+        store.release(spot['ticket'])
+    for _ in range(3):
+        store.enter('abandoned')     # two admitted, one waiting - none of them come back
+    store.enter('sold-out')
+    store.mark_sold_out('sold-out')
+
+    now[0] += 40
+    store.enter('busy')
+
+    events = [f'e{event}' for event in range(100)] + ['abandoned', 'sold-out', 'busy']
+    assert [event for event in events if store.tracks(event)] == ['sold-out', 'busy']
+    now[0] += 40
+    store.enter('busy')
+    assert [event for event in events if store.tracks(event)] == ['busy']
+
+
+def test_unknown_event_is_not_queued(client, monkeypatch, make_event):
+    import app as app_module
+
+    store = MemoryAdmissionStore(limit=2)
+    monkeypatch.setattr(app_module, 'admission', store)
+    response = client.post('/api/tickets/register', json={
+        'event_id': 'no-such-event', 'name': 'Ada', 'email': 'ada@example.com', 'tickets': 1
+    })
+    assert response.status_code == 404
+    assert not store.tracks('no-such-event')
+
+    event_id = make_event(total_tickets=5)
+    response = client.post('/api/tickets/register', json={
+        'event_id': event_id, 'name': 'Ada', 'email': 'ada@example.com', 'tickets': 1
+    })
+    assert response.status_code == 201
+    assert store.tracks(event_id)
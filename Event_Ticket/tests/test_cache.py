@@ -0,0 +1,138 @@
+import threading
+
+from cache import QueryCache
+
+
+def counting_loader(body=b'[]'):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return body
+    return load, calls
+
+
+def test_hit_skips_the_loader():
+    cache = QueryCache(ttl=60)
+    load, calls = counting_loader()
+
+    first = cache.get('k', load)
+    second = cache.get('k', load)
+
+    assert first is second
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_forces_a_reload():
+    cache = QueryCache(ttl=60)
+    load, calls = counting_loader()
+
+    cache.get('k', load)
+    cache.invalidate()
+    cache.get('k', load)
+
+    assert len(calls) == 2
+
+
+def test_expired_entry_is_reloaded():
+    cache = QueryCache(ttl=0)
+    load, calls = counting_loader()
+
+    cache.get('k', load)
+    cache.get('k', load)
+
+    assert len(calls) == 2
+
+
+def test_write_during_load_is_served_but_not_kept():
+    cache = QueryCache(ttl=60)
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            cache.invalidate()      # a booking commits while the list is being read
+        return b'[]'
+
+    cache.get('k', load)
+    cache.get('k', load)
+
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = QueryCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'[]'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get('k', load)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get('k', load))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(entry) for entry in results}) == 1
+
+
+def test_scoped_invalidate_only_drops_that_scope():
+    cache = QueryCache(ttl=60, scoped=True)
+    load_a, calls_a = counting_loader(b'"a"')
+    load_b, calls_b = counting_loader(b'"b"')
+
+    cache.get(('a@example.com', 1), load_a)
+    cache.get(('b@example.com', 1), load_b)
+    cache.invalidate('a@example.com')
+    cache.get(('a@example.com', 1), load_a)
+    cache.get(('b@example.com', 1), load_b)
+
+    assert (len(calls_a), len(calls_b)) == (2, 1)
+
+
+def test_events_list_answers_304_until_a_booking(client, make_event):
+    event_id = make_event(total_tickets=10)
+    first = client.get('/api/events')
+    etag = first.headers['ETag']
+
+    again = client.get('/api/events', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    client.post('/api/tickets/register', json={
+        'event_id': event_id, 'name': 'Ada', 'email': 'ada@example.com', 'tickets': 1
+    })
+    changed = client.get('/api/events', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [e['total_tickets'] for e in changed.get_json() if e['id'] == event_id] == [9]
+
+
+def test_my_registrations_refresh_after_booking(client, make_event):
+    from tokens import issue_token
+
+    email = 'cache-user@example.com'
+    headers = {'Authorization': 'Bearer ' + issue_token('user', email)}
+    event_id = make_event(total_tickets=10)
+
+    before = client.get('/api/me/registrations', headers=headers)
+    etag = before.headers['ETag']
+    assert client.get('/api/me/registrations', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/tickets/register', json={
+        'event_id': event_id, 'name': 'Ada', 'email': email, 'tickets': 2
+    })
+    after = client.get('/api/me/registrations', headers={**headers, 'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
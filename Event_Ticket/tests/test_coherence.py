@@ -0,0 +1,78 @@
+import multiprocessing
+
+import pytest
+
+from coherence import RING_SIZE, SharedState
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'coherence.shm')
+
+
+def test_versions_are_shared_between_mappings(path):
+    one, two = SharedState(path), SharedState(path)
+    events = two.channel('events')
+
+    assert events.version() == 0
+    assert one.bump('events') == 1
+    assert events.version() == 1
+    assert events.bump() == 2
+    assert one.version('events') == 2
+    assert one.version('stats') == 0
+
+
+def test_scoped_counters(path):
+    one, two = SharedState(path), SharedState(path)
+
+    one.bump('registrations', 'ada@example.com')
+
+    assert two.version('registrations', 'ada@example.com') == 1
+    assert two.version('registrations') == 0
+    assert two.version('users', 'ada@example.com') == 0
+
+
+def test_unknown_channel():
+    with pytest.raises(ValueError):
+        SharedState('unused').channel('nope')
+
+
+def publish_and_bump(path, deltas):
+    state = SharedState(path)
+    state.publish(deltas)
+    state.bump('events')
+
+
+def test_ring_carries_deltas_from_other_processes(path):
+    state = SharedState(path)
+    start = state.head
+    state.publish([('mine', 3)])    # our own deltas are not echoed back
+
+    worker = multiprocessing.get_context('fork').Process(
+        target=publish_and_bump, args=(path, [('e1', 7), ('e2', None)])
+    )
+    worker.start()
+    worker.join(10)
+
+    assert worker.exitcode == 0
+    assert state.since(start) == ([('e1', 7), ('e2', None)], start + 3)
+    assert state.since(start + 3) == ([], start + 3)
+    assert state.version('events') == 1
+
+
+def test_lapped_reader_gets_none(path):
+    state = SharedState(path)
+    state.publish([('e1', n) for n in range(RING_SIZE + 1)])
+
+    deltas, head = state.since(0)
+    assert deltas is None
+    assert head == RING_SIZE + 1
+
+
+def test_stale_layout_is_reset(path):
+    with open(path, 'wb') as f:
+        f.write(b'old layout')
+
+    state = SharedState(path)
+    assert state.version('events') == 0
+    assert state.bump('events') == 1
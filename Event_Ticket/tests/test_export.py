@@ -0,0 +1,30 @@
+import csv
+import io
+import json
+
+from config import Config
+
+
+def test_attendees_stream_across_pages(client, admin_headers, make_event, monkeypatch):
+    monkeypatch.setattr(Config, 'EXPORT_PAGE_SIZE', 2)
+    event_id = make_event(total_tickets=50)
+    for n, name in enumerate(['Ada', 'Bob', '=HYPERLINK("x")', 'Dan', 'Eve']):
+        client.post('/api/tickets/register', json={
+            'event_id': event_id, 'name': name, 'email': f'guest{n}@example.com', 'tickets': n + 1
+        })
+
+    response = client.get(f'/api/admin/events/{event_id}/attendees', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['name'] for row in rows] == ['Ada', 'Bob', '\'=HYPERLINK("x")', 'Dan', 'Eve']
+
+    response = client.get(f'/api/admin/events/{event_id}/attendees?format=jsonl', headers=admin_headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['tickets'] for line in lines] == [1, 2, 3, 4, 5]
+
+
+def test_export_needs_admin_and_a_known_format(client, admin_headers):
+    assert client.get('/api/admin/events/e1/attendees').status_code == 401
+    response = client.get('/api/admin/events/e1/attendees?format=xlsx', headers=admin_headers)
+    assert response.status_code == 400
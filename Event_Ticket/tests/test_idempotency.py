@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+from idempotency import IdempotencyConflict, IdempotencyStore, IdempotencyTimeout
+from storage import SQLiteStorage
+
+# the MCP server imports its siblings as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'mcp'))
+from handlers import EventTicketTools, SupabasePool  # noqa: E402
+
+
+def booking(event_id, tickets=1):
+    return {'event_id': event_id, 'name': 'Ada', 'email': 'ada@example.com', 'tickets': tickets}
+
+
+def test_retry_is_replayed_without_booking_twice(client, make_event):
+    event_id = make_event(total_tickets=10)
+    headers = {'Idempotency-Key': str(uuid.uuid4())}
+
+    first = client.post('/api/tickets/register', json=booking(event_id, 2), headers=headers)
+    retry = client.post('/api/tickets/register', json=booking(event_id, 2), headers=headers)
+
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    fresh = client.post('/api/tickets/register', json=booking(event_id, 1))
+    assert fresh.get_json()['remaining'] == 7
+
+
+def test_key_reused_for_another_body_is_422(client, make_event):
+    event_id = make_event(total_tickets=10)
+    headers = {'Idempotency-Key': str(uuid.uuid4())}
+
+    client.post('/api/tickets/register', json=booking(event_id, 1), headers=headers)
+    response = client.post('/api/tickets/register', json=booking(event_id, 3), headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_rejection_is_replayed_too(client, make_event):
+    event_id = make_event(total_tickets=1)
+    headers = {'Idempotency-Key': str(uuid.uuid4())}
+
+    first = client.post('/api/tickets/register', json=booking(event_id, 5), headers=headers)
+    client.post('/api/tickets/register', json=booking(event_id, 1))
+    retry = client.post('/api/tickets/register', json=booking(event_id, 5), headers=headers)
+
+    assert first.status_code == retry.status_code == 400
+    assert retry.get_json() == first.get_json()
+
+
+def test_same_key_on_another_route_is_independent(client, make_event):
+    event_id = make_event(total_tickets=10)
+    key = str(uuid.uuid4())
+
+    client.post('/api/tickets/register', json=booking(event_id), headers={'Idempotency-Key': key})
+    batch = client.post('/api/tickets/register-batch', headers={'Idempotency-Key': key}, json={
+        'name': 'Ada', 'email': 'ada@example.com', 'lines': [{'event_id': event_id, 'tickets': 1}]
+    })
+
+    assert 'Idempotent-Replayed' not in batch.headers
+
+
+def test_duplicate_waits_for_the_first_attempt():
+    store = IdempotencyStore(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def book():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ('booked', 201)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(store.run('k', 'fp', book)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(store.run('k', 'fp', book)))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_unsettled_results_are_retried():
+    store = IdempotencyStore(ttl=60)
+    outcomes = iter([('queued', 202), ('booked', 201)])
+
+    def keep(result):
+        return result[1] != 202
+
+    assert store.run('k', 'fp', lambda: next(outcomes), keep=keep) == (('queued', 202), False)
+    assert store.run('k', 'fp', lambda: next(outcomes), keep=keep) == (('booked', 201), False)
+    assert store.run('k', 'fp', lambda: None, keep=keep) == (('booked', 201), True)
+
+
+def test_conflict_and_timeout():
+    store = IdempotencyStore(ttl=60, wait_seconds=0.05)
+    store.run('done', 'fp', lambda: 'ok')
+    with pytest.raises(IdempotencyConflict):
+        store.run('done', 'other', lambda: 'ok')
+
+    release = threading.Event()
+    running = threading.Thread(target=lambda: store.run('slow', 'fp', lambda: release.wait(5)))
+    running.start()
+    while 'slow' not in store._in_flight:
+        time.sleep(0.001)
+    with pytest.raises(IdempotencyTimeout):
+        store.run('slow', 'fp', lambda: 'ok')
+    release.set()
+    running.join()
+
+
+def test_entries_expire_and_are_bounded():
+    store = IdempotencyStore(ttl=0, max_entries=2)
+    store.run('a', 'fp', lambda: 1)
+    assert store.run('a', 'fp', lambda: 2) == (2, False)
+
+    store = IdempotencyStore(ttl=60, max_entries=2)
+    for key in 'abc':
+        store.run(key, 'fp', lambda: key)
+    assert list(store._results) == ['b', 'c']
+
+
+class LocalPool(SupabasePool):
+    def __init__(self, storage):
+        super().__init__(client_factory=None, max_workers=2)
+        self._storage = storage
+
+
+@pytest.fixture
+def mcp_tools(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'tickets.db'))
+    for event_id in ('e1', 'e2'):
+        storage.insert_event({'id': event_id, 'title': 'Gig', 'description': 'Loud', 'date': '2030-01-01',
+                              'total_tickets': 10, 'created_at': '2026-01-01T00:00:00'})
+    tools = EventTicketTools(LocalPool(storage))
+    yield tools
+    tools.pool.close()
+
+
+def tickets_left(tools):
+    conn = sqlite3.connect(tools.pool.get_storage().path)
+    return dict(conn.execute('SELECT id, total_tickets FROM events ORDER BY id').fetchall())
+
+
+@pytest.mark.parametrize('tool, params', [
+    ('book_tickets', {'event_id': 'e1', 'tickets': 2}),
+    ('book_tickets_batch', {'lines': [{'event_id': 'e1', 'tickets': 2}, {'event_id': 'e2', 'tickets': 1}]}),
+])
+def test_mcp_retry_with_the_same_key_books_once(mcp_tools, tool, params):
+    params = {**params, 'email': 'ada@example.com', 'idempotency_key': 'k1'}
+
+    first = asyncio.run(getattr(mcp_tools, tool)(params))
+    retry = asyncio.run(getattr(mcp_tools, tool)(params))
+    other = asyncio.run(getattr(mcp_tools, tool)({**params, 'email': 'bob@example.com'}))
+
+    assert 'error' not in json.loads(first)
+    assert retry == first
+    assert json.loads(other)['error'] == 'idempotency_key was already used for a different booking'
+    assert tickets_left(mcp_tools) == ({'e1': 8, 'e2': 10} if tool == 'book_tickets' else {'e1': 8, 'e2': 9})
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+
+from journal import BookingJournal
+
+
+def open_journal(db, directory, **options):
+    # no background flushing - the tests flush (or crash) by hand
+    journal = BookingJournal(db, str(directory), lease_size=10, flush_interval=3600, **options)
+    journal.start()
+    return journal
+
+
+def crash(journal):
+    # the process dies: buffered state is gone, the flock goes with the file handles
+    for file in [journal.active, *journal.draining]:
+        file._handle.close()
+
+
+def registrations(db):
+    conn = sqlite3.connect(db.storage.path)
+    return conn.execute('SELECT journal_id, tickets FROM registrations ORDER BY id').fetchall()
+
+
+def total_tickets(db):
+    conn = sqlite3.connect(db.storage.path)
+    return conn.execute("SELECT total_tickets FROM events WHERE id = 'e1'").fetchone()[0]
+
+
+def test_unflushed_bookings_are_replayed(db, tmp_path):
+    journal = open_journal(db, tmp_path / 'journal')
+    for tickets in (2, 3, 1):
+        journal.book(db.storage, 'e1', tickets, 'Ada', 'ada@example.com')
+    assert registrations(db) == []
+    assert total_tickets(db) == 90      # one lease of 10
+    crash(journal)
+
+    recovered = open_journal(db, tmp_path / 'journal')
+    assert recovered.status()['pending'] == 3
+    assert recovered.active.allotments == {'e1': 4}
+    recovered.flush()
+
+    assert [tickets for _, tickets in registrations(db)] == [2, 3, 1]
+    assert recovered.status()['pending'] == 0
+
+
+def test_replaying_a_flushed_booking_does_not_duplicate_it(db, tmp_path):
+    journal = open_journal(db, tmp_path / 'journal')
+    journal.book(db.storage, 'e1', 2, 'Ada', 'ada@example.com')
+    journal.flush()
+    journal.book(db.storage, 'e1', 1, 'Bob', 'bob@example.com')
+    # the insert lands, then the process dies before journalling "flushed"
+    record = journal.active.pending[0]
+    db.storage.insert_registrations([{
+        'journal_id': record['id'], 'name': record['name'], 'user_email': record['email'],
+        'event_id': record['event_id'], 'tickets': record['tickets'], 'registered_at': record['at']
+    }])
+    crash(journal)
+
+    recovered = open_journal(db, tmp_path / 'journal')
+    assert recovered.status()['pending'] == 1
+    recovered.flush()
+
+    rows = registrations(db)
+    assert [tickets for _, tickets in rows] == [2, 1]
+    assert len({journal_id for journal_id, _ in rows}) == 2
+
+
+def test_torn_tail_is_cut_off(db, tmp_path):
+    journal = open_journal(db, tmp_path / 'journal')
+    journal.book(db.storage, 'e1', 2, 'Ada', 'ada@example.com')
+    journal.book(db.storage, 'e1', 3, 'Bob', 'bob@example.com')
+    path = journal.active.path
+    crash(journal)
+    with open(path, 'ab') as f:
+        f.write(b'1234abcd {"op": "book", "tick')      # died mid-write
+
+    recovered = open_journal(db, tmp_path / 'journal')
+    recovered.flush()
+
+    assert [tickets for _, tickets in registrations(db)] == [2, 3]
+    with open(path, 'rb') as f:
+        assert f.read().endswith(b'\n')
+
+
+def test_journals_of_dead_workers_are_drained(db, tmp_path):
+    # two workers died, each with its own journal
+    for worker, (name, tickets) in enumerate([('Ada', 2), ('Bob', 1)]):
+        journal = open_journal(db, tmp_path / f'worker{worker}')
+        journal.book(db.storage, 'e1', tickets, name, f'{name.lower()}@example.com')
+        crash(journal)
+        os.rename(journal.active.path, tmp_path / os.path.basename(journal.active.path))
+    assert total_tickets(db) == 80
+
+    recovered = open_journal(db, tmp_path, lease_idle=3600)
+    assert len(recovered.draining) == 1
+    recovered.flush()
+
+    assert sorted(tickets for _, tickets in registrations(db)) == [1, 2]
+    # the drained journal's unsold tickets went back, the kept one's stay leased
+    assert recovered.draining == []
+    assert total_tickets(db) + sum(recovered.active.allotments.values()) == 97
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('journal-')]) == 1
@@ -0,0 +1,33 @@
+import pytest
+
+
+def test_stream_refused_without_threaded_worker(client, monkeypatch):
+    from config import Config
+
+    monkeypatch.setattr(Config, 'STREAM_ENABLED', 'auto')
+    response = client.get('/api/events/stream', environ_overrides={'wsgi.multithread': False})
+    assert response.status_code == 503
+    health = client.get('/api/health', environ_overrides={'wsgi.multithread': False})
+    assert health.get_json()['streaming'] is False
+
+
+@pytest.mark.parametrize('setting, multithread, expected', [
+    ('auto', True, True), ('1', False, True), ('0', True, False)
+])
+def test_streaming_advertised(client, monkeypatch, setting, multithread, expected):
+    from config import Config
+
+    monkeypatch.setattr(Config, 'STREAM_ENABLED', setting)
+    health = client.get('/api/health', environ_overrides={'wsgi.multithread': multithread})
+    assert health.get_json()['streaming'] is expected
+
+
+def test_deltas_reach_a_subscriber():
+    from livestream import AvailabilityHub
+
+    hub = AvailabilityHub(buffer_size=16, max_subscribers=4)
+    frames = hub.stream(f'{hub.epoch}.{hub.seq}', heartbeat=0.1, max_seconds=0.3)
+    hub.publish([('e1', 7), ('e2', None)])
+    body = ''.join(frames)
+    assert 'event: availability\ndata: [["e1",7],["e2",null]]' in body
+    assert hub.subscribers == 0
@@ -0,0 +1,41 @@
+import json
+import logging
+import queue
+
+from logs import JsonFormatter, _QueueHandler, log
+
+
+def capture():
+    logger = logging.getLogger('event_tickets_test.logs')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    records = queue.SimpleQueue()
+    logger.handlers = [_QueueHandler(records)]
+    return logger, records
+
+
+def test_fields_become_json_keys():
+    logger, records = capture()
+    log(logger, logging.INFO, 'tickets_registered', event_id='e1', tickets=2)
+
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert (entry['event'], entry['event_id'], entry['tickets']) == ('tickets_registered', 'e1', 2)
+
+
+def test_traceback_is_a_field_not_part_of_the_event():
+    logger, records = capture()
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        log(logger, logging.ERROR, 'flush_failed', exc_info=True, rows=3)
+
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert entry['event'] == 'flush_failed'
+    assert entry['rows'] == 3
+    assert entry['traceback'].endswith('RuntimeError: boom')
+
+
+def test_disabled_level_builds_nothing():
+    logger, records = capture()
+    log(logger, logging.DEBUG, 'noisy', payload=object())
+    assert records.empty()
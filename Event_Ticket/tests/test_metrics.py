@@ -0,0 +1,39 @@
+import pytest
+
+from metrics import InstrumentedStorage, Metrics
+from reservations import ReservationError
+
+
+class FlakyStorage:
+    name = 'fake'
+
+    def reserve_tickets(self, event_id, tickets, name, email):
+        raise ReservationError('Only 0 tickets available', remaining=0)
+
+    def list_events(self, query):
+        raise ConnectionError('database went away')
+
+
+def errors(metrics):
+    return metrics._counters.get('db_call_errors_total', {})
+
+
+def test_rejected_booking_is_not_a_db_error():
+    metrics = Metrics()
+    storage = InstrumentedStorage(FlakyStorage(), metrics)
+
+    with pytest.raises(ReservationError):
+        storage.reserve_tickets('e1', 1, 'Ada', 'ada@example.com')
+
+    assert errors(metrics) == {}
+    assert (('op', 'reserve_tickets'),) in metrics._histograms['db_call_duration_seconds']
+
+
+def test_failed_call_is_counted():
+    metrics = Metrics()
+    storage = InstrumentedStorage(FlakyStorage(), metrics)
+
+    with pytest.raises(ConnectionError):
+        storage.list_events(None)
+
+    assert errors(metrics) == {(('op', 'list_events'),): 1}
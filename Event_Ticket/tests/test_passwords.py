@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from passwords import HasherBusy, PasswordHasher, hash_password, verify_password
+
+
+def test_hash_verifies_and_flags_old_cost():
+    stored = hash_password('s3cret', 1000)
+    assert verify_password('s3cret', stored, 1000) == (True, False)
+    assert verify_password('wrong', stored, 1000) == (False, False)
+    assert verify_password('s3cret', stored, 2000) == (True, True)
+
+
+def test_full_pool_turns_logins_away():
+    hasher = PasswordHasher(iterations=1000, workers=1, max_waiting=1)
+    release = threading.Event()
+    running = threading.Semaphore(0)
+
+    def slow(*_args):
+        running.release()
+        release.wait(5)
+        return 'done'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(hasher._run(slow))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    running.acquire(timeout=5)
+    deadline = time.monotonic() + 5
+    while hasher._slots._value and time.monotonic() < deadline:
+        time.sleep(0.001)       # until one is hashing and one waiting for the worker
+
+    with pytest.raises(HasherBusy):
+        hasher.verify('s3cret', 'x')
+    assert hasher.rejected == 1
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['done', 'done']
+    assert hasher.verify('s3cret', hash_password('s3cret', 1000)) == (True, False)
+
+
+def test_login_answers_503_when_the_pool_is_full(client, monkeypatch):
+    from app import credentials
+
+    def busy(*_args):
+        raise HasherBusy('Too many logins in progress - please retry')
+
+    monkeypatch.setattr(credentials.hasher, 'verify', busy)
+    monkeypatch.setattr(credentials.hasher, 'hash', busy)
+    response = client.post('/api/auth/user-login', json={'email': 'busy@example.com', 'password': 'pw'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
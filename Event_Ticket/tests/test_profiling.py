@@ -0,0 +1,88 @@
+import marshal
+import time
+
+import pytest
+
+from profiling import RequestProfiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(str(tmp_path / 'profiles'))
+
+
+def follow(profiler):
+    profiler._checked_at = 0.0      # skip the once-a-second throttle
+    profiler._refresh()
+
+
+def test_settings_reach_every_worker(tmp_path):
+    one = RequestProfiler(str(tmp_path))
+    two = RequestProfiler(str(tmp_path))
+
+    one.configure(enabled=True, slow_ms=250)
+    follow(two)
+    assert (two.enabled, two.slow_ms) == (True, 250)
+
+    one.configure(enabled=False)
+    follow(two)
+    assert not two.enabled
+
+
+def test_switches_itself_off(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_seconds=0)
+    profiler.configure(enabled=True)
+    follow(profiler)
+    assert not profiler.enabled
+
+
+@pytest.mark.parametrize('settings', [{'sample_rate': 2}, {'slow_ms': 0}])
+def test_bad_settings(profiler, settings):
+    with pytest.raises(ValueError):
+        profiler.configure(**settings)
+
+
+@pytest.mark.parametrize('capture_id', ['../secret', 'settings', '1-2', '1-2-3/../../secret', ''])
+def test_download_rejects_invalid_ids(profiler, tmp_path, capture_id):
+    (tmp_path / 'secret.collapsed').write_text('stolen 1\n')
+    (tmp_path / 'profiles').mkdir()
+    (tmp_path / 'profiles' / 'settings.collapsed').write_text('stolen 1\n')
+
+    assert profiler.download([capture_id], 'collapsed') is None
+
+
+def test_download_rejects_unknown_formats(profiler):
+    with pytest.raises(ValueError):
+        profiler.download(['1-2-3'], 'json')
+
+
+def wait_for_captures(client, headers, count):
+    for _ in range(200):
+        captures = client.get('/api/admin/profiling', headers=headers).get_json()['captures']
+        if len(captures) >= count:
+            return captures
+        time.sleep(0.01)
+    raise AssertionError('no capture written')
+
+
+def test_toggle_capture_and_download(client, admin_headers):
+    try:
+        switched = client.put('/api/admin/profiling', headers=admin_headers,
+                              json={'enabled': True, 'sample_rate': 1})
+        assert switched.status_code == 200
+        assert switched.get_json()['enabled'] is True
+        assert client.get('/api/health').status_code in (200, 503)
+    finally:
+        client.put('/api/admin/profiling', headers=admin_headers, json={'enabled': False, 'sample_rate': 0.01})
+
+    capture = next(c for c in wait_for_captures(client, admin_headers, 1) if c['path'] == '/api/health')
+    assert capture['reason'] == 'sampled'
+
+    url = f"/api/admin/profiling/captures/{capture['id']}"
+    stats = client.get(url + '?format=pstats', headers=admin_headers)
+    assert stats.status_code == 200
+    assert isinstance(marshal.loads(stats.data), dict)
+    assert client.get(url + '?format=collapsed', headers=admin_headers).status_code == 200
+    assert client.get(url + '?format=json', headers=admin_headers).status_code == 400
+    assert client.get('/api/admin/profiling/captures/..%2Fsettings', headers=admin_headers).status_code == 404
+    assert client.get('/api/admin/profiling/captures/settings', headers=admin_headers).status_code == 404
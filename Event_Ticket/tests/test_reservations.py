@@ -0,0 +1,177 @@
+import threading
+
+import pytest
+
+from reservations import ReservationEngine, ReservationError, parse_tickets
+
+
+class PostgrestError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, table, action, values=None):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.values = values
+        self.filters = []
+
+    def select(self, _columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def execute(self):
+        return self.client.run(self)
+
+
+class FakePostgrest:
+    """Just enough of the supabase client for ``ReservationEngine`` - no rpc functions installed"""
+
+    def __init__(self, events):
+        self.events = {event_id: {'id': event_id, 'total_tickets': count} for event_id, count in events.items()}
+        self.registrations = []
+        self.fail_inserts = False
+        self.lose_races = 0
+
+    def get_client(self):
+        return self
+
+    def rpc(self, _name, _params):
+        raise PostgrestError('PGRST202')
+
+    def table(self, name):
+        client = self
+
+        class _Table:
+            def select(self, columns):
+                return _Query(client, name, 'select').select(columns)
+
+            def update(self, values):
+                return _Query(client, name, 'update', values)
+
+            def insert(self, row):
+                return _Query(client, name, 'insert', row)
+        return _Table()
+
+    def run(self, query):
+        if query.action == 'insert':
+            if self.fail_inserts:
+                raise PostgrestError('23503')
+            self.registrations.append(query.values)
+            return _Result([query.values])
+        rows = [row for row in self.events.values()
+                if all(row.get(column) == value for column, value in query.filters)]
+        if query.action == 'select':
+            return _Result([dict(row) for row in rows])
+        if self.lose_races:
+            # somebody else booked between our read and our write
+            self.lose_races -= 1
+            for row in self.events.values():
+                row['total_tickets'] -= 1
+            return _Result([])
+        for row in rows:
+            row.update(query.values)
+        return _Result([dict(row) for row in rows])
+
+
+def test_missing_function_falls_back_to_cas():
+    db = FakePostgrest({'e1': 10})
+    engine = ReservationEngine(db)
+
+    assert engine.reserve('e1', 3, 'Ada', 'ada@example.com') == 7
+    assert engine.mode == 'cas'
+    assert db.events['e1']['total_tickets'] == 7
+    assert [r['tickets'] for r in db.registrations] == [3]
+
+
+def test_cas_retries_after_losing_a_race():
+    db = FakePostgrest({'e1': 10})
+    db.lose_races = 2
+    engine = ReservationEngine(db, mode='cas')
+
+    assert engine.reserve('e1', 3, 'Ada', 'ada@example.com') == 5
+    assert db.events['e1']['total_tickets'] == 5
+
+
+def test_cas_gives_tickets_back_when_insert_fails():
+    db = FakePostgrest({'e1': 10})
+    db.fail_inserts = True
+    engine = ReservationEngine(db, mode='cas')
+
+    with pytest.raises(PostgrestError):
+        engine.reserve('e1', 4, 'Ada', 'ada@example.com')
+    assert db.events['e1']['total_tickets'] == 10
+    assert db.registrations == []
+
+
+def test_cas_rejects_overbooking():
+    db = FakePostgrest({'e1': 2})
+    engine = ReservationEngine(db, mode='cas')
+
+    with pytest.raises(ReservationError) as error:
+        engine.reserve('e1', 3, 'Ada', 'ada@example.com')
+    assert error.value.remaining == 2
+    assert db.events['e1']['total_tickets'] == 2
+
+
+def test_concurrent_bookings_never_oversell(app, make_event):
+    from database import db
+
+    event_id = make_event(total_tickets=10)
+    storage = db.get_storage()
+    booked, rejected = [], []
+
+    def book(n):
+        try:
+            storage.reserve_tickets(event_id, 1, f'Guest {n}', f'guest{n}@example.com')
+            booked.append(n)
+        except ReservationError:
+            rejected.append(n)
+
+    threads = [threading.Thread(target=book, args=(n,)) for n in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(booked) == 10
+    assert len(rejected) == 15
+    with pytest.raises(ReservationError) as error:
+        storage.reserve_tickets(event_id, 1, 'Late', 'late@example.com')
+    assert error.value.remaining == 0
+
+
+@pytest.mark.parametrize('value', [None, '', 'two', 0, -1, 1.5, True, [1]])
+def test_parse_tickets_rejects_bad_counts(value):
+    with pytest.raises(ReservationError):
+        parse_tickets(value)
+
+
+@pytest.mark.parametrize('body', [
+    {'event_id': 'e1', 'name': 'Ada', 'email': 'ada@example.com'},
+    {'event_id': 'e1', 'name': 'Ada', 'email': 'ada@example.com', 'tickets': 'lots'},
+    {'name': 'Ada', 'email': 'ada@example.com', 'tickets': 1},
+])
+def test_register_rejects_bad_body_with_400(client, body):
+    response = client.post('/api/tickets/register', json=body)
+    assert response.status_code == 400
+
+
+def test_register_books_and_reports_remaining(client, make_event):
+    event_id = make_event(total_tickets=5)
+    response = client.post('/api/tickets/register', json={
+        'event_id': event_id, 'name': 'Ada', 'email': 'ada@example.com', 'tickets': '2'
+    })
+    assert response.status_code == 201
+    assert response.get_json()['remaining'] == 3
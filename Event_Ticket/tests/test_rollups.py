@@ -0,0 +1,168 @@
+import logging
+import time
+
+import pytest
+
+from rollups import MAX_BUCKETS, SalesRollups, _iso, parse_time
+from storage import REGISTRATION_PAGE, SupabaseStorage
+
+DAY = (int(time.time()) // 86400 - 1) * 86400      # yesterday, UTC midnight - inside the retention
+
+
+@pytest.fixture
+def rollups(db):
+    # rollups are only written for events that still exist - db holds e1 and e2
+    return SalesRollups(db, flush_interval=3600, ring_minutes=3 * 1440)
+
+
+def sales(rollups):
+    rollups.record('e1', 2, at=DAY + 10)            # 00:00
+    rollups.record('e1', 3, at=DAY + 50)            # 00:00
+    rollups.record('e2', 1, at=DAY + 3600 + 5)      # 01:00
+    rollups.record('e1', 4, at=DAY + 86400 + 60)    # next day 00:01
+
+
+def tickets(series):
+    return [bucket['tickets'] for bucket in series['buckets']]
+
+
+def test_parse_time():
+    assert parse_time(None) is None
+    assert parse_time('1700000000') == 1_700_000_000
+    assert parse_time('2023-11-14T22:13:20Z') == 1_700_000_000
+    assert parse_time('2023-11-14T22:13:20') == 1_700_000_000      # naive = UTC
+    assert parse_time('2023-11-15T00:13:20+02:00') == 1_700_000_000
+    with pytest.raises(ValueError):
+        parse_time('yesterday')
+
+
+@pytest.mark.parametrize('flushed', [False, True])
+def test_ranges_at_every_resolution(rollups, flushed):
+    sales(rollups)
+    if flushed:
+        assert rollups.flush() > 0
+        assert rollups.status()['events_pending'] == 0
+
+    minutes = rollups.series(None, 'minute', DAY, DAY + 119)
+    assert len(minutes['buckets']) == 2
+    assert tickets(minutes) == [5, 0]
+    assert minutes['to'] == _iso(DAY + 120)
+
+    hours = rollups.series(None, 'hour', DAY, DAY + 86400 + 3599)
+    assert len(hours['buckets']) == 25
+    assert tickets(hours)[:2] == [5, 1] and tickets(hours)[-1] == 4
+    assert hours['totals'] == {'tickets': 10, 'bookings': 4}
+
+    days = rollups.series(None, 'day', DAY, DAY + 86400)
+    assert tickets(days) == [6, 4]
+    assert days['buckets'][0]['start'] == _iso(DAY)
+
+    assert rollups.series('e1', 'day', DAY, DAY + 86400)['totals'] == {'tickets': 9, 'bookings': 3}
+
+
+def test_range_edges_snap_to_buckets(rollups):
+    sales(rollups)
+    # 00:30..01:30 covers the 00:00 and 01:00 hours
+    series = rollups.series(None, 'hour', DAY + 1800, DAY + 5400)
+    assert [bucket['start'][11:16] for bucket in series['buckets']] == ['00:00', '01:00']
+    assert tickets(series) == [5, 1]
+    # outside the range nothing leaks in
+    assert rollups.series(None, 'hour', DAY + 7200, DAY + 7200 * 2)['totals']['tickets'] == 0
+
+
+def test_default_range_is_the_last_buckets(rollups):
+    series = rollups.series(None, 'hour', end=DAY + 3600 * 5)
+    assert len(series['buckets']) == 120
+    assert series['buckets'][-1]['start'] == _iso(DAY + 3600 * 5)
+
+
+@pytest.mark.parametrize('args', [
+    ('week', DAY, DAY),
+    ('hour', DAY + 3600, DAY),
+    ('minute', DAY, DAY + 60 * MAX_BUCKETS),
+])
+def test_bad_ranges(rollups, args):
+    with pytest.raises(ValueError):
+        rollups.series(None, *args)
+
+
+def test_flush_adds_up_across_processes(rollups):
+    other = SalesRollups(rollups.db, flush_interval=3600, ring_minutes=3 * 1440)
+    rollups.record('e1', 2, at=DAY)
+    other.record('e1', 5, at=DAY + 30)
+    rollups.flush()
+    other.flush()
+
+    assert tickets(rollups.series('e1', 'minute', DAY, DAY)) == [7]
+
+
+def test_failed_flush_keeps_the_counts(rollups, monkeypatch):
+    rollups.record('e1', 2, at=DAY)
+
+    def down(rows):
+        raise ConnectionError('database went away')
+
+    monkeypatch.setattr(rollups.db.storage, 'add_sales_rollups', down)
+    with pytest.raises(ConnectionError):
+        rollups.flush()
+    monkeypatch.undo()
+
+    rollups.flush()
+    assert tickets(rollups.series('e1', 'minute', DAY, DAY)) == [2]
+
+
+def test_exit_flush_tolerates_missing_storage(rollups, monkeypatch, caplog):
+    rollups.record('e1', 2, at=DAY)
+
+    def gone(rows):
+        raise OSError('unable to open database file')
+
+    monkeypatch.setattr(rollups.db.storage, 'add_sales_rollups', gone)
+    logger = logging.getLogger('event_tickets.rollups')
+    monkeypatch.setattr(logger, 'propagate', True)
+    with caplog.at_level(logging.WARNING, logger='event_tickets.rollups'):
+        rollups._flush_at_exit()
+
+    assert [(r.levelno, r.getMessage(), bool(r.exc_info)) for r in caplog.records] == [
+        (logging.WARNING, 'sales_rollup_exit_flush_skipped', False)
+    ]
+    assert caplog.records[0].fields['tickets'] == 2
+
+
+def test_journalled_bookings_are_counted_when_flushed(app, make_event, client, admin_headers):
+    import app as app_module
+
+    event_id = make_event()
+    before = client.get(f'/api/admin/sales-timeseries?event_id={event_id}&resolution=day',
+                        headers=admin_headers).get_json()['totals']['tickets']
+    # what a journal flush - including one replaying a crashed worker's journal - reports
+    app_module.journal_flushed([{'event_id': event_id, 'tickets': 3, 'email': 'ada@example.com',
+                                 'at': '2026-01-01T12:00:00'}])
+    response = client.get(f'/api/admin/sales-timeseries?event_id={event_id}&resolution=day'
+                          f'&from=2026-01-01&to=2026-01-02', headers=admin_headers)
+
+    assert before == 0
+    assert response.get_json()['totals']['tickets'] == 3
+
+
+def test_supabase_reads_every_page(postgrest):
+    # two events selling every minute - 2500 rows, past two PostgREST pages
+    postgrest.tables['sales_rollups'] = [
+        {'resolution': 'minute', 'event_id': event_id, 'bucket': _iso(DAY + 60 * minute), 'tickets': 1, 'bookings': 1}
+        for minute in range(1250) for event_id in ('e1', 'e2')
+    ]
+    storage = SupabaseStorage(postgrest.client)
+
+    rows = storage.sales_rollups('minute', _iso(DAY), _iso(DAY + 86400))
+
+    assert len(rows) == 2500
+    assert len({(row['event_id'], row['bucket']) for row in rows}) == 2500
+    assert postgrest.ranges == [(0, REGISTRATION_PAGE - 1), (REGISTRATION_PAGE, 2 * REGISTRATION_PAGE - 1),
+                                (2 * REGISTRATION_PAGE, 3 * REGISTRATION_PAGE - 1)]
+
+
+def test_route_rejects_bad_params(client, admin_headers):
+    assert client.get('/api/admin/sales-timeseries').status_code == 401
+    for query in ('resolution=week', 'from=2026-01-02&to=2026-01-01', 'from=soon'):
+        response = client.get(f'/api/admin/sales-timeseries?{query}', headers=admin_headers)
+        assert response.status_code == 400, query
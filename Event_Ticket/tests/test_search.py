@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from pagination import EventQuery
+from search import SearchIndex, _doc, _Index, tokenize, window
+
+WORDS = ['jazz', 'jam', 'java', 'rock', 'rocket', 'folk', 'fest', 'festival', 'opera', 'open', 'café', 'crème']
+QUERIES = ['j', 'ja', 'jaz', 'rock', 'fest', 'f', 'o', 'open', 'cafe', 'zzz',
+           'jazz fest', 'ro fe', 'f o', 'j r f', 'cafe creme', 'opera jam rocket']
+
+
+def event(n, rng):
+    month = rng.randint(1, 12)
+    return {
+        'id': f'ev{n:04d}',
+        'title': ' '.join(rng.sample(WORDS, rng.randint(1, 3))).title(),
+        'description': ' '.join(rng.sample(WORDS, rng.randint(0, 3))),
+        'date': f'{rng.choice([2029, 2030, 2031])}-{month:02d}-{rng.randint(1, 28):02d}'
+    }
+
+
+def brute_force(events, text, query, limit):
+    words = tokenize(text)
+    lo, hi = window(query)
+    hits = []
+    for e in events.values():
+        doc = tokenize(f"{e['title']} {e['description']}")
+        if lo <= (e['date'], e['id']) < hi and all(any(w.startswith(word) for w in doc) for word in words):
+            hits.append({'id': e['id'], 'title': e['title'], 'date': e['date']})
+    return sorted(hits, key=lambda hit: (hit['date'], hit['id']))[:limit]
+
+
+def test_tokenize_casefolds_and_strips_accents():
+    assert tokenize('Café CRÈME, café!') == ['cafe', 'creme']
+    assert tokenize('') == []
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_every_plan_matches_brute_force(seed):
+    rng = random.Random(seed)
+    events = {e['id']: e for e in (event(n, rng) for n in range(400))}
+    index = _Index.build(_doc(e) for e in list(events.values())[:300])
+    # the rest arrive after the build (the tail), some are removed or rewritten
+    for e in list(events.values())[300:]:
+        index.add(e)
+    for event_id in rng.sample(sorted(events), 40):
+        index.remove(event_id)
+        del events[event_id]
+    for event_id in rng.sample(sorted(events), 20):
+        events[event_id] = {**event(0, rng), 'id': event_id}
+        index.add(events[event_id])
+
+    windows = [EventQuery(), EventQuery(date_from='2030-01-01'), EventQuery(date_to='2030-06-30'),
+               EventQuery(date_from='2030-03-01', date_to='2030-03-31')]
+    for text in QUERIES:
+        for query in windows:
+            lo, hi = window(query)
+            for limit in (1, 5, 1000):
+                expected = brute_force(events, text, query, limit)
+                for plan in (None, 'window', 'driver', 'sets'):
+                    assert index.search(tokenize(text), lo, hi, limit, plan=plan) == expected, (text, plan)
+
+
+@pytest.fixture
+def search(db):
+    storage = db.get_storage()
+    storage.insert_event({'id': 'e3', 'title': 'Jazz Festival', 'description': 'Open air', 'date': '2030-07-01',
+                          'total_tickets': 50, 'created_at': '2026-01-01T00:00:00'})
+    storage.insert_event({'id': 'e4', 'title': 'Café Crème', 'description': 'Jazz trio', 'date': '2030-03-01',
+                          'total_tickets': 50, 'created_at': '2026-01-01T00:00:00'})
+    return SearchIndex(db, refresh_interval=3600)
+
+
+def ids(search, text, **query):
+    return [hit['id'] for hit in search.search(text, EventQuery(**query))]
+
+
+def test_prefix_and_accent_matching(search):
+    assert ids(search, 'jaz fest') == ['e3']
+    assert ids(search, 'JAZZ') == ['e4', 'e3']
+    assert ids(search, 'cafe creme') == ['e4']
+    assert ids(search, 'crème') == ['e4']
+    assert ids(search, 'jazz rock') == []
+
+
+def test_date_window(search):
+    assert ids(search, 'jazz', date_from='2030-04-01') == ['e3']
+    assert ids(search, 'jazz', date_to='2030-03-01') == ['e4']
+    assert ids(search, 'jazz', date_from='2031-01-01') == []
+
+
+def test_writes_before_and_after_a_rebuild(search, db):
+    assert ids(search, 'jazz') == ['e4', 'e3']
+    storage = db.get_storage()
+    late = {'id': 'e5', 'title': 'Late Jazz', 'description': '', 'date': '2030-01-15',
+            'total_tickets': 10, 'created_at': '2026-01-01T00:00:00'}
+    storage.insert_event(late)
+    search.add([late])
+    storage.delete_event('e4')
+    search.remove('e4')
+    assert ids(search, 'jazz') == ['e5', 'e3']
+
+    search._rebuild()                   # from memory
+    assert ids(search, 'jazz') == ['e5', 'e3']
+    search.remove('e3')
+    search.add([{**late, 'title': 'Late Blues'}])
+    assert ids(search, 'jazz') == []
+    assert ids(search, 'blues') == ['e5']
+
+    search.refresh()                    # from the database: e3 is still there, e5 is still jazz
+    assert ids(search, 'jazz') == ['e5', 'e3']
@@ -0,0 +1,182 @@
+import random
+
+import pytest
+
+from seatmap import MAX_HOLD_SEATS, SeatMap, SeatMapError, Section, _runs
+
+
+def brute_runs(free, count, bits):
+    return sum(1 << i for i in range(bits) if all(free >> (i + k) & 1 for k in range(count)))
+
+
+def brute_best(section, count):
+    """Front-most row, then the start closest to the row's centre (leftmost on a tie)"""
+    for row, length in enumerate(section.rows):
+        starts = [start for start in range(length - count + 1)
+                  if not section.mask(row, start, count) & ~section.free]
+        if starts:
+            centre = (length - count) // 2
+            return row, min(starts, key=lambda start: (abs(start - centre), start))
+    return None
+
+
+def layout(*rows, name='Stalls'):
+    return {'sections': [{'name': name, 'rows': list(rows)}]}
+
+
+def test_runs_match_brute_force():
+    rng = random.Random(7)
+    for _ in range(300):
+        bits = rng.randint(1, 200)
+        free = rng.getrandbits(bits) | rng.choice([0, (1 << bits) - 1])
+        count = rng.randint(1, 24)
+        assert _runs(free, count) == brute_runs(free, count, bits)
+
+
+def test_best_block_matches_brute_force():
+    rng = random.Random(11)
+    for _ in range(300):
+        section = Section('S', tuple(rng.randint(1, 30) for _ in range(rng.randint(1, 6))))
+        section.sold = rng.getrandbits(len(section.rows) * section.stride) & section.valid
+        count = rng.randint(1, 8)
+        assert section.best_block(count) == brute_best(section, count)
+
+
+def test_hold_takes_the_front_row_centre():
+    seat_map = SeatMap.from_layout(layout(10, 10))
+
+    first = seat_map.hold(4, ttl=60)
+    second = seat_map.hold(4, ttl=60)
+
+    assert (first.row, first.start) == (0, 3)
+    assert (second.row, second.start) == (1, 3)     # only 3 + 3 seats left in row 0, split by the hold
+
+
+def test_blocks_never_span_two_rows():
+    seat_map = SeatMap.from_layout(layout(3, 3))
+    seat_map.hold(2, ttl=60)                        # row 0, seats 0-1 - seat 2 and row 1 stay free
+
+    hold = seat_map.hold(3, ttl=60)
+
+    assert (hold.row, hold.start) == (1, 0)
+    with pytest.raises(SeatMapError) as e:
+        seat_map.hold(2, ttl=60)                    # seat 2 of row 0 + seat 0 of row 1 are not adjacent
+    assert e.value.status == 409
+
+
+def test_exhausted_map_is_409():
+    seat_map = SeatMap.from_layout(layout(4))
+    seat_map.hold(4, ttl=60)
+
+    with pytest.raises(SeatMapError) as e:
+        seat_map.hold(1, ttl=60)
+    assert e.value.status == 409
+    assert seat_map.counts() == {'seats': 4, 'sold': 0, 'held': 4, 'free': 0}
+
+
+@pytest.mark.parametrize('count', [0, MAX_HOLD_SEATS + 1])
+def test_hold_size_is_bounded(count):
+    with pytest.raises(SeatMapError):
+        SeatMap.from_layout(layout(50)).hold(count, ttl=60)
+
+
+def test_unknown_section_is_404():
+    with pytest.raises(SeatMapError) as e:
+        SeatMap.from_layout(layout(10)).hold(2, ttl=60, section='Balcony')
+    assert e.value.status == 404
+
+
+def test_take_sells_the_held_seats():
+    seat_map = SeatMap.from_layout(layout(10))
+    hold = seat_map.hold(3, ttl=60, now=1000)
+
+    taken = seat_map.take(hold.hold_id.hex(), now=1001)
+
+    assert taken is hold
+    assert seat_map.counts() == {'seats': 10, 'sold': 3, 'held': 0, 'free': 7}
+    with pytest.raises(SeatMapError) as e:
+        seat_map.take(hold.hold_id.hex(), now=1002)
+    assert e.value.status == 410
+
+
+def test_expired_hold_is_410_and_frees_the_seats():
+    seat_map = SeatMap.from_layout(layout(10))
+    hold = seat_map.hold(3, ttl=60, now=1000)
+
+    with pytest.raises(SeatMapError) as e:
+        seat_map.take(hold.hold_id.hex(), now=1060)
+    assert e.value.status == 410
+    assert seat_map.counts()['free'] == 10
+
+
+def test_release_frees_the_seats():
+    seat_map = SeatMap.from_layout(layout(10))
+    hold = seat_map.hold(3, ttl=60)
+
+    assert seat_map.release(hold.hold_id.hex())
+    assert not seat_map.release(hold.hold_id.hex())
+    assert not seat_map.release('not-hex')
+    assert seat_map.counts()['free'] == 10
+
+
+def test_blob_round_trip():
+    seat_map = SeatMap.from_layout({'sections': [
+        {'name': 'Stalls', 'rows': [12, 14, 16]},
+        {'name': 'Balcony', 'rows': 5, 'seats': 9},
+    ]})
+    sold = seat_map.hold(5, ttl=60, now=1000)
+    seat_map.take(sold.hold_id.hex(), now=1000)
+    held = seat_map.hold(4, ttl=60, section='Balcony', now=1000)
+
+    copy = SeatMap.from_blob(seat_map.to_blob())
+
+    assert copy.to_blob() == seat_map.to_blob()
+    assert copy.counts() == seat_map.counts() == {'seats': 87, 'sold': 5, 'held': 4, 'free': 78}
+    assert [(s.name, s.rows, s.sold, s.held) for s in copy.sections] == \
+        [(s.name, s.rows, s.sold, s.held) for s in seat_map.sections]
+    restored = copy.holds[held.hold_id]
+    assert (restored.expires, restored.section, restored.row, restored.start, restored.count) == \
+        (held.expires, held.section, held.row, held.start, held.count)
+
+
+def test_from_blob_rejects_other_data():
+    with pytest.raises(ValueError):
+        SeatMap.from_blob(b'NOPE\x01\x00')
+
+
+@pytest.mark.parametrize('bad', [
+    None,
+    {'sections': []},
+    {'sections': [{'name': '', 'rows': [10]}]},
+    {'sections': [{'name': 'A', 'rows': [0]}]},
+    {'sections': [{'name': 'A', 'rows': [10]}, {'name': 'A', 'rows': [10]}]},
+])
+def test_bad_layouts(bad):
+    with pytest.raises(SeatMapError):
+        SeatMap.from_layout(bad)
+
+
+def test_hold_and_confirm_through_the_api(app, client, admin_headers, make_event, monkeypatch):
+    event_id = make_event(total_tickets=6)
+    created = client.put(f'/api/events/{event_id}/seatmap', headers=admin_headers, json=layout(3, 3))
+    assert created.status_code == 201
+
+    held = client.post(f'/api/events/{event_id}/seats/hold', json={'tickets': 3})
+    assert held.status_code == 201
+    assert (held.get_json()['row'], held.get_json()['seats']) == (1, [1, 2, 3])
+
+    confirmed = client.post(f'/api/events/{event_id}/seats/confirm', json={
+        'hold_id': held.get_json()['hold_id'], 'name': 'Ada', 'email': 'ada@example.com'
+    })
+    assert confirmed.status_code == 201
+    assert confirmed.get_json()['remaining'] == 3
+
+    assert client.post(f'/api/events/{event_id}/seats/hold', json={'tickets': 4}).status_code == 409
+
+    import app as app_module
+    monkeypatch.setattr(app_module.seatmaps, 'hold_seconds', 0)
+    expired = client.post(f'/api/events/{event_id}/seats/hold', json={'tickets': 2}).get_json()
+    gone = client.post(f'/api/events/{event_id}/seats/confirm', json={
+        'hold_id': expired['hold_id'], 'name': 'Ada', 'email': 'ada@example.com'
+    })
+    assert gone.status_code == 410
@@ -0,0 +1,15 @@
+from storage import SupabaseStorage
+
+
+def test_supabase_totals_count_every_registration_once(postgrest):
+    # 2500 registrations - three PostgREST pages
+    postgrest.tables['registrations'] = [
+        {'id': n, 'event_id': f'e{n % 3}', 'tickets': 1 + n % 2} for n in range(2500)
+    ]
+    storage = SupabaseStorage(postgrest.client)
+
+    totals = storage.registration_totals()
+
+    assert sum(bookings for _, bookings in totals.values()) == 2500
+    assert sum(tickets for tickets, _ in totals.values()) == sum(1 + n % 2 for n in range(2500))
+    assert totals['e0'] == (sum(1 + n % 2 for n in range(0, 2500, 3)), len(range(0, 2500, 3)))
@@ -0,0 +1,64 @@
+import base64
+import json
+
+import pytest
+
+import config
+from tokens import TokenError, issue_token, verify_token
+
+
+def test_round_trip():
+    claims = verify_token(issue_token('user', 'ada@example.com'))
+    assert (claims['role'], claims['email']) == ('user', 'ada@example.com')
+
+
+def test_other_key_is_rejected():
+    token = issue_token('admin', 'admin@example.com', secret='event-ticket-system-2026')
+    with pytest.raises(TokenError):
+        verify_token(token)
+
+
+def test_promoted_prefix_is_rejected():
+    token = issue_token('user', 'ada@example.com')
+    with pytest.raises(TokenError):
+        verify_token('admin-' + token.partition('-')[2])
+
+
+def test_edited_payload_is_rejected():
+    token = issue_token('user', 'ada@example.com')
+    message, _, signature = token.rpartition('.')
+    payload = base64.urlsafe_b64encode(json.dumps(
+        {'role': 'user', 'email': 'admin@example.com', 'exp': 2 ** 40}
+    ).encode()).rstrip(b'=').decode()
+    with pytest.raises(TokenError):
+        verify_token(f'user-{payload}.{signature}')
+
+
+def test_expired_token_is_rejected():
+    with pytest.raises(TokenError, match='expired'):
+        verify_token(issue_token('user', 'ada@example.com', ttl=-1))
+
+
+@pytest.mark.parametrize('token', ['', 'admin', 'admin-.sig', 'guest-abc.sig', 'user-%%%.sig'])
+def test_malformed_token_is_rejected(token):
+    with pytest.raises(TokenError):
+        verify_token(token)
+
+
+def test_routes_answer_401_and_403(client):
+    assert client.delete('/api/events/nope').status_code == 401
+    forged = issue_token('admin', 'admin@example.com', secret='guessed')
+    assert client.delete('/api/events/nope', headers={'Authorization': f'Bearer {forged}'}).status_code == 401
+    user = issue_token('user', 'ada@example.com')
+    assert client.delete('/api/events/nope', headers={'Authorization': f'Bearer {user}'}).status_code == 403
+
+
+def test_generated_secret_key_is_kept(tmp_path, monkeypatch):
+    monkeypatch.delenv('SECRET_KEY')
+    path = str(tmp_path / 'data' / 'secret_key')
+
+    first = config._secret_key(path)
+
+    assert len(first) >= 32
+    assert config._secret_key(path) == first
+    assert list((tmp_path / 'data').iterdir()) == [tmp_path / 'data' / 'secret_key']